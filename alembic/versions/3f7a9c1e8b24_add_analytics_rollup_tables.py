@@ -0,0 +1,68 @@
+"""add analytics rollup tables
+
+Revision ID: 3f7a9c1e8b24
+Revises: e5f81c2a7d93
+Create Date: 2026-10-19 16:12:45.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a9c1e8b24'
+down_revision: Union[str, Sequence[str], None] = 'e5f81c2a7d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # filled by `python -m app.services.analytics_rollup` (run once after
+    # upgrading), then kept current by the app
+    op.create_table(
+        "analytics_daily_sales",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("refunded", sa.Float(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "analytics_daily_book_sales",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("book_id", sa.Integer(), primary_key=True),
+        sa.Column("book_title", sa.String(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+    )
+    op.create_index(op.f("ix_analytics_daily_book_sales_book_id"), "analytics_daily_book_sales", ["book_id"], unique=False)
+    op.create_table(
+        "analytics_daily_category_sales",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("category_id", sa.Integer(), primary_key=True),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+    )
+    op.create_index(op.f("ix_analytics_daily_category_sales_category_id"), "analytics_daily_category_sales", ["category_id"], unique=False)
+    op.create_table(
+        "analytics_daily_customer_sales",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("spent", sa.Float(), nullable=False),
+    )
+    op.create_index(op.f("ix_analytics_daily_customer_sales_user_id"), "analytics_daily_customer_sales", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_analytics_daily_customer_sales_user_id"), table_name="analytics_daily_customer_sales")
+    op.drop_table("analytics_daily_customer_sales")
+    op.drop_index(op.f("ix_analytics_daily_category_sales_category_id"), table_name="analytics_daily_category_sales")
+    op.drop_table("analytics_daily_category_sales")
+    op.drop_index(op.f("ix_analytics_daily_book_sales_book_id"), table_name="analytics_daily_book_sales")
+    op.drop_table("analytics_daily_book_sales")
+    op.drop_table("analytics_daily_sales")
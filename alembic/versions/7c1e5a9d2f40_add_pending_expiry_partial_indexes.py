@@ -0,0 +1,43 @@
+"""add pending expiry partial indexes
+
+Revision ID: 7c1e5a9d2f40
+Revises: d4e6b2af39bb
+Create Date: 2026-10-19 10:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a9d2f40'
+down_revision: Union[str, Sequence[str], None] = 'd4e6b2af39bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only pending rows are ever expired, so index just those
+    op.create_index(
+        'ix_order_pending_payment_expires_at',
+        'order',
+        ['payment_expires_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        'ix_ebookpurchase_pending_purchase_expires_at',
+        'ebookpurchase',
+        ['purchase_expires_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ebookpurchase_pending_purchase_expires_at', table_name='ebookpurchase')
+    op.drop_index('ix_order_pending_payment_expires_at', table_name='order')
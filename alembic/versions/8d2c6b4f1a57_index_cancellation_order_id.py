@@ -0,0 +1,43 @@
+"""index cancellationrequest.order_id
+
+Revision ID: 8d2c6b4f1a57
+Revises: 3f7a9c1e8b24
+Create Date: 2026-10-19 17:05:31.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2c6b4f1a57'
+down_revision: Union[str, Sequence[str], None] = '3f7a9c1e8b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # refund lookups per order (analytics rollups, cancellation screens)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_cancellationrequest_order_id',
+            'cancellationrequest',
+            ['order_id'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_cancellationrequest_order_id',
+            table_name='cancellationrequest',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,51 @@
+"""index payments by user and date
+
+Revision ID: b6e3d9a2c4f1
+Revises: 8d2c6b4f1a57
+Create Date: 2026-10-19 18:22:07.415938
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e3d9a2c4f1'
+down_revision: Union[str, Sequence[str], None] = '8d2c6b4f1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    # /checkout/my-payments: each UNION ALL branch is a range on these
+    ('ix_payment_user_id_created_at', 'payment', ['user_id', 'created_at']),
+    ('ix_ebookpayment_user_id_created_at', 'ebookpayment', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,42 @@
+"""add job_run table
+
+Revision ID: b93f0d4c6e12
+Revises: 7c1e5a9d2f40
+Create Date: 2026-10-19 11:02:17.540926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93f0d4c6e12'
+down_revision: Union[str, Sequence[str], None] = '7c1e5a9d2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "job_run",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("job_id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),  # running / success / failed
+        sa.Column("host", sa.String(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("duration_ms", sa.Integer(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+    )
+    op.create_index(op.f("ix_job_run_job_id"), "job_run", ["job_id"], unique=False)
+    op.create_index(op.f("ix_job_run_started_at"), "job_run", ["started_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_job_run_started_at"), table_name="job_run")
+    op.drop_index(op.f("ix_job_run_job_id"), table_name="job_run")
+    op.drop_table("job_run")
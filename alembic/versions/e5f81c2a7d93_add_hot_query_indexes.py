@@ -0,0 +1,76 @@
+"""add hot query indexes
+
+Revision ID: e5f81c2a7d93
+Revises: b93f0d4c6e12
+Create Date: 2026-10-19 14:37:08.264511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f81c2a7d93'
+down_revision: Union[str, Sequence[str], None] = 'b93f0d4c6e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial predicate)
+INDEXES = [
+    # cart / wishlist: per-user lists and (user, book) lookups
+    ('ix_cartitem_user_id_book_id', 'cartitem', ['user_id', 'book_id'], None),
+    ('ix_wishlist_user_id_book_id', 'wishlist', ['user_id', 'book_id'], None),
+    # book detail: reviews of a book
+    ('ix_review_book_id', 'review', ['book_id'], None),
+    # order items by order (history, invoices, inventory) and by book (analytics)
+    ('ix_orderitem_order_id', 'orderitem', ['order_id'], None),
+    ('ix_orderitem_book_id', 'orderitem', ['book_id'], None),
+    # order history, admin list by status, analytics over paid orders
+    ('ix_order_user_id_created_at', 'order', ['user_id', 'created_at'], None),
+    ('ix_order_status_created_at', 'order', ['status', 'created_at'], None),
+    ('ix_order_created_at', 'order', ['created_at'], None),
+    # catalogue: slug lookups, visible books newest first, per category, featured
+    ('ix_book_slug', 'book', ['slug'], None),
+    ('ix_book_visible_updated_at', 'book', ['updated_at'], 'NOT is_deleted AND NOT is_archived'),
+    ('ix_book_category_id_updated_at', 'book', ['category_id', 'updated_at'], None),
+    ('ix_book_featured', 'book', ['id'], 'is_featured'),
+    # ebook library and admin purchase list
+    ('ix_ebookpurchase_user_id_status', 'ebookpurchase', ['user_id', 'status'], None),
+    ('ix_ebookpurchase_status_created_at', 'ebookpurchase', ['status', 'created_at'], None),
+    # my payments
+    ('ix_payment_user_id', 'payment', ['user_id'], None),
+    ('ix_ebookpayment_user_id', 'ebookpayment', ['user_id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the tables writable while the indexes build;
+    # it cannot run inside a transaction. IF NOT EXISTS because some
+    # databases already carry ix_payment_user_id from older revisions.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
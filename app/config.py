@@ -1,5 +1,6 @@
 from logging import config
 import os
+import tempfile
 from typing import ClassVar, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import field_validator, Field
@@ -16,11 +17,51 @@ class Settings(BaseSettings):
     postgres_db: str
     postgres_host: str
     postgres_port: str
+
+    # Connection pool (per process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 10  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800
+    DB_PING_AFTER_IDLE: int = 300  # ping only connections idle this long (seconds)
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = 60000
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+
+    # Read replica (optional; GET catalog/analytics reads, primary fallback)
+    REPLICA_DATABASE_URL: Optional[str] = None  # postgresql+psycopg2://...
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL: float = 5.0
+    READ_YOUR_WRITES_SECONDS: int = 0  # >0: after a write, that client reads the primary this long
+
+    # Prometheus /metrics (request latency per route; pool, cache, job, email, R2 stats)
+    METRICS_ENABLED: bool = True
+
+    # Per-request SQL accounting (Server-Timing header, /metrics, slow-request log)
+    QUERY_STATS_ENABLED: bool = False
+    QUERY_STATS_LOG_QUERIES: int = 30  # log requests running more statements than this
+    QUERY_STATS_LOG_MS: float = 500.0  # ... or spending longer than this in the DB
+    QUERY_STATS_SLOWEST: int = 3  # statements kept per request for the log
+
+    # On-demand sampling profiler (admin X-Profile header, /admin/profiling/capture)
+    PROFILING_ENABLED: bool = True
+    PROFILING_INTERVAL_MS: float = 5.0  # time between stack samples
+    PROFILING_MAX_SECONDS: int = 60  # longest window capture
+    PROFILING_PER_MINUTE: int = 6  # captures per worker per minute
+    PROFILING_KEEP: int = 20  # newest profiles kept on disk
     
     # JWT settings
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    USER_CACHE_TTL: int = 30  # seconds a user principal is cached per process
+
+    # Password hashing (bcrypt in a process pool; raising ROUNDS rehashes on next login)
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32  # queued hashes beyond this get 503
+    PASSWORD_HASH_WORKER_NICE: int = 10  # worker niceness (POSIX); 0 leaves priority alone
     
     # Google OAuth
     GOOGLE_CLIENT_ID: str
@@ -41,12 +82,52 @@ class Settings(BaseSettings):
     BREVO_API_KEY: str
     MAIL_FROM: str
     STORE_NAME: str = "Hithabodha Bookstore"
-    
+
+    # Email dispatch (background worker pool)
+    EMAIL_TRANSPORT: str = "brevo"  # brevo | local
+    EMAIL_WORKERS: int = 4
+    EMAIL_QUEUE_SIZE: int = 1000
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_HTTP_POOL_SIZE: int = 10
+
+    # Invoices (rendered in a worker pool, stored in R2 + local cache)
+    INVOICE_WORKERS: int = 2
+    INVOICE_WAIT_SECONDS: int = 15
+    INVOICE_CACHE_DIR: Optional[str] = None  # default: per-user 0700 dir in the temp dir
+    INVOICE_CACHE_HOURS: int = 168  # local copies untouched this long are deleted
+
+    # Periodic jobs (advisory-locked; false = run `python -m app.services.scheduler`)
+    SCHEDULER_ENABLED: bool = True
+
+    # Analytics rollups (rebuilt per day on order status changes)
+    ROLLUP_RECONCILE_DAYS: int = 3  # recent days the hourly job re-derives
+    ANALYTICS_MAX_WINDOW_DAYS: int = 3660  # longest from/to span any endpoint accepts
+
+    # Analytics export (streamed; longer windows are prepared as jobs)
+    ANALYTICS_EXPORT_BATCH_SIZE: int = 2000  # orders per keyset batch
+    ANALYTICS_EXPORT_SYNC_MAX_DAYS: int = 366
+    ANALYTICS_EXPORT_WORKERS: int = 1
+    ANALYTICS_EXPORT_RETENTION_HOURS: int = 24  # finished job files, in R2 and locally
+    ANALYTICS_EXPORT_TIMEOUT_MINUTES: int = 60  # a job still "running" after this is failed
+
+    # Finance export (raw rows through a server-side cursor)
+    FINANCE_EXPORT_BATCH_SIZE: int = 5000  # rows per fetch / Arrow batch / Parquet row group
+    FINANCE_EXPORT_TIMEOUT_MS: int = 300000  # statement / idle-in-transaction, export only
+
     # Change the type annotation to accept str or list
     ADMIN_EMAILS: str | List[str] = Field(default_factory=list)
 
     RAZORPAY_KEY_ID : ClassVar[str] = os.getenv("RAZORPAY_KEY_ID")
     RAZORPAY_KEY_SECRET : ClassVar[str] = os.getenv("RAZORPAY_KEY_SECRET")
+
+    # Razorpay webhooks (verified, queued, applied in batches)
+    RAZORPAY_WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_BATCH_WAIT_MS: int = 200
+    WEBHOOK_MAX_ATTEMPTS: int = 5  # then the body goes to the dead-letter file
+    WEBHOOK_DEAD_LETTER_PATH: Optional[str] = os.path.join(tempfile.gettempdir(), "hithabodha_webhooks_failed.jsonl")
     
     @field_validator('ADMIN_EMAILS', mode='before')
     @classmethod
@@ -96,6 +177,16 @@ class Settings(BaseSettings):
             f"{encoded_password}@{self.postgres_host}:"
             f"{self.postgres_port}/{self.postgres_db}"
         )
+
+    @property
+    def async_database_url(self):
+        return self.database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+
+    @property
+    def async_replica_database_url(self):
+        if not self.REPLICA_DATABASE_URL:
+            return None
+        return self.REPLICA_DATABASE_URL.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
     
     class Config:
         env_file = ".env"
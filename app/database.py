@@ -1,15 +1,332 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import settings
 import app.models
 
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------
+# Pool telemetry
+# ---------------------------------------------------------
+class _PoolStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+
+pool_stats = _PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with pool_stats.lock:
+                pool_stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with pool_stats.lock:
+                pool_stats.checkouts += 1
+                pool_stats.wait_seconds += waited
+                pool_stats.max_wait_seconds = max(pool_stats.max_wait_seconds, waited)
+
+
+def _server_options() -> str:
+    return " ".join([
+        f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}",
+        f"-c idle_in_transaction_session_timeout={settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}",
+    ])
+
 
 engine = create_engine(
     settings.database_url,
     echo=False,
-    pool_pre_ping=True,
-    pool_recycle=1800,
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    # liveness is checked in _ping_if_idle instead of on every checkout
+    pool_pre_ping=False,
+    connect_args={"options": _server_options()},
+)
+
+
+@event.listens_for(engine, "checkin")
+def _mark_idle(dbapi_connection, connection_record):
+    connection_record.info["checked_in_at"] = time.monotonic()
+
+
+@event.listens_for(engine, "checkout")
+def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+    """
+    Pessimistic check only for connections that sat idle long enough to
+    have been dropped (server restart, NAT/LB timeout). Raising
+    DisconnectionError makes the pool retry with a fresh connection.
+    """
+    idle_since = connection_record.info.get("checked_in_at")
+    if idle_since is None or time.monotonic() - idle_since < settings.DB_PING_AFTER_IDLE:
+        return
+
+    with pool_stats.lock:
+        pool_stats.pings += 1
+
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+    except Exception as e:
+        with pool_stats.lock:
+            pool_stats.ping_failures += 1
+        logger.warning(f"Stale pooled connection discarded: {e}")
+        raise exc.DisconnectionError() from e
+
+
+def pool_metrics() -> dict:
+    pool = engine.pool
+    with pool_stats.lock:
+        checkouts = pool_stats.checkouts
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checkouts": checkouts,
+            "wait_seconds_total": round(pool_stats.wait_seconds, 6),
+            "wait_seconds_avg": round(pool_stats.wait_seconds / checkouts, 6) if checkouts else 0.0,
+            "wait_seconds_max": round(pool_stats.max_wait_seconds, 6),
+            "timeouts": pool_stats.timeouts,
+            "idle_pings": pool_stats.pings,
+            "idle_ping_failures": pool_stats.ping_failures,
+        }
+
+
+# ---------------------------------------------------------
+# Async engine (asyncpg) for hot read paths
+# ---------------------------------------------------------
+async_engine = create_async_engine(
+    settings.async_database_url,
+    echo=False,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args={
+        "server_settings": {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+            "idle_in_transaction_session_timeout": str(settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS),
+        },
+    },
+)
+
+async_session_factory = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
+
+# ---------------------------------------------------------
+# Read replica (optional)
+# ---------------------------------------------------------
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# 0 when the replica has replayed everything it received; NULL (unknown)
+# when it has never replayed a transaction
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+replica_engine = None
+async_replica_session_factory = None
+
+if settings.REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        settings.REPLICA_DATABASE_URL,
+        echo=False,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=False,
+        connect_args={"options": _server_options()},
+    )
+    event.listen(replica_engine, "checkin", _mark_idle)
+    event.listen(replica_engine, "checkout", _ping_if_idle)
+
+    async_replica_session_factory = async_sessionmaker(
+        create_async_engine(
+            settings.async_replica_database_url,
+            echo=False,
+            pool_size=settings.ASYNC_DB_POOL_SIZE,
+            max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            connect_args={
+                "server_settings": {
+                    "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+                    "idle_in_transaction_session_timeout": str(settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS),
+                },
+            },
+        ),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+class ReplicaMonitor:
+    """Samples replica lag every REPLICA_LAG_CHECK_INTERVAL seconds"""
+
+    def __init__(self):
+        self.lag: Optional[float] = None  # None = unknown / unreachable
+        self.checked_at: Optional[float] = None
+        self.reads = {"replica": 0, "primary_lagging": 0, "primary_read_your_writes": 0}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if replica_engine is None or (self._thread and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def check(self) -> Optional[float]:
+        try:
+            with replica_engine.connect() as conn:
+                lag = conn.execute(_REPLICA_LAG_SQL).scalar()
+            lag = float(lag) if lag is not None else None
+        except Exception as e:
+            logger.warning(f"Replica lag check failed: {e}")
+            lag = None
+
+        lagging = lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS
+        if lagging and not (self.lag is not None and self.lag > settings.REPLICA_MAX_LAG_SECONDS):
+            logger.warning(f"Replica lag {lag:.1f}s over limit, reading from primary")
+
+        self.lag = lag
+        self.checked_at = time.time()
+        return lag
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.check()
+            self._stopping.wait(settings.REPLICA_LAG_CHECK_INTERVAL)
+
+    def healthy(self) -> bool:
+        lag, checked_at = self.lag, self.checked_at
+        return (
+            lag is not None
+            and lag <= settings.REPLICA_MAX_LAG_SECONDS
+            # a stalled monitor must not keep routing to a replica
+            and time.time() - checked_at < 3 * settings.REPLICA_LAG_CHECK_INTERVAL
+        )
+
+    def count(self, target: str):
+        with self._lock:
+            self.reads[target] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            reads = dict(self.reads)
+        return {
+            "configured": replica_engine is not None,
+            "lag_seconds": self.lag,
+            "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+            "healthy": replica_engine is not None and self.healthy(),
+            "reads": reads,
+        }
+
+
+replica_monitor = ReplicaMonitor()
+
+
+def _read_from_replica(request: Request) -> bool:
+    if replica_engine is None:
+        return False
+
+    # read-your-writes: this client wrote recently (cookie set by
+    # ReadYourWritesMiddleware), so it reads the primary until then
+    if settings.READ_YOUR_WRITES_SECONDS > 0:
+        try:
+            until = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+        except ValueError:
+            until = 0
+        if until > time.time():
+            replica_monitor.count("primary_read_your_writes")
+            return False
+
+    if not replica_monitor.healthy():
+        replica_monitor.count("primary_lagging")
+        return False
+
+    replica_monitor.count("replica")
+    return True
+
+
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+def read_engine(request: Request):
+    """Engine for a read-only request's own sessions (e.g. streamed responses)"""
+    return replica_engine if _read_from_replica(request) else engine
+
+
+def get_read_session(request: Request):
+    """
+    Session for read-only GET routes. Served by the replica when one is
+    configured and within REPLICA_MAX_LAG_SECONDS, else by the primary.
+    Never use it for reads that feed a cache invalidated on write.
+    """
+    with Session(read_engine(request)) as session:
+        yield session
+
+
+async def get_async_session():
+    async with async_session_factory() as session:
+        yield session
+
+
+async def get_async_read_session(request: Request):
+    """get_read_session for async routes"""
+    if _read_from_replica(request):
+        factory = async_replica_session_factory
+    else:
+        factory = async_session_factory
+
+    async with factory() as session:
+        yield session
@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from app.config import settings
 from app.middleware.r2_public_url import R2PublicURLMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
 import app.models
-from apscheduler.schedulers.background import BackgroundScheduler
 from app.routes import (
     admin,
     admin_cancellation,
@@ -32,7 +35,11 @@ from app.routes import (
     wishlist,
     storage,
     book_inventory,
-    admin_analytics
+    admin_analytics,
+    admin_finance,
+    admin_profiling,
+    payment_webhooks,
+    metrics,
 )
 
 import os
@@ -41,53 +48,46 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 
-from app.services.order_expiry_service import expire_unpaid_ebooks, expire_unpaid_orders
-from app.services.payment_remainders import send_ebook_payment_reminders, send_payment_reminders
+from app.database import replica_monitor
+from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.email_dispatcher import get_dispatcher, shutdown_email_dispatcher
+from app.services.razorpay_webhook import get_webhook_processor, shutdown_webhook_processor
+from app.services.analytics_rollup import shutdown_rollup_refresher
+from app.utils.template import precompile_templates
+from app.utils.hash import get_password_hasher, shutdown_password_hasher
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(
-        expire_unpaid_orders,
-        trigger="interval",
-        hours=1,
-        id="expire_unpaid_orders",
-        replace_existing=True,
-    )
-
-    scheduler.add_job(
-        expire_unpaid_ebooks,
-        trigger="interval",
-        hours=1,
-        id="expire_unpaid_ebooks",
-        replace_existing=True,
-    )
-
-    # Send physical order payment reminders
-    scheduler.add_job(
-        send_payment_reminders,
-        trigger="interval",
-        hours=1,
-        id="send_payment_reminders",
-        replace_existing=True,
-    )
-
-    # Send ebook payment reminders
-    scheduler.add_job(
-        send_ebook_payment_reminders,
-        trigger="interval",
-        hours=1,
-        id="send_ebook_payment_reminders",
-        replace_existing=True,
-    )
-    scheduler.start()
+    # Background email workers (Brevo keep-alive session + batching)
+    get_dispatcher().start()
+
+    # Razorpay webhook worker (batched, idempotent finalisation)
+    get_webhook_processor().start()
+
+    # Compile all email templates up front (bytecode cache on disk)
+    precompile_templates()
+
+    # Expiry / reminder jobs (one runner at a time across workers)
+    if settings.SCHEDULER_ENABLED:
+        start_scheduler()
+
+    # Replica lag sampling (no-op without REPLICA_DATABASE_URL)
+    replica_monitor.start()
+
+    # bcrypt worker processes (spawned now so the first login doesn't wait)
+    get_password_hasher().start()
 
     try:
         yield
     finally:
-        scheduler.shutdown()
+        replica_monitor.stop()
+        shutdown_password_hasher()
+        shutdown_scheduler()
+        shutdown_webhook_processor()
+        shutdown_rollup_refresher()
+        shutdown_email_dispatcher()
 
 app = FastAPI(
     title="Hithabodha Bookstore API",
@@ -111,6 +111,12 @@ app.add_middleware(SlowAPIMiddleware)
 
 app.add_middleware(R2PublicURLMiddleware)
 
+if settings.REPLICA_DATABASE_URL and settings.READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -129,6 +135,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# outermost, so the latency covers every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# idle unless an admin sends X-Profile; wraps everything above
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/users", tags=["Users"]) 
 app.include_router(books_admin.router, prefix="/admin/books", tags=["Admin Books"])
@@ -157,7 +171,11 @@ app.include_router(ebooks.router,prefix="/ebooks",tags= ["Ebook Purchase"])
 app.include_router(user_library.router,prefix="/users/library",tags= ["Users Library"])
 app.include_router(ebooks_admin.router,prefix="/ebooks/admin",tags=["Ebook Admin"]),
 app.include_router(admin_analytics.router,prefix="/admin/analytics", tags=["Admin Analytics"])
+app.include_router(admin_finance.router,prefix="/admin/finance", tags=["Admin Finance"])
+app.include_router(admin_profiling.router,prefix="/admin/profiling", tags=["Admin Profiling"])
+app.include_router(payment_webhooks.router,prefix="/webhooks",tags=["Payment Webhooks"])
 app.include_router(health.router,prefix="/health",tags=["Health"])
+app.include_router(metrics.router,tags=["Metrics"])
 
 
 # Use system temp directory instead of local uploads folder
@@ -0,0 +1,35 @@
+# app/middleware/metrics.py
+import time
+
+from app.utils.metrics import HTTP_IN_FLIGHT, observe_request, route_template
+
+
+class MetricsMiddleware:
+    """
+    Request latency (until the body is sent) and status class per route
+    template, and the in-flight gauge, for /metrics (METRICS_ENABLED).
+    Plain ASGI, so it adds no task or body buffering to the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500  # if the app raises before starting a response
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            observe_request(scope["method"], route_template(scope), status, time.perf_counter() - started)
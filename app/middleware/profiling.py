@@ -0,0 +1,62 @@
+# app/middleware/profiling.py
+from starlette.concurrency import run_in_threadpool
+
+from app.utils import profiler
+from app.utils.token import decode_access_token
+
+
+def _headers(scope) -> dict:
+    return {k: v for k, v in scope["headers"] if k in (b"x-profile", b"authorization")}
+
+
+def _is_admin(authorization: bytes) -> bool:
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    payload = decode_access_token(token)
+    # only tokens that carry the admin role; no DB lookup in the middleware
+    return bool(payload) and payload.get("role") == "admin" and payload.get("can_login") is not False
+
+
+class ProfilingMiddleware:
+    """
+    Samples the worker while one request runs, when an admin sends
+    `X-Profile: 1` (PROFILING_ENABLED). The response gets X-Profile-Id,
+    and the speedscope file is at /admin/profiling/{id} once the body
+    has been sent; X-Profile-Skipped says why when the capture was
+    refused. Anyone else's X-Profile header is ignored. Without the
+    header the request passes straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = _headers(scope)
+        if headers.get(b"x-profile") not in (b"1", b"true") or not _is_admin(headers.get(b"authorization", b"")):
+            return await self.app(scope, receive, send)
+
+        try:
+            capture = profiler.begin()
+        except profiler.ProfilerBusy as e:
+            extra = (b"x-profile-skipped", str(e).encode())
+            capture = None
+        else:
+            profile_id = profiler.new_profile_id()
+            extra = (b"x-profile-id", profile_id.encode())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), extra]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if capture is not None:
+                profiler.end(capture)
+                await run_in_threadpool(
+                    profiler.save, capture, profile_id, f"{scope['method']} {scope['path']}"
+                )
@@ -0,0 +1,41 @@
+# app/middleware/query_stats.py
+import logging
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.utils.metrics import DB_QUERIES, DB_SECONDS, route_template
+from app.utils.query_stats import install, track
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """
+    Counts each request's SQL statements and DB time (QUERY_STATS_ENABLED).
+    Sent back as a Server-Timing header, exported per route at /metrics,
+    and logged with the slowest statements when a request goes over
+    QUERY_STATS_LOG_QUERIES statements or QUERY_STATS_LOG_MS of DB time.
+    Statements run while a StreamingResponse body is sent are not counted.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        install()
+
+    async def dispatch(self, request, call_next):
+        with track() as stats:
+            response = await call_next(request)
+
+        route = route_template(request.scope)
+        DB_QUERIES.labels(route).observe(stats.count)
+        DB_SECONDS.labels(route).observe(stats.seconds)
+        response.headers.append("Server-Timing", stats.server_timing())
+
+        if stats.count > settings.QUERY_STATS_LOG_QUERIES or stats.seconds * 1000 > settings.QUERY_STATS_LOG_MS:
+            slowest = "; ".join(f"{s * 1000:.1f}ms {sql}" for s, sql in stats.slowest())
+            logger.warning(
+                f"{request.method} {route}: {stats.count} queries, "
+                f"{stats.seconds * 1000:.1f}ms in DB. Slowest: {slowest}"
+            )
+        return response
@@ -8,8 +8,8 @@ class R2PublicURLMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
         response = await call_next(request)
 
-          #  Skip Swagger & OpenAPI
-        if request.url.path.startswith(("/docs", "/redoc", "/openapi.json")):
+          #  Skip Swagger & OpenAPI, and profile files (large, no images)
+        if request.url.path.startswith(("/docs", "/redoc", "/openapi.json", "/admin/profiling")):
             return response
 
         # Only process JSON responses
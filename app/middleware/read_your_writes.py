@@ -0,0 +1,31 @@
+# app/middleware/read_your_writes.py
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.database import READ_PRIMARY_COOKIE
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """
+    After a successful write, pins the client's reads to the primary for
+    READ_YOUR_WRITES_SECONDS (cookie read by get_read_session), so it does
+    not see replica data older than its own change.
+    """
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                READ_PRIMARY_COOKIE,
+                str(int(time.time()) + settings.READ_YOUR_WRITES_SECONDS),
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="lax",
+            )
+
+        return response
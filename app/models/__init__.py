@@ -15,5 +15,8 @@ from app.models.address import Address
 from app.models.general_settings import GeneralSettings
 from app.models.ebook_purchase import EbookPurchase
 from app.models.ebook_payment import EbookPayment
+from app.models.book_image import BookImage
+from app.models.job_run import JobRun
+from app.models.analytics_rollup import DailySales, DailyBookSales, DailyCategorySales, DailyCustomerSales
 
 # add ALL models here
@@ -0,0 +1,46 @@
+# app/models/analytics_rollup.py
+"""
+Daily pre-aggregates behind /admin/analytics, maintained by
+app.services.analytics_rollup. One row per day (and book / category /
+customer); a day's rows are always rebuilt together from `order`.
+"""
+from datetime import date, datetime
+from sqlmodel import Field, SQLModel
+
+
+class DailySales(SQLModel, table=True):
+    __tablename__ = "analytics_daily_sales"
+
+    day: date = Field(primary_key=True)
+    orders: int = 0
+    revenue: float = 0.0  # order totals
+    refunded: float = 0.0  # partial refunds on those orders
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DailyBookSales(SQLModel, table=True):
+    __tablename__ = "analytics_daily_book_sales"
+
+    day: date = Field(primary_key=True)
+    book_id: int = Field(primary_key=True, index=True)
+    book_title: str
+    units: int = 0
+    revenue: float = 0.0
+
+
+class DailyCategorySales(SQLModel, table=True):
+    __tablename__ = "analytics_daily_category_sales"
+
+    day: date = Field(primary_key=True)
+    category_id: int = Field(primary_key=True, index=True)
+    units: int = 0
+    revenue: float = 0.0
+
+
+class DailyCustomerSales(SQLModel, table=True):
+    __tablename__ = "analytics_daily_customer_sales"
+
+    day: date = Field(primary_key=True)
+    user_id: int = Field(primary_key=True, index=True)
+    orders: int = 0
+    spent: float = 0.0
@@ -1,3 +1,4 @@
+from sqlalchemy import Index, text
 from sqlmodel import Column, ForeignKey, Integer, SQLModel, Field ,Relationship
 from typing import Optional, TYPE_CHECKING , List
 from datetime import datetime
@@ -10,10 +11,21 @@ if TYPE_CHECKING:
     from app.models.book_image import BookImage
 
 class Book(SQLModel, table=True):
+    __table_args__ = (
+        # public listings: visible books, newest first (optionally per category)
+        Index(
+            "ix_book_visible_updated_at",
+            "updated_at",
+            postgresql_where=text("NOT is_deleted AND NOT is_archived"),
+        ),
+        Index("ix_book_category_id_updated_at", "category_id", "updated_at"),
+        Index("ix_book_featured", "id", postgresql_where=text("is_featured")),
+    )
+
     # main info
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
-    slug: str
+    slug: str = Field(index=True)
     excerpt: Optional[str] = None
     description: str
 
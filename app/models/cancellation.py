@@ -6,7 +6,7 @@ from decimal import Decimal
 class CancellationRequest(SQLModel, table=True):
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    order_id: int = Field(foreign_key="order.id")
+    order_id: int = Field(foreign_key="order.id", index=True)
     user_id: int = Field(foreign_key="user.id")
     
     # Request details
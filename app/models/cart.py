@@ -1,9 +1,14 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index
 
 class CartItem(SQLModel, table=True):
+    __table_args__ = (
+        # the user's cart, and the add-to-cart (user, book) lookup
+        Index("ix_cartitem_user_id_book_id", "user_id", "book_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     book_id: int = Field(
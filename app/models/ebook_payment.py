@@ -1,12 +1,17 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 
 class EbookPayment(SQLModel, table=True):
+    __table_args__ = (
+        # my-payments: a user's payments, newest first
+        Index("ix_ebookpayment_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     ebook_purchase_id: int = Field(foreign_key="ebookpurchase.id")
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
 
     txn_id: str
     amount: float
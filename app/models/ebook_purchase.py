@@ -1,8 +1,21 @@
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
 
 class EbookPurchase(SQLModel, table=True):
+    __table_args__ = (
+        # expiry job: pending purchases by deadline
+        Index(
+            "ix_ebookpurchase_pending_purchase_expires_at",
+            "purchase_expires_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # library: a user's paid purchases
+        Index("ix_ebookpurchase_user_id_status", "user_id", "status"),
+        # admin list filtered by status, newest first
+        Index("ix_ebookpurchase_status_created_at", "status", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
 
     user_id: int = Field(foreign_key="user.id")
@@ -0,0 +1,18 @@
+# app/models/job_run.py
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+class JobRun(SQLModel, table=True):
+    __tablename__ = "job_run"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: str = Field(index=True)
+    status: str = Field(default="running")  # running | success | failed (| expired: exports)
+    host: Optional[str] = None  # hostname:pid of the runner
+
+    started_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    error: Optional[str] = None
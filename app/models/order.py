@@ -1,6 +1,7 @@
 # app/models/order.py
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel, Relationship
 
 from app.models.order_item import OrderItem
@@ -11,6 +12,18 @@ if TYPE_CHECKING:
 
 
 class Order(SQLModel, table=True):
+    __table_args__ = (
+        # expiry job: pending orders by deadline
+        Index(
+            "ix_order_pending_payment_expires_at",
+            "payment_expires_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # order history: a user's orders, newest first
+        Index("ix_order_user_id_created_at", "user_id", "created_at"),
+        # admin list filtered by status, analytics over paid orders by date
+        Index("ix_order_status_created_at", "status", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
 
@@ -56,7 +69,7 @@ class Order(SQLModel, table=True):
     reminder_final_sent: bool = Field(default=False)
 
     # ============ Timestamps ============
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # ============ Tracking Information ============
@@ -7,8 +7,8 @@ if TYPE_CHECKING:
 
 class OrderItem(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    order_id: int = Field(foreign_key="order.id")
-    book_id: int = Field(foreign_key="book.id")
+    order_id: int = Field(foreign_key="order.id", index=True)
+    book_id: int = Field(foreign_key="book.id", index=True)
 
     book_title: str
     price: float
@@ -1,12 +1,18 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 
 class Payment(SQLModel, table=True):
+    __table_args__ = (
+        # my-payments: a user's payments, newest first
+        Index("ix_payment_user_id_created_at", "user_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     order_id: int = Field(index=True)
-    user_id: Optional[int] = Field(default=None,foreign_key="user.id", nullable=True)
+    user_id: Optional[int] = Field(default=None,foreign_key="user.id", nullable=True, index=True)
     txn_id: str = Field(index=True, unique=True)  
     amount: float
     status: str  # pending | completed | failed
@@ -1,7 +1,7 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index
 
 if TYPE_CHECKING:
     from app.models.book import Book
@@ -9,6 +9,10 @@ if TYPE_CHECKING:
 
 
 class Review(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_review_book_id", "book_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     book_id: int = Field(sa_column=Column(ForeignKey("book.id", ondelete="CASCADE"),nullable=False
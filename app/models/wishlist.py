@@ -1,10 +1,15 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index
 
 
 class Wishlist(SQLModel, table=True):
+    __table_args__ = (
+        # list / count per user, and the (user, book) status lookup
+        Index("ix_wishlist_user_id_book_id", "user_id", "book_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     book_id: int = Field(
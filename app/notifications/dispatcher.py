@@ -14,6 +14,7 @@ EVENT_LABELS = {
     OrderEvent.DELIVERED: "Order delivered",
     OrderEvent.CANCELLED: "Order cancelled",
     OrderEvent.REFUNDED: "Refund issued",
+    OrderEvent.PAYMENT_EXPIRED: "Payment window expired",
 }
 
 def dispatch_order_event(
@@ -12,6 +12,7 @@ class OrderEvent(str, Enum):
     CANCEL_REJECTED = "cancel_rejected"
     CANCEL_APPROVED = "cancel_approved"
     REFUND_PROCESSED = "refund_processed"
+    PAYMENT_EXPIRED = "payment_expired"
 
     EBOOK_PURCHASE_CREATED = "ebook_purchase_created"
     EBOOK_PAYMENT_SUCCESS = "ebook_payment_success"
@@ -152,11 +152,13 @@ def admin_change_password(
     session: Session = Depends(get_session),
     current_admin: User = Depends(require_admin)
 ):
+    # attach first: the principal from get_current_user does not carry the hash
+    session.add(current_admin)
+
     if not verify_password(current_password, current_admin.password):
         raise HTTPException(400, "Incorrect current password")
 
     current_admin.password = hash_password(new_password)
-    session.add(current_admin)
     session.commit()
 
     return {"message": "Password changed successfully"}
@@ -1,285 +1,139 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, func, select
-from app.database import get_session
-from app.models.book import Book
-from app.models.category import Category
-from app.models.order import Order
-from app.models.order_item import OrderItem
-from app.models.user import User
-from fastapi.responses import StreamingResponse
-import io
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.chart import BarChart, Reference
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session
+from app.config import settings
+from app.database import get_read_session, read_engine
+from app.services import analytics_rollup as analytics
+from app.services.analytics_export import export_download, export_job, export_response, start_export_job
+from app.services.analytics_rollup import AnalyticsWindow
+from app.utils.token import get_current_admin
 
 
 
 
-router = APIRouter()
-@router.get("/overview")
-def analytics_overview(session: Session = Depends(get_session)):
-    total_revenue = session.exec(
-        select(func.sum(Order.total))
-        .where(Order.status == "paid")
-    ).one()
+# every endpoint (and export job) is admin-only: exports carry customer emails
+router = APIRouter(dependencies=[Depends(get_current_admin)])
 
-    total_orders = session.exec(
-        select(func.count(Order.id))
-        .where(Order.status == "paid")
-    ).one()
+DEFAULT_WINDOW_DAYS = 30
 
-    avg_order = total_revenue / total_orders if total_orders else 0
 
-    return {
-        "revenue": total_revenue or 0,
-        "orders": total_orders or 0,
-        "avg_order_value": avg_order
-    }
+# ---------------------------------------------------------
+# Window (?from=&to=&granularity=&tz=, shared by every endpoint)
+# ---------------------------------------------------------
+def analytics_window(
+    from_: Optional[date] = Query(None, alias="from", description="first day (default: 30 days before `to`)"),
+    to: Optional[date] = Query(None, description="last day, inclusive (default: today in `tz`)"),
+    granularity: Literal["day", "week", "month"] = "day",
+    tz: str = Query("UTC", description="IANA zone the days are counted in, e.g. Asia/Kolkata"),
+) -> AnalyticsWindow:
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(400, f"Unknown timezone: {tz}")
+
+    to = to or datetime.now(zone).date()
+    from_ = from_ or to - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if from_ > to:
+        raise HTTPException(400, "'from' must not be after 'to'")
+    if (to - from_).days + 1 > settings.ANALYTICS_MAX_WINDOW_DAYS:
+        raise HTTPException(400, f"The window is limited to {settings.ANALYTICS_MAX_WINDOW_DAYS} days")
+
+    return AnalyticsWindow(from_, to, granularity, "UTC" if tz in ("UTC", "Etc/UTC") else tz)
 
-@router.get("/revenue-chart")
-def revenue_chart(session: Session = Depends(get_session)):
-    data = session.exec(
-        select(
-            func.date(Order.created_at),
-            func.sum(Order.total)
-        )
-        .where(Order.status == "paid")
-        .group_by(func.date(Order.created_at))
-        .order_by(func.date(Order.created_at))
-    ).all()
 
+@router.get("/overview")
+def analytics_overview(
+    window: AnalyticsWindow = Depends(analytics_window),
+    session: Session = Depends(get_read_session),
+):
+    return analytics.overview(session, window)
+
+@router.get("/revenue-chart")
+def revenue_chart(
+    window: AnalyticsWindow = Depends(analytics_window),
+    session: Session = Depends(get_read_session),
+):
     return [
         {"date": str(d), "revenue": total}
-        for d, total in data
+        for d, total in analytics.revenue_series(session, window)
     ]
 
 @router.get("/top-books")
-def top_books(session: Session = Depends(get_session)):
-    data = session.exec(
-        select(
-            OrderItem.book_title,
-            func.sum(OrderItem.quantity).label("sold")
-        )
-        .group_by(OrderItem.book_title)
-        .order_by(func.sum(OrderItem.quantity).desc())
-        .limit(5)
-    ).all()
-
-    return [{"title": t, "sold": s} for t, s in data]
+def top_books(
+    window: AnalyticsWindow = Depends(analytics_window),
+    session: Session = Depends(get_read_session),
+):
+    return [{"title": t, "sold": s} for t, s in analytics.top_books(session, window)]
 
 @router.get("/top-customers")
-def top_customers(session: Session = Depends(get_session)):
-    data = session.exec(
-        select(
-            User.email,
-            func.sum(Order.total).label("spent"),
-            func.count(Order.id).label("orders")
-        )
-        .join(Order, Order.user_id == User.id)
-        .where(Order.status == "paid")
-        .group_by(User.email)
-        .order_by(func.sum(Order.total).desc())
-        .limit(5)
-    ).all()
-
+def top_customers(
+    window: AnalyticsWindow = Depends(analytics_window),
+    session: Session = Depends(get_read_session),
+):
     return [
         {"email": email, "spent": spent, "orders": orders}
-        for email, spent, orders in data
+        for email, spent, orders in analytics.top_customers(session, window)
     ]
 
 @router.get("/category-sales")
-def category_sales(session: Session = Depends(get_session)):
-    data = session.exec(
-        select(
-            Category.name,
-            func.sum(OrderItem.quantity)
-        )
-        .join(Book, Book.category_id == Category.id)
-        .join(OrderItem, OrderItem.book_id == Book.id)
-        .group_by(Category.name)
-    ).all()
-
-    return [{"category": c, "sold": s} for c, s in data]
+def category_sales(
+    window: AnalyticsWindow = Depends(analytics_window),
+    session: Session = Depends(get_read_session),
+):
+    return [{"category": c, "sold": s} for c, s in analytics.category_sales(session, window)]
 
 
 
 @router.get("/export")
-def export_excel(session: Session = Depends(get_session)):
-
-    wb = Workbook()
-    thin = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="4F81BD")
-    center = Alignment(horizontal="center")
-
-    currency = "₹#,##0.00"
-
-    # =========================
-    # Sheet 1 — Overview
-    # =========================
-    ws = wb.active
-    ws.title = "Overview"
-
-    ws.append(["Metric", "Value"])
-
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin
-        cell.alignment = center
-
-    total_revenue = session.exec(
-        select(func.sum(Order.total)).where(Order.status == "paid")
-    ).one() or 0
-
-    total_orders = session.exec(
-        select(func.count(Order.id)).where(Order.status == "paid")
-    ).one() or 0
-
-    avg = total_revenue / total_orders if total_orders else 0
-
-    rows = [
-        ["Total Revenue", total_revenue],
-        ["Total Orders", total_orders],
-        ["Average Order Value", avg],
-    ]
-
-    for r in rows:
-        ws.append(r)
-
-    for row in ws.iter_rows(min_row=2):
-        row[1].number_format = currency
-        for cell in row:
-            cell.border = thin
-            cell.alignment = center
-
-    # =========================
-    # Sheet 2 — Revenue by Day
-    # =========================
-    ws2 = wb.create_sheet("Revenue")
-
-    ws2.append(["Date", "Revenue"])
-
-    for cell in ws2[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin
-        cell.alignment = center
-
-    data = session.exec(
-        select(func.date(Order.created_at), func.sum(Order.total))
-        .where(Order.status == "paid")
-        .group_by(func.date(Order.created_at))
-        .order_by(func.date(Order.created_at))
-    ).all()
-
-    for d, total in data:
-        ws2.append([d, total])
-
-    for row in ws2.iter_rows(min_row=2):
-        row[1].number_format = currency
-        for cell in row:
-            cell.border = thin
-            cell.alignment = center
-
-    # Chart
-    chart = BarChart()
-    chart.title = "Revenue Trend"
-
-    data_ref = Reference(ws2, min_col=2, min_row=1, max_row=len(data)+1)
-    cats = Reference(ws2, min_col=1, min_row=2, max_row=len(data)+1)
-
-    chart.add_data(data_ref, titles_from_data=True)
-    chart.set_categories(cats)
-
-    ws2.add_chart(chart, "D3")
-
-    # =========================
-    # Sheet 3 — Top Books
-    # =========================
-    ws3 = wb.create_sheet("Top Books")
-    ws3.append(["Title", "Units Sold"])
-
-    for cell in ws3[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin
-        cell.alignment = center
-
-    books = session.exec(
-        select(OrderItem.book_title, func.sum(OrderItem.quantity))
-        .group_by(OrderItem.book_title)
-        .order_by(func.sum(OrderItem.quantity).desc())
-        .limit(5)
-    ).all()
-
-    for title, sold in books:
-        ws3.append([title, sold])
-
-    # =========================
-    # Sheet 4 — Top Customers
-    # =========================
-    ws4 = wb.create_sheet("Top Customers")
-    ws4.append(["Email", "Orders", "Total Spent"])
-
-    for cell in ws4[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin
-        cell.alignment = center
-
-    customers = session.exec(
-        select(User.email, func.count(Order.id), func.sum(Order.total))
-        .join(Order, Order.user_id == User.id)
-        .where(Order.status == "paid")
-        .group_by(User.email)
-        .order_by(func.sum(Order.total).desc())
-        .limit(5)
-    ).all()
-
-    for email, orders, spent in customers:
-        ws4.append([email, orders, spent])
-
-    # =========================
-    # Sheet 5 — Category Sales
-    # =========================
-    ws5 = wb.create_sheet("Category Sales")
-    ws5.append(["Category", "Units Sold"])
+def export_analytics(
+    request: Request,
+    format: Literal["xlsx", "csv", "ndjson"] = "xlsx",
+    window: AnalyticsWindow = Depends(analytics_window),
+):
+    """
+    Streamed export of the window. xlsx: summary sheets + orders;
+    csv / ndjson: one row per order.
+    """
+    days = (window.end - window.start).days + 1
+    if days > settings.ANALYTICS_EXPORT_SYNC_MAX_DAYS:
+        raise HTTPException(
+            400,
+            f"Exports over {settings.ANALYTICS_EXPORT_SYNC_MAX_DAYS} days run as a job: "
+            "POST /admin/analytics/export/jobs"
+        )
+    return export_response(read_engine(request), window, format)
 
-    for cell in ws5[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin
-        cell.alignment = center
 
-    categories = session.exec(
-        select(Category.name, func.sum(OrderItem.quantity))
-        .join(Book, Book.category_id == Category.id)
-        .join(OrderItem, OrderItem.book_id == Book.id)
-        .group_by(Category.name)
-    ).all()
+@router.post("/export/jobs", status_code=202)
+def create_export_job(
+    request: Request,
+    format: Literal["xlsx", "csv", "ndjson"] = "xlsx",
+    window: AnalyticsWindow = Depends(analytics_window),
+):
+    job_id = start_export_job(read_engine(request), window, format)
+    return {
+        "job_id": job_id,
+        "status": "running",
+        "status_url": f"/admin/analytics/export/jobs/{job_id}",
+        "download_url": f"/admin/analytics/export/jobs/{job_id}/download",
+    }
 
-    for name, sold in categories:
-        ws5.append([name, sold])
 
-    # =========================
-    # Save file
-    # =========================
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+@router.get("/export/jobs/{job_id}")
+def export_job_status(job_id: str):
+    run = export_job(job_id)
+    return {
+        "job_id": job_id,
+        "status": run.status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "duration_ms": run.duration_ms,
+        "error": run.error,
+    }
 
-    filename = f"analytics_{datetime.utcnow().date()}.xlsx"
 
-    return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+@router.get("/export/jobs/{job_id}/download")
+def download_export(job_id: str):
+    return export_download(job_id)
@@ -0,0 +1,30 @@
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from app.database import read_engine
+from app.models.user import User
+from app.services.finance_export import export_response
+from app.utils.token import get_current_admin
+
+
+router = APIRouter()
+
+
+@router.get("/export/{dataset}")
+def finance_export(
+    request: Request,
+    dataset: Literal["orders", "order_items", "payments", "refunds"],
+    from_: date = Query(..., alias="from", description="first day (UTC)"),
+    to: date = Query(..., description="last day, inclusive (UTC)"),
+    format: Literal["csv", "arrow", "parquet"] = "csv",
+    after_id: int = Query(0, ge=0, description="resume: last id already received"),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Raw rows in id order, streamed from a server-side cursor. Orders and
+    items are dated by the order, payments by creation, refunds by when
+    they were processed. arrow is an Arrow IPC stream.
+    """
+    if from_ > to:
+        raise HTTPException(400, "'from' must not be after 'to'")
+    return export_response(read_engine(request), dataset, from_, to, format, after_id)
@@ -16,6 +16,7 @@ from app.notifications import OrderEvent, dispatch_order_event
 from app.routes.admin import clear_admin_cache
 from app.schemas.offline_order_schemas import OfflineOrderCreate
 from app.services.notification_service import create_notification
+from app.services.invoice_service import invoice_response
 from app.services.r2_helper import to_presigned_url
 from app.utils.pagination import paginate
 from app.utils.token import get_current_admin, get_current_user
@@ -273,55 +274,7 @@ def download_invoice(
     if not order:
         raise HTTPException(404, "Order not found")
 
-    # Create invoices directory if it doesn't exist
-    os.makedirs("invoices", exist_ok=True)
-    file_path = f"invoices/invoice_{order.id}.pdf"
-
-    # Generate PDF if it doesn't exist
-    if not os.path.exists(file_path):
-        generate_invoice_pdf(order, session, file_path)
-
-    return FileResponse(
-        file_path,
-        filename=f"invoice_{order.id}.pdf",
-        media_type="application/pdf"
-    )
-
-def generate_invoice_pdf(order, session, file_path):
-    """
-    Generate invoice PDF
-    """
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    
-    c = canvas.Canvas(file_path, pagesize=letter)
-    
-    # Set up coordinates
-    width, height = letter
-    y_position = height - 50
-    
-    # Title
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(100, y_position, f"Invoice for Order #{order.id}")
-    y_position -= 30
-    
-    # Order details
-    c.setFont("Helvetica", 12)
-    c.drawString(100, y_position, f"Total: ${order.total:.2f}")
-    y_position -= 20
-    c.drawString(100, y_position, f"Date: {order.created_at}")
-    y_position -= 20
-    c.drawString(100, y_position, f"Status: {order.status}")
-    
-    # Get customer info
-    customer = session.get(User, order.user_id)
-    if customer:
-        y_position -= 30
-        c.drawString(100, y_position, f"Customer: {customer.first_name} {customer.last_name}")
-        y_position -= 20
-        c.drawString(100, y_position, f"Email: {customer.email}")
-    
-    c.save()
+    return invoice_response(order, filename=f"invoice_{order.id}.pdf")
 
 # e) Notify Customer
 @router.post("/{order_id}/notify")
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core.rate_limit import limiter
+from app.models.user import User
+from app.utils import profiler
+from app.utils.token import get_current_admin
+
+
+router = APIRouter()
+
+
+def _profile_file(path, profile_id: str) -> FileResponse:
+    return FileResponse(
+        path,
+        media_type="application/json",
+        filename=f"{profile_id}.speedscope.json",
+        headers={"X-Profile-Id": profile_id},
+    )
+
+
+@router.post("/capture")
+@limiter.limit("3/minute")
+async def capture_window(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=settings.PROFILING_MAX_SECONDS),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Sample every thread of the worker that serves this call for `seconds`
+    and return the speedscope file. Only that worker is profiled; with
+    several workers, send the load you want to see while this runs.
+    """
+    try:
+        capture = profiler.begin()
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(429, f"Profiler unavailable: {e}")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.end(capture)
+
+    profile_id = profiler.new_profile_id()
+    path = await run_in_threadpool(profiler.save, capture, profile_id, f"worker window {seconds:g}s")
+    return _profile_file(path, profile_id)
+
+
+@router.get("")
+def list_profiles(admin: User = Depends(get_current_admin)):
+    """Stored profiles on this host, newest first"""
+    return [
+        {"id": profile_id, "bytes": size, "saved_at": datetime.utcfromtimestamp(saved_at).isoformat()}
+        for profile_id, size, saved_at in profiler.list_profiles()
+    ]
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, admin: User = Depends(get_current_admin)):
+    """A speedscope file (open at https://www.speedscope.app)"""
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return _profile_file(path, profile_id)
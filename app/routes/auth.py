@@ -1,30 +1,23 @@
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import Settings
-from app.database import get_session
+from app.database import get_async_session, get_session
 from app.models.user import User
 from app.schemas.user_schemas import UserRegister, UserLogin, Token, UserResponse
 from app.schemas.google_schemas import GoogleTokenRequest
-from app.utils.hash import hash_password, verify_password
-from app.utils.token import create_access_token, decode_access_token
+from app.utils.hash import hash_password, hash_password_async, verify_and_update_async
+from app.utils.token import create_access_token, decode_access_token, token_claims
 from app.utils.google_auth import verify_google_token
 from datetime import timedelta , datetime
 from pydantic import BaseModel
 from random import randint
-from fastapi import BackgroundTasks
-from app.services.email_service import send_email
+from app.services.email_service import enqueue_email
 from app.utils.template import render_template
 from app.config import settings
 from app.core.rate_limit import limiter
 
-def base_context():
-    return {
-        "current_year": datetime.utcnow().year,
-        "store_name": "Hithabodha Bookstore"
-    }
-
-
 router = APIRouter()
 
 
@@ -42,12 +35,11 @@ class ResetPasswordRequest(BaseModel):
 from app.config import settings  # IMPORTANT
 
 @router.post("/register", response_model=UserResponse)
-def register_user(
+async def register_user(
     payload: UserRegister,
-    background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    existing_user = session.exec(select(User).where(User.email == payload.email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == payload.email))).first()
     if existing_user:
         raise HTTPException(400, "Email already registered")
 
@@ -56,25 +48,23 @@ def register_user(
         last_name=payload.last_name,
         username=payload.username,
         email=payload.email,
-        password=hash_password(payload.password)
+        password=await hash_password_async(payload.password)
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     # ---- Admin email ----
     admin_html = render_template(
     "admin_emails/admin_new_user.html",
-    **base_context(),
     email=user.email,
     name=f"{user.first_name} {user.last_name}",
     registered_at=user.created_at.strftime("%Y-%m-%d %H:%M UTC")
     )
 
     for admin_email in settings.ADMIN_EMAILS:
-        background_tasks.add_task(
-            send_email,
+        enqueue_email(
             admin_email,
             "New User Registered",
             admin_html
@@ -86,8 +76,7 @@ def register_user(
     <p>Your account has been created successfully.</p>
     """
 
-    background_tasks.add_task(
-        send_email,
+    enqueue_email(
         user.email,
         "Welcome to Book Store",
         user_html
@@ -104,13 +93,22 @@ def register_user(
 
 @router.post("/login", response_model=Token)
 @limiter.limit("5/minute")
-def login(request: Request,payload: UserLogin, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == payload.email)).first()
+async def login(request: Request,payload: UserLogin, session: AsyncSession = Depends(get_async_session)):
+    user = (await session.exec(select(User).where(User.email == payload.email))).first()
+    if not user:
+        raise HTTPException(401, "Invalid email or password")
 
-    if not user or not verify_password(payload.password, user.password):
+    valid, new_hash = await verify_and_update_async(payload.password, user.password)
+    if not valid:
         raise HTTPException(401, "Invalid email or password")
 
-    token = create_access_token({"user_id": user.id})
+    # stored hash used an older cost factor (PASSWORD_HASH_ROUNDS changed)
+    if new_hash:
+        user.password = new_hash
+        session.add(user)
+        await session.commit()
+
+    token = create_access_token(token_claims(user))
     return Token(access_token=token, token_type="bearer")
 
 from app.utils.google_auth import verify_google_token
@@ -143,7 +141,7 @@ def google_login(
         session.refresh(user)
 
     # return JWT exactly like normal login
-    token = create_access_token({"user_id": user.id})
+    token = create_access_token(token_claims(user))
     return Token(access_token=token, token_type="bearer")
 
 # @router.post("/google", response_model=Token)
@@ -180,7 +178,6 @@ def google_login(
 def forgot_password(
     request: Request,
     payload: ForgotPasswordRequest,
-    background_tasks: BackgroundTasks,
     session: Session = Depends(get_session)
 ):
     user = session.exec(select(User).where(User.email == payload.email)).first()
@@ -198,15 +195,13 @@ def forgot_password(
 
     html = render_template(
     "user_emails/user_reset_password.html",
-    **base_context(),
     first_name=user.first_name,
     reset_url=reset_url,
     username=user.email
 )
 
 
-    background_tasks.add_task(
-        send_email,
+    enqueue_email(
         user.email,
         "Password Reset Code",
         html
@@ -221,10 +216,10 @@ class ResetPasswordByCode(BaseModel):
 
 @router.post("/reset-password")
 @limiter.limit("3/minute")
-def reset_password(
+async def reset_password(
     request: Request,
-    payload: ResetPasswordByCode, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.reset_code == payload.code)).first()
+    payload: ResetPasswordByCode, session: AsyncSession = Depends(get_async_session)):
+    user = (await session.exec(select(User).where(User.reset_code == payload.code))).first()
     
     if not user:
         raise HTTPException(400, "Invalid token")
@@ -232,11 +227,11 @@ def reset_password(
     if user.reset_code_expires < datetime.utcnow():
         raise HTTPException(400, "Token expired")
 
-    user.password = hash_password(payload.new_password)
+    user.password = await hash_password_async(payload.new_password)
     user.reset_code = None
     user.reset_code_expires = None
 
-    session.commit()
+    await session.commit()
 
     return {"message": "Password reset successful"}
 
@@ -3,7 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 import razorpay
 from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_session_factory, get_async_session, get_session
 from app.models.address import Address
 from app.models.book import Book
 from app.models.category import Category
@@ -17,11 +18,10 @@ from app.notifications import OrderEvent, dispatch_order_event
 from app.routes.cart import clear_cart
 from app.schemas.buynow_schemas import BuyNowRequest, BuyNowVerifySchema
 from app.services.order_email_service import send_payment_success_email
-from app.services.payment_service import finalize_payment
+from app.services.payment_service import PaymentNotApplied, finalize_payment
 from app.services.r2_helper import to_presigned_url
-from app.utils.cache_helpers import cached_address_and_cart, cached_my_payments, cached_payment_detail
+from app.utils.cache_helpers import async_lru_cache, cached_address_and_cart, cached_my_payments, cached_payment_detail
 from app.utils.token import get_current_user  # If review model exists
-from functools import lru_cache
 import time
 from sqlalchemy.orm import selectinload
 
@@ -83,31 +83,31 @@ def build_book_detail(book: Book, session: Session):
 # ---------------------------------------------------------
 # 1️⃣ GET BOOK DETAIL BY SLUG
 # ---------------------------------------------------------
-@lru_cache(maxsize=512)
-def _cached_book_detail(book_id: int, bucket: int):
+@async_lru_cache(maxsize=512)
+async def _cached_book_detail(book_id: int, bucket: int):
 
-    with next(get_session()) as session:
-        book = session.exec(
+    async with async_session_factory() as session:
+        book = (await session.exec(
             select(Book)
             .where(Book.id == book_id)
             .options(selectinload(Book.images))
-        ).first()
+        )).first()
 
         if not book:
             return None
 
-        category = session.get(Category, book.category_id)
+        category = await session.get(Category, book.category_id)
 
-        related_books = session.exec(
+        related_books = (await session.exec(
             select(Book)
             .where(Book.category_id == book.category_id, Book.id != book.id)
             .order_by(Book.is_featured.desc())
             .limit(6)
-        ).all()
+        )).all()
 
-        reviews = session.exec(
+        reviews = (await session.exec(
             select(Review).where(Review.book_id == book.id)
-        ).all()
+        )).all()
 
         avg_rating = (
             sum(r.rating for r in reviews) / len(reviews)
@@ -170,25 +170,22 @@ def _cached_book_detail(book_id: int, bucket: int):
         }
 
 @router.get("/detail/{slug}")
-def get_book_detail(slug: str):
-    
-    with next(get_session()) as session:
-        book = session.exec(
-            select(Book)
-            .where(Book.slug == slug)
-            .options(selectinload(Book.images))
-        ).first()
-
-        # 2️⃣ Fallback: try title match
-        if not book:
-            book = session.exec(
-                select(Book).where(Book.title.ilike(f"%{slug.replace('-', ' ')}%"))
-            ).first()
-
-        if not book:
-            raise HTTPException(404, "Book not found")
+async def get_book_detail(slug: str, session: AsyncSession = Depends(get_async_session)):
+    # only the id is needed to key the cached detail
+    book_id = (await session.exec(
+        select(Book.id).where(Book.slug == slug)
+    )).first()
+
+    # 2️⃣ Fallback: try title match
+    if not book_id:
+        book_id = (await session.exec(
+            select(Book.id).where(Book.title.ilike(f"%{slug.replace('-', ' ')}%"))
+        )).first()
+
+    if not book_id:
+        raise HTTPException(404, "Book not found")
 
-        return _cached_book_detail(book.id, _ttl_bucket())
+    return await _cached_book_detail(book_id, _ttl_bucket())
 
 
 
@@ -198,41 +195,42 @@ def get_book_detail(slug: str):
 # /category/fiction/books/detail/the-great-gatsby
 # ---------------------------------------------------------
 @router.get("/category/{category_name}/books/detail/{slug}")
-def get_book_detail_by_category(category_name: str, slug: str):
-
-    with next(get_session()) as session:
-
-        category = session.exec(
-            select(Category).where(Category.name.ilike(f"%{category_name}%"))
-        ).first()
-
-        if not category:
-            raise HTTPException(404, f"Category '{category_name}' not found")
+async def get_book_detail_by_category(
+    category_name: str,
+    slug: str,
+    session: AsyncSession = Depends(get_async_session),
+):
+    category = (await session.exec(
+        select(Category).where(Category.name.ilike(f"%{category_name}%"))
+    )).first()
+
+    if not category:
+        raise HTTPException(404, f"Category '{category_name}' not found")
+
+    # 1️⃣ Try slug
+    book_id = (await session.exec(
+        select(Book.id).where(
+            Book.slug == slug,
+            Book.category_id == category.id
+        )
+    )).first()
 
-        # 1️⃣ Try slug
-        book = session.exec(
-            select(Book).where(
-                Book.slug == slug,
+    # 2️⃣ Fallback title match
+    if not book_id:
+        book_id = (await session.exec(
+            select(Book.id).where(
+                Book.title.ilike(f"%{slug.replace('-', ' ')}%"),
                 Book.category_id == category.id
             )
-        ).first()
+        )).first()
 
-        # 2️⃣ Fallback title match
-        if not book:
-            book = session.exec(
-                select(Book).where(
-                    Book.title.ilike(f"%{slug.replace('-', ' ')}%"),
-                    Book.category_id == category.id
-                )
-            ).first()
-
-        if not book:
-            raise HTTPException(
-                404,
-                f"Book '{slug}' not found under category '{category_name}'"
-            )
+    if not book_id:
+        raise HTTPException(
+            404,
+            f"Book '{slug}' not found under category '{category_name}'"
+        )
 
-        return _cached_book_detail(book.id, _ttl_bucket())
+    return await _cached_book_detail(book_id, _ttl_bucket())
 
 
 @router.post("/buy-now")
@@ -403,17 +401,20 @@ def buy_now_verify_payment(
         raise HTTPException(400, "Payment verification failed")
 
     # Finalize payment
-    payment = finalize_payment(
-        session=session,
-        order=order,
-        txn_id=payload.razorpay_payment_id,
-        amount=order.total,
-        method="razorpay",
-        payment_mode="online",
-        user=current_user,
-        gateway_order_id=payload.razorpay_order_id,
-        gateway_signature=payload.razorpay_signature,
-    )
+    try:
+        payment = finalize_payment(
+            session=session,
+            order=order,
+            txn_id=payload.razorpay_payment_id,
+            amount=order.total,
+            method="razorpay",
+            payment_mode="online",
+            user=current_user,
+            gateway_order_id=payload.razorpay_order_id,
+            gateway_signature=payload.razorpay_signature,
+        )
+    except PaymentNotApplied:
+        raise HTTPException(409, "This order can no longer be paid. Any amount charged will be refunded.")
 
      # Clear cart
     clear_cart(session, current_user.id)
@@ -3,7 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from requests import session
 from slugify import slugify
 from sqlmodel import Session, func, select
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_read_session, get_read_session, get_session
 from app.models.book import Book
 from app.models.category import Category
 from app.services.r2_client import s3_client, R2_BUCKET_NAME
@@ -11,7 +12,7 @@ from functools import lru_cache
 import time
 from fastapi import Query
 from app.services.r2_helper import to_presigned_url
-from app.utils.pagination import paginate
+from app.utils.pagination import apaginate, paginate
 from rapidfuzz import fuzz
 router = APIRouter()
 CACHE_TTL = 60   # 60 minutes
@@ -34,7 +35,7 @@ def quick_search_books(
     query: str = Query(...),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     like = f"%{query.lower()}%"
 
@@ -87,7 +88,7 @@ def advanced_search_books(
     price_max: float | None = None,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     query = select(Book).where(Book.is_deleted == False,Book.is_archived == False)
 
@@ -142,7 +143,7 @@ def advanced_search_books(
 
 
 @router.get("/filter")
-def filter_books(
+async def filter_books(
     category_id: Optional[List[int]] = Query(None),
     category: Optional[str] = None,
     author: Optional[str] = None,
@@ -152,27 +153,22 @@ def filter_books(
     language: Optional[str] = None,
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     query = (
     select(Book, Category)
     .outerjoin(Category, Book.category_id == Category.id)
     .where( Book.is_archived == False,Book.is_deleted == False)
 )
-    base_query = select(Book) 
     # CATEGORY FILTER
-    from sqlalchemy import func
-
     if category:
         category_names = [c.strip().lower() for c in category.split(",")]
 
-        categories = session.exec(
-        select(Category).where(
+        ids = (await session.exec(
+        select(Category.id).where(
             func.trim(func.lower(Category.name)).in_(category_names)
         )
-    ).all()
-
-        ids = [c.id for c in categories]
+    )).all()
 
         if ids:
             query = query.where(Book.category_id.in_(ids))
@@ -199,16 +195,10 @@ def filter_books(
         query = query.where(Book.language.in_(language_list))
 
 
-    # ORDER
+    # ORDER (apaginate adds offset/limit and counts WITH filters)
     query = query.order_by(Book.updated_at.desc())
-    offset = (page - 1) * limit
-    query = query.offset(offset).limit(limit)
 
-    # ✅ total count WITH filters
-    count_query = select(func.count()).select_from(base_query.subquery())
-    total_items = session.exec(count_query).one()
-
-    data = paginate(session=session, query=query, page=page, limit=limit)
+    data = await apaginate(session=session, query=query, page=page, limit=limit)
 
     return {
         "filters": {
@@ -284,7 +274,7 @@ def list_books_by_category_id(
     category_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(12, le=50),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     query = (
         select(Book)
@@ -306,7 +296,7 @@ def list_books_by_category_name(
     page: int = Query(1, ge=1),
     limit: int = Query(12, le=50),
     search: str | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     category = session.exec(
         select(Category).where(Category.name.ilike(category_name))
@@ -360,7 +350,7 @@ def list_books_by_category_name(
 def get_book_in_category(
     category_name: str,
     book_name: str,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     slug = slugify(book_name)
     
@@ -396,7 +386,7 @@ def get_book_in_category(
 @router.get("/id/{book_id}")
 def get_book_by_id(
     book_id: int,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     book = session.get(Book, book_id)
 
@@ -422,7 +412,7 @@ def get_book_by_id(
 # Generate Public URL on the Fly
 
 @router.get("/public-url/{book_id}")
-def get_book_image_url(book_id: int, session: Session = Depends(get_session)):
+def get_book_image_url(book_id: int, session: Session = Depends(get_read_session)):
     book = session.get(Book, book_id)
     if not book or not book.cover_image:
         raise HTTPException(404, "Image not found")
@@ -456,7 +446,7 @@ def dynamic_search_books(
     query: str,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     like = f"%{query.lower()}%"
 
@@ -489,13 +479,13 @@ def dynamic_search_books(
 
 # ---------- LIST ALL BOOKS ----------
 @router.get("")
-def list_books_paginated(
+async def list_books_paginated(
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
     category_id: int | None = None,
     author: str | None = None,
     title: str | None = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     query = select(Book).where(Book.is_deleted == False,
                                Book.is_archived == False)
@@ -513,7 +503,7 @@ def list_books_paginated(
 
     query = query.order_by(Book.updated_at.desc())
 
-    data = paginate(session=session, query=query, page=page, limit=limit)
+    data = await apaginate(session=session, query=query, page=page, limit=limit)
 
     return {
         "total_items": data["total_items"],
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException 
 from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session, get_session
 from app.models import book
 from app.models.cart import CartItem
 from app.models.book import Book
 from app.models.user import User
 from app.schemas.cart_schemas import CartAddRequest, CartUpdateRequest
 from app.services.r2_helper import to_presigned_url
-from app.utils.token import get_current_user  # JWT dependency
+from app.utils.token import get_current_user, get_current_user_async  # JWT dependency
 from app.models.cart import CartItem 
 from datetime import datetime
 
@@ -67,15 +68,15 @@ def add_to_cart(
 # View Cart 
 
 @router.get("/")
-def get_cart(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+async def get_cart(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user_async)
 ):
-    cart_items = session.exec(
+    cart_items = (await session.exec(
         select(CartItem, Book)
         .join(Book, CartItem.book_id == Book.id)
         .where(CartItem.user_id == current_user.id)
-    ).all()
+    )).all()
 
     items_response = []
     subtotal = 0
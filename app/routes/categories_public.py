@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
-from app.database import get_session
+from app.database import get_read_session
 from app.models.category import Category
 from app.models.book import Book
 from functools import lru_cache
@@ -42,7 +42,7 @@ def search_category(
     category_name: str,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     like = f"%{category_name.lower()}%"
 
@@ -98,7 +98,7 @@ def list_books_by_category_id(
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
     search: str | None = Query(None),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ):
     category = session.get(Category, category_id)
     if not category:
@@ -23,7 +23,8 @@ from app.services.email_service import send_order_confirmation
 from app.services.inventory_service import reduce_inventory
 from app.services.email_service import send_email
 from app.services.order_email_service import send_payment_success_email
-from app.services.payment_service import finalize_payment
+from app.services.payment_service import PaymentNotApplied, finalize_payment
+from app.services.invoice_service import invoice_response
 from app.utils.template import render_template
 from app.utils.token import get_current_user
 from app.schemas.address_schemas import AddressCreate
@@ -31,15 +32,10 @@ from app.routes.cart import clear_cart
 from app.models.cart import CartItem
 from app.models.book import Book
 from datetime import datetime, timedelta
-import os
-from reportlab.pdfgen import canvas
-from fastapi.responses import FileResponse
 from app.models.payment import Payment
 from app.config import settings
 from uuid import uuid4
 from app.models.payment import Payment
-from fastapi.responses import FileResponse
-import os
 from app.notifications import dispatch_order_event
 from app.notifications import OrderEvent
 from fastapi import Request
@@ -251,17 +247,20 @@ def verify_guest_payment(
         raise HTTPException(status_code=400, detail="Payment verification failed")
 
     #  Finalize payment (idempotent)
-    payment = finalize_payment(
-        session=session,
-        order=order,
-        txn_id=payload.razorpay_payment_id,
-        amount=order.total,
-        method="razorpay",
-        payment_mode="online",
-        user=None,
-        gateway_order_id=payload.razorpay_order_id,
-        gateway_signature=payload.razorpay_signature,
-    )
+    try:
+        payment = finalize_payment(
+            session=session,
+            order=order,
+            txn_id=payload.razorpay_payment_id,
+            amount=order.total,
+            method="razorpay",
+            payment_mode="online",
+            user=None,
+            gateway_order_id=payload.razorpay_order_id,
+            gateway_signature=payload.razorpay_signature,
+        )
+    except PaymentNotApplied:
+        raise HTTPException(409, "This order can no longer be paid. Any amount charged will be refunded.")
 
     #  Guest confirmation email
     dispatch_order_event(
@@ -360,61 +359,4 @@ def download_guest_invoice(
     if not order or order.placed_by != "guest":
         raise HTTPException(404, "Guest order not found")
 
-    os.makedirs("guest_invoices", exist_ok=True)
-    file_path = f"guest_invoices/invoice_{order.id}.pdf"
-
-    if not os.path.exists(file_path):
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-
-        c = canvas.Canvas(file_path, pagesize=letter)
-        width, height = letter
-        y = height - 50
-
-        c.setFont("Helvetica-Bold", 18)
-        c.drawString(50, y, f"Guest Invoice — Order #{order.id}")
-        y -= 30
-
-        c.setFont("Helvetica", 12)
-        c.drawString(50, y, f"Guest Name: {order.guest_name}")
-        y -= 20
-        c.drawString(50, y, f"Email: {order.guest_email}")
-        y -= 20
-        c.drawString(50, y, f"Date: {order.created_at.strftime('%Y-%m-%d')}")
-        y -= 20
-        c.drawString(50, y, f"Status: {order.status}")
-        y -= 30
-
-        # Order items
-        items = session.exec(
-            select(OrderItem).where(OrderItem.order_id == order.id)
-        ).all()
-
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, y, "Items:")
-        y -= 20
-
-        c.setFont("Helvetica", 11)
-        for item in items:
-            c.drawString(
-                50,
-                y,
-                f"{item.book_title} — {item.quantity} × ₹{item.price} = ₹{item.quantity * item.price}"
-            )
-            y -= 18
-
-        y -= 20
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, y, f"Subtotal: ₹{order.subtotal}")
-        y -= 15
-        c.drawString(50, y, f"Shipping: ₹{order.shipping}")
-        y -= 15
-        c.drawString(50, y, f"Total: ₹{order.total}")
-
-        c.save()
-
-    return FileResponse(
-        file_path,
-        filename=f"guest_invoice_{order.id}.pdf",
-        media_type="application/pdf"
-    )
+    return invoice_response(order, filename=f"guest_invoice_{order.id}.pdf")
@@ -14,7 +14,9 @@ from app.schemas.user_schemas import RazorpayPaymentVerifySchema
 from app.services.email_service import send_order_confirmation
 from app.services.email_service import send_email
 from app.services.payment_expiry import USER_PAYMENT_EXPIRY
-from app.services.payment_service import finalize_payment
+from app.services.payment_history import PaymentFilters, as_dict as payment_as_dict, payments_page
+from app.services.payment_service import PaymentNotApplied, finalize_payment
+from app.services.invoice_service import schedule_invoice
 from app.services.r2_helper import to_presigned_url
 from app.utils.template import render_template
 from app.utils.token import get_current_user
@@ -493,17 +495,20 @@ def verify_razorpay_payment(
 
 
 # Create payment record
-    payment = finalize_payment(
-        session=session,
-        order=order,
-        txn_id=payload.razorpay_payment_id,
-        amount=order.total,
-        method="razorpay",
-        payment_mode="online",
-        user=current_user,
-        gateway_order_id=payload.razorpay_order_id,
-        gateway_signature=payload.razorpay_signature,
-    )
+    try:
+        payment = finalize_payment(
+            session=session,
+            order=order,
+            txn_id=payload.razorpay_payment_id,
+            amount=order.total,
+            method="razorpay",
+            payment_mode="online",
+            user=current_user,
+            gateway_order_id=payload.razorpay_order_id,
+            gateway_signature=payload.razorpay_signature,
+        )
+    except PaymentNotApplied:
+        raise HTTPException(409, "This order can no longer be paid. Any amount charged will be refunded.")
     
 
     # Clear cart
@@ -734,8 +739,10 @@ def complete_payment(
     
     session.add(payment)
     order.status = "paid"
+    order.updated_at = datetime.utcnow()
     session.commit()
 
+    schedule_invoice(order.id)
     clear_cart(session, current_user.id)
     
 
@@ -869,96 +876,22 @@ def list_my_payments(
     payment_type: str | None = None,  # ebook / physical
     min_amount: float | None = None,
     max_amount: float | None = None,
+    cursor: str | None = Query(None, description="next_cursor of the previous page (replaces page)"),
 
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    # -----------------------------
-    # 1️⃣ Physical payments
-    # -----------------------------
-    order_payments = session.exec(
-        select(Payment)
-        .where(Payment.user_id == current_user.id)
-    ).all()
-
-    # -----------------------------
-    # 2️⃣ Ebook payments
-    # -----------------------------
-    ebook_payments = session.exec(
-        select(EbookPayment)
-        .where(EbookPayment.user_id == current_user.id)
-    ).all()
-
-    # -----------------------------
-    # 3️⃣ Normalize payments
-    # -----------------------------
-    combined = []
-
-    for p in order_payments:
-        combined.append({
-            "payment_id": p.id,
-            "txn_id": p.txn_id,
-            "amount": p.amount,
-            "status": p.status,
-            "method": p.method,
-            "created_at": p.created_at,
-            "type": "physical",
-            "order_id": p.order_id,
-            
-        })
-
-    for p in ebook_payments:
-        combined.append({
-            "payment_id": p.id,
-            "txn_id": p.txn_id,
-            "amount": p.amount,
-            "status": p.status,
-            "method": p.method,
-            "created_at": p.created_at,
-            "type": "ebook",
-            "purchase_id": p.ebook_purchase_id,
-        })
-
-    # -----------------------------
-    # 4️⃣ APPLY SEARCH FILTERS
-    # -----------------------------
-    if search:
-        s = search.lower()
-        combined = [
-            p for p in combined
-            if s in (p["txn_id"] or "").lower()
-            or s in p["status"].lower()
-            or s in p["method"].lower()
-            or s in p["type"].lower()
-        ]
-
-    if status:
-        combined = [p for p in combined if p["status"] == status]
-
-    if method:
-        combined = [p for p in combined if p["method"] == method]
-
-    if payment_type:
-        combined = [p for p in combined if p["type"] == payment_type]
-
-    if min_amount is not None:
-        combined = [p for p in combined if p["amount"] >= min_amount]
-
-    if max_amount is not None:
-        combined = [p for p in combined if p["amount"] <= max_amount]
-
-    # -----------------------------
-    # 5️⃣ Sort DESC by date
-    # -----------------------------
-    combined.sort(key=lambda x: x["created_at"], reverse=True)
-
-    # -----------------------------
-    # 6️⃣ Pagination
-    # -----------------------------
-    total_items = len(combined)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated = combined[start:end]
+    filters = PaymentFilters(
+        search=search,
+        status=status,
+        method=method,
+        payment_type=payment_type,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+    total_items, rows, next_cursor = payments_page(
+        session, current_user.id, filters, page, limit, cursor
+    )
 
     return {
         "total_items": total_items,
@@ -974,5 +907,6 @@ def list_my_payments(
             "min_amount": min_amount,
             "max_amount": max_amount,
         },
-        "results": paginated,
+        "results": [payment_as_dict(row) for row in rows],
+        "next_cursor": next_cursor,
     }
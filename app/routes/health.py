@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends
 from sqlmodel import Session, text
 from datetime import datetime
 
-from app.database import get_session
+from app.database import get_session, pool_metrics, replica_monitor
+from app.services.scheduler import job_metrics
+from app.utils.hash import get_password_hasher
 
 router = APIRouter()
 
@@ -21,3 +23,15 @@ def health_check(session: Session = Depends(get_session)):
         "database": db_status,
         "timestamp": datetime.utcnow().isoformat()
     }
+
+
+@router.get("/metrics")
+def metrics():
+    """Per-process runtime metrics (connection pool, replica, password hashing, scheduled jobs)"""
+    return {
+        "pool": pool_metrics(),
+        "replica": replica_monitor.metrics(),
+        "password_hashing": get_password_hasher().metrics(),
+        "jobs": job_metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.utils import metrics as prometheus
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (see app.utils.metrics)"""
+    return Response(prometheus.render(), media_type=prometheus.CONTENT_TYPE)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from typing import Optional
+
+from app.services.razorpay_webhook import (
+    WebhookEvent,
+    get_webhook_processor,
+    verify_signature,
+)
+
+router = APIRouter()
+
+
+@router.post("/razorpay")
+async def razorpay_webhook(
+    request: Request,
+    x_razorpay_signature: Optional[str] = Header(default=None),
+    x_razorpay_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Verify and enqueue only — orders are finalised by the webhook worker,
+    so the acknowledgement never waits on the database.
+    """
+    body = await request.body()
+
+    if not verify_signature(body, x_razorpay_signature):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    queued = get_webhook_processor().enqueue(
+        WebhookEvent(body=body, event_id=x_razorpay_event_id)
+    )
+    if not queued:
+        # Razorpay re-delivers on non-2xx
+        raise HTTPException(status_code=503, detail="Webhook queue full")
+
+    return {"status": "ok"}
@@ -15,7 +15,9 @@ from app.services.email_service import send_order_confirmation
 from app.services.inventory_service import reduce_inventory
 from app.services.email_service import send_email
 from app.services.order_email_service import send_payment_success_email
+from app.services.order_history import get_user_order
 from app.services.payment_service import finalize_payment
+from app.services.invoice_service import invoice_response
 from app.utils.template import render_template
 from app.utils.token import get_current_user
 from app.schemas.address_schemas import AddressCreate
@@ -23,15 +25,10 @@ from app.routes.cart import clear_cart
 from app.models.cart import CartItem
 from app.models.book import Book
 from datetime import datetime, timedelta
-import os
-from reportlab.pdfgen import canvas
-from fastapi.responses import FileResponse
 from app.models.payment import Payment
 from app.config import settings
 from uuid import uuid4
 from app.models.payment import Payment
-from fastapi.responses import FileResponse
-import os
 import time
 from app.utils.cache_helpers import cached_addresses, _ttl_bucket
 
@@ -59,15 +56,11 @@ def track_order(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    order = session.get(Order, order_id)
+    order = get_user_order(session, order_id, current_user.id)
 
-    if not order or order.user_id != current_user.id:
+    if not order:
         raise HTTPException(404, "Order not found")
 
-    items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order.id)
-    ).all()
-
     payment = session.exec(
         select(Payment).where(Payment.order_id == order_id)
     ).first()
@@ -101,7 +94,7 @@ def track_order(
                 "price": i.price,
                 "total": i.price * i.quantity
             }
-            for i in items
+            for i in order.items
         ]
     }
 
@@ -201,59 +194,4 @@ def download_invoice_user(
     if not order or order.user_id != current_user.id:
         raise HTTPException(404, "Order not found")
 
-    items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order.id)
-    ).all()
-
-    user = session.get(User, order.user_id)
-
-    os.makedirs("invoices", exist_ok=True)
-    file_path = f"invoices/_{order.id}.pdf"
-
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-
-    c = canvas.Canvas(file_path, pagesize=letter)
-    width, height = letter
-    y = height - 50
-
-    # Title
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(100, y, f"Invoice #{order.id}")
-    y -= 30
-
-    # Customer Info
-    c.setFont("Helvetica", 12)
-    c.drawString(100, y, f"Customer: {user.first_name} {user.last_name}")
-    y -= 18
-    c.drawString(100, y, f"Email: {user.email}")
-    y -= 18
-    c.drawString(100, y, f"Date: {order.created_at.strftime('%Y-%m-%d')}")
-    y -= 25
-
-    # Items Header
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(100, y, "Items:")
-    y -= 20
-
-    # Items
-    c.setFont("Helvetica", 11)
-    for item in items:
-        line = f"{item.book_title} — ₹{item.price} x {item.quantity} = ₹{item.price * item.quantity}"
-        c.drawString(100, y, line)
-        y -= 15
-
-    # Totals
-    y -= 20
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(100, y, f"Total: ₹{order.total}")
-    y -= 20
-    c.drawString(100, y, f"Status: {order.status}")
-
-    c.save()
-
-    return FileResponse(
-        file_path,
-        filename=f"invoice_{order.id}.pdf",
-        media_type="application/pdf"
-    )
+    return invoice_response(order, filename=f"invoice_{order.id}.pdf")
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Form, File, Query, UploadFile, HTTPException
 from typing import Optional
 from sqlmodel import Session, select
-from app.database import get_session
+from app.database import async_session_factory, get_session
 from app.models.book import Book
 from app.models.category import Category
 from app.models.notifications import Notification
@@ -9,11 +9,12 @@ from app.models.order_item import OrderItem
 from app.models.user import User
 from app.models.order import Order
 from app.models.address import Address
+from app.utils.cache_helpers import async_lru_cache
 from app.utils.token import get_current_admin, get_current_user
 import os
 from app.schemas.address_schemas import AddressCreate
+from app.services.order_history import get_user_order, history_page
 from app.services.r2_helper import to_presigned_url, upload_profile_image, delete_r2_file
-from functools import lru_cache
 import time
 from app.utils.pagination import paginate
 
@@ -97,14 +98,9 @@ def update_user_profile(
 
 
 
-@lru_cache(maxsize=128)
-def _cached_home(bucket: int):
-    from app.database import get_session
-    from app.models.book import Book
-    from app.models.category import Category
-    from sqlmodel import select
-
-    with next(get_session()) as session:
+@async_lru_cache(maxsize=128)
+async def _cached_home(bucket: int):
+    async with async_session_factory() as session:
         def serialize(b):
             return {
                 "book_id": b.id,
@@ -118,38 +114,24 @@ def _cached_home(bucket: int):
                 "rating": b.rating,
             }
 
+        async def books(query):
+            return [serialize(b) for b in (await session.exec(query.limit(12))).all()]
+
+        visible = select(Book).where(
+            Book.is_archived == False,
+            Book.is_deleted == False
+        )
+
         return {
-            "featured_books": [serialize(b) for b in session.exec(
-                select(Book).where(
-                Book.is_featured == True,
-                Book.is_archived == False,
-                Book.is_deleted == False
-            ).limit(12)
-            ).all()],
-
-            "featured_authors_books": [serialize(b) for b in session.exec(
-                select(Book).where(
-                Book.is_featured_author == True,
-                Book.is_archived == False,
-                Book.is_deleted == False
-            ).limit(12)
-            ).all()],
-
-            
-            "new_arrivals": [serialize(b) for b in session.exec(
-                select(Book).where(
-                Book.is_archived == False,
-                Book.is_deleted == False
-                ).order_by(Book.published_date.desc()).limit(12)
-            ).all()],
-
-            "popular_books": [serialize(b) for b in session.exec(
-                select(Book).where(
-                    Book.is_archived == False,
-                    Book.is_deleted == False
-                ).order_by(Book.rating.desc()).limit(12)
-            ).all()],
-            "categories": session.exec(select(Category)).all()
+            "featured_books": await books(visible.where(Book.is_featured == True)),
+
+            "featured_authors_books": await books(visible.where(Book.is_featured_author == True)),
+
+            "new_arrivals": await books(visible.order_by(Book.published_date.desc())),
+
+            "popular_books": await books(visible.order_by(Book.rating.desc())),
+
+            "categories": (await session.exec(select(Category))).all()
         }
 
 
@@ -170,27 +152,11 @@ def get_order_history(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    query = (
-        select(Order)
-        .where(Order.user_id == current_user.id)
-        .order_by(Order.created_at.desc())
-    )
-
-    data = paginate(
-    session=session,
-    query=query,
-    page=page,
-    limit=limit
-)
-
+    data = history_page(session, current_user.id, page, limit)
 
     results = []
 
-    for o in data["results"]:
-        items = session.exec(
-            select(OrderItem).where(OrderItem.order_id == o.id)
-        ).all()
-
+    for o, items in data["results"]:
         results.append({
             "order_id": f"#{o.id}",
             "customer_name": f"{current_user.first_name} {current_user.last_name}",
@@ -325,25 +291,21 @@ def get_order_details(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    order = session.get(Order, order_id)
+    order = get_user_order(session, order_id, current_user.id)
 
-    if not order or order.user_id != current_user.id:
+    if not order:
         raise HTTPException(404, "Order not found")
 
-    items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order_id)
-    ).all()
-
     return {
         "order": order,
-        "items": items
+        "items": order.items
     }
 
 
 
 @router.get("/home")
-def home_page():
-    return _cached_home(_ttl_bucket())
+async def home_page():
+    return await _cached_home(_ttl_bucket())
 
 
 @router.get("/notifications")
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func
-from app.database import get_session
+from app.database import async_session_factory, get_session
 from app.models.wishlist import Wishlist
 from app.models.book import Book
 from app.models.user import User
 from app.services.r2_helper import to_presigned_url
-from app.utils.token import get_current_user
+from app.utils.cache_helpers import async_lru_cache
+from app.utils.token import get_current_user, get_current_user_async
 from functools import lru_cache
 import time
 
@@ -24,19 +25,18 @@ def _wishlist_cache_key(user_id: int):
 # ---------------------------------------------------------
 # Cached Wishlist Items
 # ---------------------------------------------------------
-@lru_cache(maxsize=512)
-def _cached_wishlist(user_id: int, bucket: int):
-    with next(get_session()) as session:
-        wishlist_items = session.exec(
-            select(Wishlist).where(Wishlist.user_id == user_id)
-        ).all()
+@async_lru_cache(maxsize=512)
+async def _cached_wishlist(user_id: int, bucket: int):
+    async with async_session_factory() as session:
+        # books joined in (one round trip, not one per item)
+        wishlist_items = (await session.exec(
+            select(Wishlist, Book)
+            .join(Book, Book.id == Wishlist.book_id)
+            .where(Wishlist.user_id == user_id)
+        )).all()
 
         response = []
-        for w in wishlist_items:
-            book = session.get(Book, w.book_id)
-            if not book:
-                continue
-
+        for w, book in wishlist_items:
             response.append({
                 "wishlist_id": w.id,
                 "book_id": book.id,
@@ -55,8 +55,8 @@ def _cached_wishlist(user_id: int, bucket: int):
 # Get Wishlist
 # ---------------------------------------------------------
 @router.get("/")
-def get_wishlist(current_user: User = Depends(get_current_user)):
-    return _cached_wishlist(*_wishlist_cache_key(current_user.id))
+async def get_wishlist(current_user: User = Depends(get_current_user_async)):
+    return await _cached_wishlist(*_wishlist_cache_key(current_user.id))
 
 
 # ---------------------------------------------------------
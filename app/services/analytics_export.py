@@ -0,0 +1,432 @@
+# app/services/analytics_export.py
+"""
+/admin/analytics/export.
+
+CSV and NDJSON hold the window's orders, one row each. They are streamed
+as they are read: keyset batches of ANALYTICS_EXPORT_BATCH_SIZE, and each
+batch checks out its own connection, so a slow client never keeps a
+transaction open. XLSX adds the summary sheets and is written with
+openpyxl's write_only workbook (rows go straight to disk). A zip can't be
+sent before it is finished, so it is built into a temp file, then
+streamed in chunks.
+
+Windows longer than ANALYTICS_EXPORT_SYNC_MAX_DAYS go through export
+jobs: built in a small worker pool, tracked in `job_run`, stored in R2
+under ``exports/`` (with a local copy) and downloaded when ready from any
+worker. The files hold customer emails, so expire_exports (a scheduler
+job) deletes them from R2 and disk after ANALYTICS_EXPORT_RETENTION_HOURS,
+and fails builds a stopped worker left "running".
+"""
+import csv
+import io
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.chart import BarChart, Reference
+from openpyxl.styles import Alignment, Font, PatternFill
+from sqlalchemy import func, tuple_, update
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.database import engine
+from app.models.job_run import JobRun
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.user import User
+from app.services import analytics_rollup as analytics
+from app.services.analytics_rollup import COUNTED_STATUSES, AnalyticsWindow
+from app.services.r2_client import R2_BUCKET_NAME, s3_client
+
+logger = logging.getLogger(__name__)
+
+R2_PREFIX = "exports"
+LOCAL_DIR = Path(tempfile.gettempdir()) / "hithabodha_exports"
+LOCAL_DIR.mkdir(parents=True, exist_ok=True)
+CHUNK_SIZE = 64 * 1024
+JOB_PREFIX = "analytics_export:"
+HOST = f"{socket.gethostname()}:{os.getpid()}"
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+ORDER_COLUMNS = ["order_id", "placed_at", "status", "customer", "items", "subtotal", "shipping", "total"]
+_TOKEN = re.compile(r"^[0-9a-f]{32}\.(xlsx|csv|ndjson)$")
+
+_pool = ThreadPoolExecutor(
+    max_workers=settings.ANALYTICS_EXPORT_WORKERS, thread_name_prefix="export-worker"
+)
+
+
+# ---------------------------------------------------------
+# Rows
+# ---------------------------------------------------------
+def iter_order_batches(bind, window: AnalyticsWindow) -> Iterator[List[list]]:
+    """Counted orders in the window, oldest first, keyset-paginated"""
+    start, end = window.utc_bounds()
+    zone = ZoneInfo(window.tz)
+    after = None  # (created_at, id) of the last row sent
+
+    while True:
+        query = (
+            select(
+                Order.id,
+                Order.created_at,
+                Order.status,
+                func.coalesce(User.email, Order.guest_email),
+                Order.subtotal,
+                Order.shipping,
+                Order.total,
+            )
+            .outerjoin(User, User.id == Order.user_id)
+            .where(
+                Order.status.in_(COUNTED_STATUSES),
+                Order.created_at >= start,
+                Order.created_at < end,
+            )
+            .order_by(Order.created_at, Order.id)
+            .limit(settings.ANALYTICS_EXPORT_BATCH_SIZE)
+        )
+        if after is not None:
+            query = query.where(tuple_(Order.created_at, Order.id) > tuple_(*after))
+
+        with Session(bind) as session:
+            orders = session.exec(query).all()
+            if not orders:
+                return
+            units = dict(
+                session.exec(
+                    select(OrderItem.order_id, func.sum(OrderItem.quantity))
+                    .where(OrderItem.order_id.in_([o[0] for o in orders]))
+                    .group_by(OrderItem.order_id)
+                ).all()
+            )
+
+        yield [
+            [
+                order_id,
+                created_at.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None),
+                status,
+                customer,
+                int(units.get(order_id, 0)),
+                subtotal,
+                shipping,
+                total,
+            ]
+            for order_id, created_at, status, customer, subtotal, shipping, total in orders
+        ]
+        after = orders[-1][1], orders[-1][0]
+
+
+def iter_csv(bind, window: AnalyticsWindow) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ORDER_COLUMNS)
+
+    for batch in iter_order_batches(bind, window):
+        writer.writerows(
+            [row[:1] + [row[1].isoformat(sep=" ")] + row[2:] for row in batch]
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # header only: no orders in the window
+
+
+def iter_ndjson(bind, window: AnalyticsWindow) -> Iterator[bytes]:
+    for batch in iter_order_batches(bind, window):
+        yield "".join(
+            json.dumps(dict(zip(ORDER_COLUMNS, row)), default=str) + "\n" for row in batch
+        ).encode()
+
+
+# ---------------------------------------------------------
+# Workbook
+# ---------------------------------------------------------
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill("solid", fgColor="4F81BD")
+_CENTER = Alignment(horizontal="center")
+_CURRENCY = "₹#,##0.00"
+
+
+def _header(ws, *titles):
+    cells = []
+    for title in titles:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font, cell.fill, cell.alignment = _HEADER_FONT, _HEADER_FILL, _CENTER
+        cells.append(cell)
+    ws.append(cells)
+
+
+def _money(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.number_format = _CURRENCY
+    return cell
+
+
+def write_xlsx(bind, window: AnalyticsWindow, path: Path):
+    wb = Workbook(write_only=True)
+
+    with Session(bind) as session:
+        overview = analytics.overview(session, window)
+        series = analytics.revenue_series(session, window)
+        books = analytics.top_books(session, window)
+        customers = analytics.top_customers(session, window)
+        categories = analytics.category_sales(session, window)
+
+    ws = wb.create_sheet("Overview")
+    _header(ws, "Metric", "Value")
+    ws.append(["From", str(window.start)])
+    ws.append(["To", str(window.end)])
+    ws.append(["Total Revenue", _money(ws, overview["revenue"])])
+    ws.append(["Total Orders", overview["orders"]])
+    ws.append(["Average Order Value", _money(ws, overview["avg_order_value"])])
+
+    ws = wb.create_sheet("Revenue")
+    _header(ws, "Date", "Revenue")
+    for bucket, revenue in series:
+        ws.append([bucket, _money(ws, revenue)])
+    chart = BarChart()
+    chart.title = "Revenue Trend"
+    chart.add_data(Reference(ws, min_col=2, min_row=1, max_row=len(series) + 1), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=1, min_row=2, max_row=len(series) + 1))
+    ws.add_chart(chart, "D3")
+
+    ws = wb.create_sheet("Top Books")
+    _header(ws, "Title", "Units Sold")
+    for title, sold in books:
+        ws.append([title, sold])
+
+    ws = wb.create_sheet("Top Customers")
+    _header(ws, "Email", "Orders", "Total Spent")
+    for email, spent, orders in customers:
+        ws.append([email, orders, _money(ws, spent)])
+
+    ws = wb.create_sheet("Category Sales")
+    _header(ws, "Category", "Units Sold")
+    for name, sold in categories:
+        ws.append([name, sold])
+
+    ws = wb.create_sheet("Orders")
+    _header(ws, *ORDER_COLUMNS)
+    for batch in iter_order_batches(bind, window):
+        for row in batch:
+            ws.append(row[:5] + [_money(ws, value) for value in row[5:]])
+
+    wb.save(path)
+
+
+def _iter_file(path: Path, delete: bool) -> Iterator[bytes]:
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+    finally:
+        if delete:
+            path.unlink(missing_ok=True)
+
+
+def export_filename(window: AnalyticsWindow, fmt: str) -> str:
+    return f"analytics_{window.start}_{window.end}.{fmt}"
+
+
+def export_response(bind, window: AnalyticsWindow, fmt: str) -> StreamingResponse:
+    if fmt == "csv":
+        body = iter_csv(bind, window)
+    elif fmt == "ndjson":
+        body = iter_ndjson(bind, window)
+    else:
+        fd, name = tempfile.mkstemp(suffix=".xlsx", dir=LOCAL_DIR)
+        os.close(fd)
+        path = Path(name)
+        try:
+            write_xlsx(bind, window, path)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        body = _iter_file(path, delete=True)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(window, fmt)}"'},
+    )
+
+
+# ---------------------------------------------------------
+# Jobs (prepare, then download)
+# ---------------------------------------------------------
+def _build(run_id: int, token: str, bind, window: AnalyticsWindow):
+    fmt = token.rsplit(".", 1)[1]
+    path = LOCAL_DIR / token
+    tmp = path.with_suffix(".tmp")
+    started = time.perf_counter()
+    error = None
+
+    try:
+        if fmt == "xlsx":
+            write_xlsx(bind, window, tmp)
+        else:
+            chunks = iter_csv(bind, window) if fmt == "csv" else iter_ndjson(bind, window)
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(tmp, path)
+
+        s3_client.upload_file(
+            str(path),
+            R2_BUCKET_NAME,
+            f"{R2_PREFIX}/{token}",
+            ExtraArgs={"ContentType": MEDIA_TYPES[fmt]},
+        )
+        status = "success"
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        status, error = "failed", str(e)
+        logger.exception(f"Analytics export {token} failed")
+
+    with Session(engine) as session:
+        run = session.get(JobRun, run_id)
+        run.status = status
+        run.finished_at = datetime.utcnow()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        run.error = error
+        session.commit()
+
+    logger.info(f"Analytics export {token} {status}")
+    _prune_local()
+
+
+def _prune_local():
+    cutoff = time.time() - settings.ANALYTICS_EXPORT_RETENTION_HOURS * 3600
+    for path in LOCAL_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def start_export_job(bind, window: AnalyticsWindow, fmt: str) -> str:
+    token = f"{uuid4().hex}.{fmt}"
+    with Session(engine) as session:
+        run = JobRun(job_id=JOB_PREFIX + token, host=HOST)
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+
+    _pool.submit(_build, run.id, token, bind, window)
+    return token
+
+
+def export_job(token: str) -> JobRun:
+    if not _TOKEN.match(token):
+        raise HTTPException(404, "Export not found")
+
+    with Session(engine) as session:
+        run = session.exec(select(JobRun).where(JobRun.job_id == JOB_PREFIX + token)).first()
+    if not run:
+        raise HTTPException(404, "Export not found")
+    return run
+
+
+def export_download(token: str, filename: Optional[str] = None):
+    run = export_job(token)
+    if run.status == "expired":
+        raise HTTPException(410, "Export has expired, start a new one")
+    if run.status != "success":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Export is {run.status}",
+            headers={"Retry-After": "5"} if run.status == "running" else None,
+        )
+
+    fmt = token.rsplit(".", 1)[1]
+    filename = filename or f"analytics_export_{token}"
+    path = LOCAL_DIR / token
+    if path.exists():
+        return FileResponse(path, filename=filename, media_type=MEDIA_TYPES[fmt])
+
+    def iter_r2() -> Iterator[bytes]:
+        body = s3_client.get_object(Bucket=R2_BUCKET_NAME, Key=f"{R2_PREFIX}/{token}")["Body"]
+        try:
+            for chunk in body.iter_chunks(chunk_size=CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    return StreamingResponse(
+        iter_r2(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ---------------------------------------------------------
+# Retention (scheduler job)
+# ---------------------------------------------------------
+def _delete_r2_exports(cutoff: datetime) -> int:
+    """Delete export objects last modified before `cutoff` (aware, UTC)"""
+    keys = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=R2_BUCKET_NAME, Prefix=f"{R2_PREFIX}/"):
+        keys += [obj["Key"] for obj in page.get("Contents", []) if obj["LastModified"] < cutoff]
+    for i in range(0, len(keys), 1000):  # DeleteObjects takes 1000 keys per call
+        s3_client.delete_objects(
+            Bucket=R2_BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True},
+        )
+    return len(keys)
+
+
+def expire_exports():
+    now = datetime.utcnow()
+    cutoff = now - timedelta(hours=settings.ANALYTICS_EXPORT_RETENTION_HOURS)
+
+    with Session(engine) as session:
+        # a worker that died mid-build never records its outcome
+        stale = session.execute(
+            update(JobRun)
+            .where(
+                JobRun.job_id.startswith(JOB_PREFIX),
+                JobRun.status == "running",
+                JobRun.started_at < now - timedelta(minutes=settings.ANALYTICS_EXPORT_TIMEOUT_MINUTES),
+            )
+            .values(status="failed", finished_at=now, error="Build did not finish (worker stopped or timed out)")
+        ).rowcount
+        session.commit()
+
+    # objects first: the rows only say "expired" once the files are gone
+    deleted = _delete_r2_exports(cutoff.replace(tzinfo=timezone.utc))
+    with Session(engine) as session:
+        expired = session.execute(
+            update(JobRun)
+            .where(
+                JobRun.job_id.startswith(JOB_PREFIX),
+                JobRun.status == "success",
+                JobRun.finished_at < cutoff,
+            )
+            .values(status="expired")
+        ).rowcount
+        session.commit()
+    _prune_local()
+
+    if stale or deleted or expired:
+        logger.info(f"Analytics exports: {stale} stale builds failed, {expired} expired, {deleted} R2 objects deleted")
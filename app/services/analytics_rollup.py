@@ -0,0 +1,518 @@
+# app/services/analytics_rollup.py
+"""
+Incrementally maintained rollups for /admin/analytics.
+
+Sales are bucketed by the day the order was placed (as the revenue chart
+always did). Whenever an order's status changes, the days it falls on are
+rebuilt after the transaction commits. The rebuild recomputes those days
+from `order` / `orderitem` instead of applying deltas, so webhook retries,
+double callbacks and out-of-order refunds can't skew the totals. Status
+changes made with Core UPDATEs (finalize_payment) are reported explicitly
+with mark_dirty().
+
+The rebuild never runs on the committing (payment / refund) thread: the
+days are handed to a background RollupRefresher, which batches them for
+REFRESH_DELAY seconds and skips a round (keeping the days) while another
+worker holds the rebuild lock.
+
+A scheduler job re-derives the last ROLLUP_RECONCILE_DAYS days as a safety
+net. The read helpers (AnalyticsWindow, overview, revenue_series, ...)
+serve /admin/analytics and its export. History is (re)built with the backfill command:
+
+    uv run python -m app.services.analytics_rollup --since 2024-01-01
+"""
+import argparse
+import logging
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    Date, DateTime, Float, FromClause, Integer, and_, case, cast, delete, event, func, insert, inspect, literal,
+    literal_column, text,
+)
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.database import engine
+from app.models.analytics_rollup import DailyBookSales, DailyCategorySales, DailyCustomerSales, DailySales
+from app.models.book import Book
+from app.models.cancellation import CancellationRequest
+from app.models.category import Category
+from app.models.order import Order, OrderStatus
+from app.models.order_item import OrderItem
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# orders that count as sales: paid and not (fully) refunded / cancelled
+COUNTED_STATUSES = (
+    OrderStatus.PAID,
+    OrderStatus.PROCESSING,
+    OrderStatus.SHIPPED,
+    OrderStatus.DELIVERED,
+    OrderStatus.PARTIALLY_REFUNDED,
+)
+
+ROLLUPS = (DailySales, DailyBookSales, DailyCategorySales, DailyCustomerSales)
+BACKFILL_CHUNK_DAYS = 31
+_LOCK_KEY = zlib.crc32(b"analytics:rollup")
+_DIRTY_DAYS = "analytics_dirty_days"
+REFRESH_DELAY = 2.0  # seconds dirty days are gathered before a rebuild
+
+
+# ---------------------------------------------------------
+# Aggregates (shared by the rebuild and live, non-UTC reads)
+# ---------------------------------------------------------
+def _counted(start: datetime, end: datetime):
+    # (status, created_at) range: ix_order_status_created_at
+    return and_(
+        Order.status.in_(COUNTED_STATUSES),
+        Order.created_at >= start,
+        Order.created_at < end,
+    )
+
+
+def _sales(day, where):
+    # looked up (ix_cancellationrequest_order_id) only for partially refunded orders
+    refunded = (
+        select(func.coalesce(func.sum(CancellationRequest.refund_amount), 0))
+        .where(
+            CancellationRequest.order_id == Order.id,
+            CancellationRequest.status == "refunded",
+        )
+        .correlate(Order)
+        .scalar_subquery()
+    )
+    partial_refund = case(
+        (Order.status == OrderStatus.PARTIALLY_REFUNDED, cast(refunded, Float)),
+        else_=0.0,
+    )
+    return (
+        select(
+            day.label("day"),
+            func.count(Order.id).label("orders"),
+            func.sum(Order.total).label("revenue"),
+            func.coalesce(func.sum(partial_refund), 0.0).label("refunded"),
+        )
+        .where(where)
+        .group_by(day)
+    )
+
+
+def _book_sales(day, where):
+    return (
+        select(
+            day.label("day"),
+            OrderItem.book_id,
+            func.max(OrderItem.book_title).label("book_title"),
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.price * OrderItem.quantity).label("revenue"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(where)
+        .group_by(day, OrderItem.book_id)
+    )
+
+
+def _category_sales(day, where):
+    return (
+        select(
+            day.label("day"),
+            Book.category_id,
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.price * OrderItem.quantity).label("revenue"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Book, Book.id == OrderItem.book_id)
+        .where(where)
+        .group_by(day, Book.category_id)
+    )
+
+
+def _customer_sales(day, where):
+    return (
+        select(
+            day.label("day"),
+            Order.user_id,
+            func.count(Order.id).label("orders"),
+            func.sum(Order.total).label("spent"),
+        )
+        .where(where, Order.user_id.is_not(None))
+        .group_by(day, Order.user_id)
+    )
+
+
+def utc_midnight(tz: str, d: date) -> datetime:
+    """Start of local day `d` in `tz`, as naive UTC"""
+    local_midnight = datetime.combine(d, time.min, tzinfo=ZoneInfo(tz))
+    return local_midnight.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class Sources:
+    """Selectables shaped like the four rollup tables (day, ... columns)"""
+    sales: FromClause
+    books: FromClause
+    categories: FromClause
+    customers: FromClause
+
+
+def sources(tz: str, start: date, end: date) -> Sources:
+    """
+    Daily figures for local days [start, end) in `tz`. UTC is served by
+    the rollup tables; any other zone is aggregated from `order` for just
+    that window, since the stored days are UTC days.
+    """
+    if tz == "UTC":
+        return Sources(
+            DailySales.__table__,
+            DailyBookSales.__table__,
+            DailyCategorySales.__table__,
+            DailyCustomerSales.__table__,
+        )
+
+    # created_at is naive UTC
+    day = cast(func.timezone(tz, func.timezone("UTC", Order.created_at)), Date)
+    where = _counted(utc_midnight(tz, start), utc_midnight(tz, end))
+    return Sources(
+        _sales(day, where).subquery("sales"),
+        _book_sales(day, where).subquery("books"),
+        _category_sales(day, where).subquery("categories"),
+        _customer_sales(day, where).subquery("customers"),
+    )
+
+
+# ---------------------------------------------------------
+# Reads (/admin/analytics)
+# ---------------------------------------------------------
+@dataclass
+class AnalyticsWindow:
+    start: date  # inclusive, local days in tz
+    end: date  # inclusive
+    granularity: str
+    tz: str
+
+    def sources(self) -> Sources:
+        return sources(self.tz, self.start, self.end + timedelta(days=1))
+
+    def covers(self, table):
+        return and_(table.c.day >= self.start, table.c.day <= self.end)
+
+    def utc_bounds(self) -> Tuple[datetime, datetime]:
+        """[start, end + 1 day) as naive UTC datetimes, for `order` columns"""
+        return utc_midnight(self.tz, self.start), utc_midnight(self.tz, self.end + timedelta(days=1))
+
+
+
+def overview(session: Session, window: AnalyticsWindow) -> dict:
+    sales = window.sources().sales
+    revenue, orders = session.exec(
+        select(
+            func.sum(sales.c.revenue - sales.c.refunded),
+            cast(func.sum(sales.c.orders), Integer),
+        )
+        .where(window.covers(sales))
+    ).one()
+
+    return {
+        "revenue": revenue or 0,
+        "orders": orders or 0,
+        "avg_order_value": revenue / orders if orders else 0
+    }
+
+
+def revenue_series(session: Session, window: AnalyticsWindow):
+    """(bucket start, revenue) for every bucket in the window, zeros included"""
+    sales = window.sources().sales
+    unit = literal_column(f"'{window.granularity}'")  # validated Literal; inline so GROUP BY matches
+    bucket = cast(func.date_trunc(unit, sales.c.day), Date)
+
+    totals = (
+        select(bucket.label("bucket"), func.sum(sales.c.revenue - sales.c.refunded).label("revenue"))
+        .where(window.covers(sales))
+        .group_by(bucket)
+        .subquery()
+    )
+    buckets = select(
+        cast(
+            func.generate_series(
+                func.date_trunc(unit, cast(window.start, DateTime)),
+                cast(window.end, DateTime),
+                literal_column(f"interval '1 {window.granularity}'"),
+            ),
+            Date,
+        ).label("bucket")
+    ).subquery()
+
+    return session.exec(
+        select(buckets.c.bucket, func.coalesce(totals.c.revenue, 0.0))
+        .outerjoin(totals, totals.c.bucket == buckets.c.bucket)
+        .order_by(buckets.c.bucket)
+    ).all()
+
+
+def top_books(session: Session, window: AnalyticsWindow, limit: int = 5):
+    books = window.sources().books
+    return session.exec(
+        select(
+            func.max(books.c.book_title),
+            cast(func.sum(books.c.units), Integer).label("sold")
+        )
+        .where(window.covers(books))
+        .group_by(books.c.book_id)
+        .order_by(func.sum(books.c.units).desc())
+        .limit(limit)
+    ).all()
+
+
+def top_customers(session: Session, window: AnalyticsWindow, limit: int = 5):
+    customers = window.sources().customers
+    return session.exec(
+        select(
+            User.email,
+            func.sum(customers.c.spent).label("spent"),
+            cast(func.sum(customers.c.orders), Integer).label("orders")
+        )
+        .join(User, User.id == customers.c.user_id)
+        .where(window.covers(customers))
+        .group_by(User.email)
+        .order_by(func.sum(customers.c.spent).desc())
+        .limit(limit)
+    ).all()
+
+
+def category_sales(session: Session, window: AnalyticsWindow):
+    categories = window.sources().categories
+    return session.exec(
+        select(
+            Category.name,
+            cast(func.sum(categories.c.units), Integer)
+        )
+        .join(Category, Category.id == categories.c.category_id)
+        .where(window.covers(categories))
+        .group_by(Category.name)
+    ).all()
+
+
+# ---------------------------------------------------------
+# Rebuild
+# ---------------------------------------------------------
+def refresh_range(session: Session, start: date, end: date):
+    """Rebuild every rollup row for days in [start, end). Caller commits."""
+    # one rebuild at a time, so two commits touching the same day can't
+    # both delete and then both insert
+    session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+
+    for model in ROLLUPS:
+        session.execute(delete(model).where(model.day >= start, model.day < end))
+
+    day = cast(Order.created_at, Date)
+    counted = _counted(start, end)
+
+    session.execute(
+        insert(DailySales).from_select(
+            ["day", "orders", "revenue", "refunded", "refreshed_at"],
+            _sales(day, counted).add_columns(literal(datetime.utcnow())),
+        )
+    )
+    session.execute(
+        insert(DailyBookSales).from_select(
+            ["day", "book_id", "book_title", "units", "revenue"],
+            _book_sales(day, counted),
+        )
+    )
+    session.execute(
+        insert(DailyCategorySales).from_select(
+            ["day", "category_id", "units", "revenue"],
+            _category_sales(day, counted),
+        )
+    )
+    session.execute(
+        insert(DailyCustomerSales).from_select(
+            ["day", "user_id", "orders", "spent"],
+            _customer_sales(day, counted),
+        )
+    )
+
+
+def refresh_days(days: Iterable[date], wait: bool = True) -> bool:
+    """Rebuild the given days; with wait=False, returns False if another rebuild holds the lock"""
+    days = sorted(set(days))
+    if not days:
+        return True
+    with Session(engine) as session:
+        if not wait and not session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+        ).scalar():
+            return False
+        for d in days:
+            refresh_range(session, d, d + timedelta(days=1))
+        session.commit()
+    logger.info(f"Analytics rollups refreshed for {', '.join(map(str, days))}")
+    return True
+
+
+def backfill(since: Optional[date] = None, until: Optional[date] = None):
+    """Rebuild [since, until] in BACKFILL_CHUNK_DAYS transactions"""
+    if since is None:
+        with Session(engine) as session:
+            first_order = session.exec(select(func.min(Order.created_at))).one()
+        if first_order is None:
+            logger.info("No orders, nothing to backfill")
+            return
+        since = first_order.date()
+
+    start = since
+    end = (until or datetime.utcnow().date()) + timedelta(days=1)
+
+    while start < end:
+        chunk_end = min(start + timedelta(days=BACKFILL_CHUNK_DAYS), end)
+        with Session(engine) as session:
+            refresh_range(session, start, chunk_end)
+            session.commit()
+        logger.info(f"Analytics rollups rebuilt for {start} .. {chunk_end - timedelta(days=1)}")
+        start = chunk_end
+
+
+def reconcile_recent():
+    """Scheduler safety net: re-derive the most recent days"""
+    today = datetime.utcnow().date()
+    refresh_days(today - timedelta(days=n) for n in range(settings.ROLLUP_RECONCILE_DAYS))
+
+
+# ---------------------------------------------------------
+# Change capture
+# ---------------------------------------------------------
+def mark_dirty(session: Session, order: Order):
+    """Rebuild the order's day once `session` commits"""
+    session.info.setdefault(_DIRTY_DAYS, set()).add(order.created_at.date())
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target):
+    # offline / COD orders can be created already paid
+    if target.status in COUNTED_STATUSES:
+        session = OrmSession.object_session(target)
+        if session is not None:
+            mark_dirty(session, target)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    if not inspect(target).attrs.status.history.has_changes():
+        return
+    session = OrmSession.object_session(target)
+    if session is not None:
+        mark_dirty(session, target)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _refresh_dirty_days(session):
+    days = session.info.pop(_DIRTY_DAYS, None)
+    if days:
+        get_rollup_refresher().add(days)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_dirty_days(session):
+    session.info.pop(_DIRTY_DAYS, None)
+
+
+# ---------------------------------------------------------
+# Background refresher
+# ---------------------------------------------------------
+class RollupRefresher:
+    def __init__(self, delay: float = REFRESH_DELAY):
+        self.delay = delay
+        self._days: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-rollups", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Rebuild whatever is pending (waiting for the lock), then stop."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping.set()
+            self._wake.set()
+        if thread:
+            thread.join(timeout)
+
+    def add(self, days: Iterable[date]):
+        with self._lock:
+            self._days.update(days)
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # gather the commits of the next few seconds into one rebuild
+            self._stopping.wait(self.delay)
+            self._wake.clear()
+            stopping = self._stopping.is_set()
+
+            with self._lock:
+                days, self._days = self._days, set()
+            if days:
+                try:
+                    if not refresh_days(days, wait=stopping):
+                        # another worker is rebuilding: try again next round
+                        with self._lock:
+                            self._days.update(days)
+                        self._wake.set()
+                except Exception:
+                    # the payments/refunds are committed; reconcile_recent
+                    # or a backfill repairs the rollup
+                    logger.exception(f"Analytics rollup refresh failed for {sorted(days)}")
+
+            if stopping:
+                break
+
+
+_refresher: Optional[RollupRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_rollup_refresher() -> RollupRefresher:
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = RollupRefresher()
+        return _refresher
+
+
+def shutdown_rollup_refresher():
+    global _refresher
+    with _refresher_lock:
+        refresher, _refresher = _refresher, None
+    if refresher:
+        refresher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the analytics rollup tables")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (default: first order)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last day (default: today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backfill(args.since, args.until)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+# app/services/email_dispatcher.py
+"""
+Background email dispatch.
+
+Request handlers only enqueue messages. A dispatcher thread drains the
+queue, groups plain messages into Brevo batch sends (``messageVersions``)
+and hands them to a bounded worker pool that shares one keep-alive HTTP
+session. Failed sends are retried with exponential backoff by the
+dispatcher, never on the request thread.
+"""
+import base64
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import settings
+from app.utils.metrics import EMAIL_FAILED, EMAIL_SENT
+
+logger = logging.getLogger(__name__)
+
+BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
+BREVO_MAX_VERSIONS = 1000  # Brevo limit for messageVersions per request
+
+RETRY_BASE_DELAY = 2.0  # seconds, doubled on every attempt
+IDLE_POLL = 0.5  # seconds the dispatcher waits for new mail
+
+Attachment = Tuple[str, bytes, str]
+
+
+@dataclass
+class EmailMessage:
+    to: List[str]
+    subject: str
+    html: str
+    attachments: Optional[List[Attachment]] = None
+    max_retries: Optional[int] = None
+    attempt: int = 0
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def retryable(self) -> bool:
+        # Network errors, throttling and server errors are worth retrying.
+        # Other 4xx (bad api-key, invalid payload) will fail again.
+        if self.ok:
+            return False
+        if self.status_code is None:
+            return True
+        return self.status_code == 429 or self.status_code >= 500
+
+
+# ---------------------------------------------------------
+# Transports
+# ---------------------------------------------------------
+class BrevoTransport:
+    """Brevo transactional API over a pooled keep-alive session."""
+
+    def __init__(
+        self,
+        api_key: str,
+        sender_email: str,
+        sender_name: str,
+        pool_size: int = 10,
+        timeout: int = 10,
+    ):
+        self.timeout = timeout
+        self.sender = {"email": sender_email, "name": sender_name}
+
+        self.session = requests.Session()
+        # Retries are handled by the dispatcher, not urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "api-key": api_key,
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+
+    def _post(self, payload: dict) -> SendResult:
+        try:
+            response = self.session.post(BREVO_API_URL, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return SendResult(ok=False, error=str(e))
+
+        if response.status_code >= 400:
+            return SendResult(ok=False, status_code=response.status_code, error=response.text)
+
+        return SendResult(ok=True, status_code=response.status_code)
+
+    def send(self, message: EmailMessage) -> SendResult:
+        payload = {
+            "sender": self.sender,
+            "to": [{"email": e} for e in message.to],
+            "subject": message.subject,
+            "htmlContent": message.html,
+        }
+
+        if message.attachments:
+            payload["attachment"] = [
+                {
+                    "name": filename,
+                    "content": base64.b64encode(file_bytes).decode("utf-8"),
+                }
+                for filename, file_bytes, mime_type in message.attachments
+            ]
+
+        return self._post(payload)
+
+    def send_batch(self, messages: List[EmailMessage]) -> SendResult:
+        """One request for many messages; each becomes a messageVersion."""
+        if len(messages) == 1:
+            return self.send(messages[0])
+
+        first = messages[0]
+        payload = {
+            "sender": self.sender,
+            "subject": first.subject,
+            "htmlContent": first.html,
+            "messageVersions": [
+                {
+                    "to": [{"email": e} for e in m.to],
+                    "subject": m.subject,
+                    "htmlContent": m.html,
+                }
+                for m in messages
+            ],
+        }
+        return self._post(payload)
+
+    def close(self):
+        self.session.close()
+
+
+class LocalTransport:
+    """
+    In-memory stand-in for Brevo (tests / local development).
+    Set ``fail_next`` to simulate that many failed requests.
+    """
+
+    def __init__(self):
+        self.outbox: List[EmailMessage] = []
+        self.requests = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    def send(self, message: EmailMessage) -> SendResult:
+        return self.send_batch([message])
+
+    def send_batch(self, messages: List[EmailMessage]) -> SendResult:
+        with self._lock:
+            self.requests += 1
+            if self.fail_next:
+                self.fail_next -= 1
+                return SendResult(ok=False, status_code=503, error="simulated failure")
+            self.outbox.extend(messages)
+        return SendResult(ok=True, status_code=201)
+
+    def close(self):
+        pass
+
+
+def build_transport():
+    if settings.EMAIL_TRANSPORT == "local":
+        return LocalTransport()
+
+    return BrevoTransport(
+        api_key=settings.BREVO_API_KEY,
+        sender_email=settings.MAIL_FROM,
+        sender_name=settings.STORE_NAME,
+        pool_size=settings.EMAIL_HTTP_POOL_SIZE,
+    )
+
+
+# ---------------------------------------------------------
+# Dispatcher
+# ---------------------------------------------------------
+class EmailDispatcher:
+    def __init__(
+        self,
+        transport,
+        workers: int = 4,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        max_retries: int = 3,
+    ):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = min(batch_size, BREVO_MAX_VERSIONS)
+        self.max_retries = max_retries
+
+        self._queue: "queue.Queue[EmailMessage]" = queue.Queue(maxsize=queue_size)
+        self._retries: list = []  # heap of (due_at, seq, message)
+        self._retry_lock = threading.Lock()
+        self._seq = itertools.count()
+        # Keeps at most `workers` sends in flight so the dispatcher
+        # doesn't pile futures onto the pool
+        self._slots = threading.BoundedSemaphore(workers)
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="email-worker"
+            )
+            self._thread = threading.Thread(
+                target=self._run, name="email-dispatcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush queued mail, wait for in-flight sends, then stop."""
+        with self._lock:
+            thread, pool = self._thread, self._pool
+            self._stopping.set()
+
+        # the dispatcher thread submits to the pool until the queue is empty,
+        # so the pool is only shut down once it has exited
+        if thread:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"Email dispatcher still flushing after {timeout}s, {self.pending()} mails queued")
+        if pool:
+            pool.shutdown(wait=True)
+
+        with self._lock:
+            if self._thread is thread:
+                self._thread = self._pool = None
+
+        with self._retry_lock:
+            dropped, self._retries = len(self._retries), []
+        if dropped:
+            logger.warning(f"Email dispatcher stopped with {dropped} retries pending")
+
+    # ---------- producer side ----------
+    def enqueue(self, message: EmailMessage) -> bool:
+        self.start()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            logger.error(f"Email queue full, dropping mail to {message.to}")
+            return False
+
+    def pending(self) -> int:
+        with self._retry_lock:
+            return self._queue.qsize() + len(self._retries)
+
+    # ---------- dispatcher thread ----------
+    def _run(self):
+        while True:
+            messages = self._collect()
+            if messages:
+                self._submit(messages)
+            elif self._stopping.is_set() and self._queue.empty():
+                break
+
+    def _collect(self) -> List[EmailMessage]:
+        """Wait briefly for mail, then drain whatever else is ready."""
+        ready = self._due_retries()
+
+        try:
+            if ready:
+                ready.append(self._queue.get_nowait())
+            else:
+                ready.append(self._queue.get(timeout=self._idle_wait()))
+        except queue.Empty:
+            return ready
+
+        while len(ready) < self.batch_size * self.workers:
+            try:
+                ready.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return ready
+
+    def _due_retries(self) -> List[EmailMessage]:
+        now = time.monotonic()
+        due = []
+        with self._retry_lock:
+            while self._retries and self._retries[0][0] <= now:
+                due.append(heapq.heappop(self._retries)[2])
+        return due
+
+    def _idle_wait(self) -> float:
+        with self._retry_lock:
+            if not self._retries:
+                return IDLE_POLL
+            return max(0.01, min(IDLE_POLL, self._retries[0][0] - time.monotonic()))
+
+    def _submit(self, messages: List[EmailMessage]):
+        # Attachments can't ride in a messageVersions batch
+        plain = [m for m in messages if not m.attachments]
+        units = [[m] for m in messages if m.attachments]
+        units += [
+            plain[i:i + self.batch_size]
+            for i in range(0, len(plain), self.batch_size)
+        ]
+
+        for unit in units:
+            self._slots.acquire()
+            try:
+                future = self._pool.submit(self._deliver, unit)
+            except RuntimeError:  # pool shut down after a stop() timeout
+                self._slots.release()
+                logger.error(f"Email dispatcher stopped, dropping mail to {[m.to for m in unit]}")
+                continue
+            future.add_done_callback(lambda _: self._slots.release())
+
+    # ---------- worker threads ----------
+    def _deliver(self, messages: List[EmailMessage]):
+        started = time.perf_counter()
+        try:
+            if len(messages) == 1:
+                result = self.transport.send(messages[0])
+            else:
+                result = self.transport.send_batch(messages)
+        except Exception as e:
+            result = SendResult(ok=False, error=str(e))
+        (EMAIL_SENT if result.ok else EMAIL_FAILED).observe(time.perf_counter() - started)
+
+        if result.ok:
+            logger.info(f"Email sent to {[m.to for m in messages]}")
+            return
+
+        # a rejected batch (e.g. one invalid address) would fail again as a
+        # whole: halve it until the bad message is sent on its own
+        if not result.retryable and len(messages) > 1:
+            middle = len(messages) // 2
+            self._deliver(messages[:middle])
+            self._deliver(messages[middle:])
+            return
+
+        for message in messages:
+            self._retry_or_drop(message, result)
+
+    def _retry_or_drop(self, message: EmailMessage, result: SendResult):
+        message.attempt += 1
+        limit = self.max_retries if message.max_retries is None else message.max_retries
+
+        if not result.retryable or message.attempt > limit:
+            logger.error(
+                f"Email permanently failed to {message.to} "
+                f"({result.status_code}): {result.error}"
+            )
+            return
+
+        delay = RETRY_BASE_DELAY * (2 ** (message.attempt - 1)) + random.random()
+        logger.warning(
+            f"Email to {message.to} failed (attempt {message.attempt}), "
+            f"retrying in {delay:.1f}s: {result.error}"
+        )
+        with self._retry_lock:
+            heapq.heappush(
+                self._retries, (time.monotonic() + delay, next(self._seq), message)
+            )
+
+
+# ---------------------------------------------------------
+# Shared instances
+# ---------------------------------------------------------
+_transport = None
+_dispatcher: Optional[EmailDispatcher] = None
+_instance_lock = threading.Lock()
+
+
+def get_transport():
+    global _transport
+    with _instance_lock:
+        if _transport is None:
+            _transport = build_transport()
+        return _transport
+
+
+def get_dispatcher() -> EmailDispatcher:
+    global _dispatcher
+    transport = get_transport()
+    with _instance_lock:
+        if _dispatcher is None:
+            _dispatcher = EmailDispatcher(
+                transport,
+                workers=settings.EMAIL_WORKERS,
+                queue_size=settings.EMAIL_QUEUE_SIZE,
+                batch_size=settings.EMAIL_BATCH_SIZE,
+                max_retries=settings.EMAIL_MAX_RETRIES,
+            )
+        return _dispatcher
+
+
+def shutdown_email_dispatcher():
+    global _dispatcher, _transport
+    with _instance_lock:
+        dispatcher, transport = _dispatcher, _transport
+        _dispatcher = _transport = None
+
+    if dispatcher:
+        dispatcher.stop()
+    if transport:
+        transport.close()
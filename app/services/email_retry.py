@@ -1,7 +1,5 @@
-import time
-import random
 import logging
-from app.services.email_service import send_email
+from app.services.email_service import enqueue_email
 
 logger = logging.getLogger(__name__)
 
@@ -12,28 +10,19 @@ def send_email_with_retry(
     attachments=None,
     max_retries: int = 3
 ):
-    last_error = None
+    """
+    Queue the email with its own retry budget.
+    Backoff runs on the email dispatcher, so the caller never sleeps.
+    """
+    queued = enqueue_email(
+        to=to_email,
+        subject=subject,
+        html=html,
+        attachments=attachments,
+        max_retries=max_retries,
+    )
 
-    for attempt in range(1, max_retries + 1):
-        try:
-            send_email(
-                to=to_email,
-                subject=subject,
-                html=html,
-                attachments=attachments
-            )
-            logger.info(f"Email sent to {to_email} (attempt {attempt})")
-            return True
+    if not queued:
+        logger.error(f"Email could not be queued for {to_email}")
 
-        except Exception as e:
-            last_error = str(e)
-            logger.warning(f"Attempt {attempt} failed: {last_error}")
-
-            if "api-key" in last_error.lower():
-                break  # auth error → no retry
-
-            sleep = (2 ** attempt) + random.random()
-            time.sleep(sleep)
-
-    logger.error(f"Email permanently failed: {last_error}")
-    return False
+    return queued
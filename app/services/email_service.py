@@ -1,6 +1,4 @@
-import base64
 import logging
-import requests
 import re
 from typing import List, Optional, Tuple
 
@@ -8,12 +6,11 @@ from app.config import settings
 from app.utils.template import render_template
 from app.models.user import User
 from app.models.order import Order
+from app.services.email_dispatcher import EmailMessage, get_dispatcher, get_transport
 from sqlmodel import Session
 
 logger = logging.getLogger(__name__)
 
-BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
-
 def is_valid_email(email):
     if isinstance(email, list):
         return all(is_valid_email(e) for e in email)
@@ -24,58 +21,43 @@ def is_valid_email(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
 
 
+def _valid_recipients(to) -> List[str]:
+    if isinstance(to, list):
+        return [e for e in to if is_valid_email(e)]
+    return [to] if is_valid_email(to) else []
+
+
 def send_email(
     to: str,
     subject: str,
     html: str,
     attachments: Optional[List[Tuple[str, bytes, str]]] = None,
 ) -> bool:
+    """
+    Send immediately on the calling thread (pooled keep-alive session).
+    Prefer enqueue_email() inside request handlers.
+    """
 
     try:
         # ✅ Validate emails
-        if isinstance(to, list):
-            valid_emails = [e for e in to if is_valid_email(e)]
-        else:
-            valid_emails = [to] if is_valid_email(to) else []
+        valid_emails = _valid_recipients(to)
 
         if not valid_emails:
             logger.warning(f"Skipped invalid email(s): {to}")
             return False
 
-        payload = {
-            "sender": {
-                "email": settings.MAIL_FROM,
-                "name": settings.STORE_NAME,
-            },
-            "to": [{"email": e} for e in valid_emails],
-            "subject": subject,
-            "htmlContent": html,
-        }
-
-        if attachments:
-            payload["attachment"] = [
-                {
-                    "name": filename,
-                    "content": base64.b64encode(file_bytes).decode("utf-8"),
-                }
-                for filename, file_bytes, mime_type in attachments
-            ]
-
-        headers = {
-            "api-key": settings.BREVO_API_KEY,
-            "Content-Type": "application/json",
-        }
-
-        response = requests.post(
-            BREVO_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=10,
+        result = get_transport().send(
+            EmailMessage(
+                to=valid_emails,
+                subject=subject,
+                html=html,
+                attachments=attachments,
+            )
         )
 
-        if response.status_code >= 400:
+        if not result.ok:
             logger.error(
-                f"Brevo email failed ({response.status_code}): {response.text}"
+                f"Brevo email failed ({result.status_code}): {result.error}"
             )
             return False
 
@@ -87,6 +69,34 @@ def send_email(
         return False
 
 
+def enqueue_email(
+    to: str,
+    subject: str,
+    html: str,
+    attachments: Optional[List[Tuple[str, bytes, str]]] = None,
+    max_retries: Optional[int] = None,
+) -> bool:
+    """
+    Hand the email to the background dispatcher and return at once.
+    Delivery, batching and retries happen off the request thread.
+    """
+    valid_emails = _valid_recipients(to)
+
+    if not valid_emails:
+        logger.warning(f"Skipped invalid email(s): {to}")
+        return False
+
+    return get_dispatcher().enqueue(
+        EmailMessage(
+            to=valid_emails,
+            subject=subject,
+            html=html,
+            attachments=attachments,
+            max_retries=max_retries,
+        )
+    )
+
+
 
 def send_order_confirmation(order: Order, user: User, session: Session):
     """Send order confirmation email to customer"""
@@ -96,7 +106,7 @@ def send_order_confirmation(order: Order, user: User, session: Session):
         user=user
     )
 
-    send_email(
+    enqueue_email(
         to=user.email,
         subject=f"Order Confirmed #{order.id}",
         html=html
@@ -105,7 +115,7 @@ def send_order_confirmation(order: Order, user: User, session: Session):
     # Send to admin emails (if configured)
     from app.config import settings
     if hasattr(settings, "ADMIN_EMAILS"):
-        send_email(
+        enqueue_email(
         to=settings.ADMIN_EMAILS,
         subject=f"New Order Received #{order.id}",
         html=html
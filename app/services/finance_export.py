@@ -0,0 +1,319 @@
+# app/services/finance_export.py
+"""
+/admin/finance/export: raw rows for reconciliation.
+
+One dataset per request (orders, order items, payments, refunds) over a
+UTC date range, as CSV, Arrow IPC stream or Parquet. Rows are read in id
+order through a server-side cursor (``yield_per``), so the query runs
+once and memory stays at one batch of FINANCE_EXPORT_BATCH_SIZE rows
+whatever the range; each batch is encoded and sent before the next is
+fetched.
+
+The whole export is one REPEATABLE READ, read-only transaction (a
+consistent snapshot), with its timeouts raised to FINANCE_EXPORT_TIMEOUT_MS
+since a slow client holds it open between fetches. If a download breaks,
+ask again with ``after_id`` = the last id received: the export picks up
+at the next row.
+"""
+import csv
+import io
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.models.cancellation import CancellationRequest
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# ---------------------------------------------------------
+# Datasets
+# ---------------------------------------------------------
+class Dataset(NamedTuple):
+    columns: List[Tuple[str, str]]  # (name, kind); kinds map to Arrow types
+    query: Callable[[datetime, datetime], object]  # id first, rows ordered by it
+    id_column: object
+
+
+def _orders(start, end):
+    return (
+        select(
+            Order.id,
+            Order.created_at,
+            Order.updated_at,
+            Order.status,
+            Order.placed_by,
+            Order.payment_mode,
+            Order.user_id,
+            func.coalesce(User.email, Order.guest_email),
+            Order.subtotal,
+            Order.shipping,
+            Order.total,
+            Order.gateway_order_id,
+            Order.gateway_payment_id,
+        )
+        .outerjoin(User, User.id == Order.user_id)
+        .where(Order.created_at >= start, Order.created_at < end)
+    )
+
+
+def _order_items(start, end):
+    return (
+        select(
+            OrderItem.id,
+            OrderItem.order_id,
+            Order.created_at,
+            OrderItem.book_id,
+            OrderItem.book_title,
+            OrderItem.price,
+            OrderItem.quantity,
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.created_at >= start, Order.created_at < end)
+    )
+
+
+def _payments(start, end):
+    return select(
+        Payment.id,
+        Payment.created_at,
+        Payment.order_id,
+        Payment.user_id,
+        Payment.txn_id,
+        Payment.amount,
+        Payment.status,
+        Payment.method,
+        Payment.payment_mode,
+    ).where(Payment.created_at >= start, Payment.created_at < end)
+
+
+def _refunds(start, end):
+    return select(
+        CancellationRequest.id,
+        CancellationRequest.processed_at,
+        CancellationRequest.order_id,
+        CancellationRequest.user_id,
+        CancellationRequest.refund_amount,
+        CancellationRequest.refund_method,
+        CancellationRequest.refund_reference,
+        CancellationRequest.requested_at,
+        CancellationRequest.processed_by,
+    ).where(
+        CancellationRequest.status == "refunded",
+        CancellationRequest.processed_at >= start,
+        CancellationRequest.processed_at < end,
+    )
+
+
+DATASETS: Dict[str, Dataset] = {
+    "orders": Dataset(
+        [
+            ("order_id", "int"), ("placed_at", "timestamp"), ("updated_at", "timestamp"),
+            ("status", "str"), ("placed_by", "str"), ("payment_mode", "str"),
+            ("user_id", "int"), ("customer_email", "str"), ("subtotal", "float"),
+            ("shipping", "float"), ("total", "float"), ("gateway_order_id", "str"),
+            ("gateway_payment_id", "str"),
+        ],
+        _orders,
+        Order.id,
+    ),
+    "order_items": Dataset(
+        [
+            ("item_id", "int"), ("order_id", "int"), ("placed_at", "timestamp"),
+            ("book_id", "int"), ("book_title", "str"), ("price", "float"),
+            ("quantity", "int"),
+        ],
+        _order_items,
+        OrderItem.id,
+    ),
+    "payments": Dataset(
+        [
+            ("payment_id", "int"), ("created_at", "timestamp"), ("order_id", "int"),
+            ("user_id", "int"), ("txn_id", "str"), ("amount", "float"),
+            ("status", "str"), ("method", "str"), ("payment_mode", "str"),
+        ],
+        _payments,
+        Payment.id,
+    ),
+    "refunds": Dataset(
+        [
+            ("refund_id", "int"), ("processed_at", "timestamp"), ("order_id", "int"),
+            ("user_id", "int"), ("refund_amount", "decimal"), ("refund_method", "str"),
+            ("refund_reference", "str"), ("requested_at", "timestamp"),
+            ("processed_by", "int"),
+        ],
+        _refunds,
+        CancellationRequest.id,
+    ),
+}
+
+
+# ---------------------------------------------------------
+# Rows
+# ---------------------------------------------------------
+def iter_batches(bind, dataset: str, start: date, end: date, after_id: int = 0) -> Iterator[list]:
+    """Rows of `dataset` dated start..end (inclusive, UTC) with id > after_id, in id order"""
+    spec = DATASETS[dataset]
+    query = (
+        spec.query(datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min))
+        .where(spec.id_column > after_id)
+        .order_by(spec.id_column)
+        .execution_options(yield_per=settings.FINANCE_EXPORT_BATCH_SIZE)
+    )
+
+    with Session(bind) as session:
+        session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+        )
+        timeout = int(settings.FINANCE_EXPORT_TIMEOUT_MS)
+        session.execute(text(f"SET LOCAL statement_timeout = {timeout}"))
+        session.execute(text(f"SET LOCAL idle_in_transaction_session_timeout = {timeout}"))
+
+        for batch in session.execute(query).partitions():
+            yield batch
+
+
+# ---------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------
+class _Drain:
+    """Write-only file for pyarrow writers; take() hands over what was written"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def iter_csv(batches: Iterator[list], columns) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    yield buffer.getvalue().encode()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_csv_value(v) for v in row] for row in batch])
+        yield buffer.getvalue().encode()
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "decimal": pa.decimal128(10, 2),
+        "str": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),  # stored naive, in UTC
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _record_batch(schema, batch: list):
+    import pyarrow as pa
+
+    if not batch:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+        schema=schema,
+    )
+
+
+def iter_arrow(batches: Iterator[list], columns) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    schema = _arrow_schema(columns)
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.take()
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.take()
+    yield sink.take()  # end-of-stream marker
+
+
+def iter_parquet(batches: Iterator[list], columns) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    sink = _Drain()
+    # one row group per batch; the footer goes out last
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.take()
+    yield sink.take()
+
+
+ENCODERS = {"csv": iter_csv, "arrow": iter_arrow, "parquet": iter_parquet}
+
+
+def _logged(body: Iterator[bytes], label: str) -> Iterator[bytes]:
+    sent = 0
+    try:
+        for chunk in body:
+            sent += len(chunk)
+            yield chunk
+    except Exception:
+        # the client sees a truncated file; it resumes with after_id
+        logger.exception(f"Finance export {label} failed after {sent} bytes")
+        raise
+    logger.info(f"Finance export {label}: {sent} bytes")
+
+
+def export_response(bind, dataset: str, start: date, end: date, fmt: str, after_id: int = 0) -> StreamingResponse:
+    label = f"{dataset}_{start}_{end}"
+    columns = DATASETS[dataset].columns
+    body = ENCODERS[fmt](iter_batches(bind, dataset, start, end, after_id), columns)
+
+    ext = "arrows" if fmt == "arrow" else fmt
+    return StreamingResponse(
+        _logged(body, f"{label} after_id={after_id} ({fmt})"),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="finance_{label}.{ext}"'},
+    )
@@ -1,20 +1,32 @@
+from sqlalchemy import func, update
 from sqlmodel import Session, select
 from app.models.order_item import OrderItem
 from app.models.book import Book
 
 
+def _order_quantities(order_id: int):
+    """Units per book for an order (duplicate lines summed)"""
+    return (
+        select(
+            OrderItem.book_id,
+            func.sum(OrderItem.quantity).label("quantity"),
+        )
+        .where(OrderItem.order_id == order_id)
+        .group_by(OrderItem.book_id)
+    )
+
+
 def restore_inventory(session: Session, order_id: int):
     """
     Restore stock when a payment is refunded or order cancelled
     """
-    order_items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order_id)
-    ).all()
+    needed = _order_quantities(order_id).subquery()
 
-    for item in order_items:
-        book = session.get(Book, item.book_id)
-        if book:
-            book.stock += item.quantity
+    session.execute(
+        update(Book)
+        .where(Book.id == needed.c.book_id)
+        .values(stock=func.coalesce(Book.stock, 0) + needed.c.quantity)
+    )
 
     session.commit()
 
@@ -24,24 +36,44 @@ def reduce_inventory(session: Session, order_id: int):
     """
     Reduce stock after successful payment
     Must be called ONLY ONCE per order
+
+    One conditional UPDATE for all books: rows are locked by the update
+    itself, so concurrent orders can't both take the last copy. The same
+    statement counts the order's books, so a short row count is noticed
+    without another round trip.
     """
+    needed = _order_quantities(order_id).cte("needed")
+    updated = (
+        update(Book)
+        .where(Book.id == needed.c.book_id)
+        .where(Book.stock >= needed.c.quantity)
+        .values(stock=Book.stock - needed.c.quantity)
+        .returning(Book.id)
+        .cte("reduced")
+    )
 
-    order_items = session.exec(
-        select(OrderItem).where(OrderItem.order_id == order_id)
-    ).all()
+    expected, reduced = session.execute(
+        select(
+            select(func.count()).select_from(needed).scalar_subquery(),
+            select(func.array_agg(updated.c.id)).scalar_subquery(),
+        )
+    ).one()
+    reduced = set(reduced or ())
 
-    for item in order_items:
-        book = session.get(Book, item.book_id)
+    if len(reduced) != expected:
+        # failure path only: find a book that couldn't be reduced
+        rows = session.execute(_order_quantities(order_id)).all()
+        for book_id, quantity in rows:
+            if book_id in reduced:
+                continue
 
-        if not book:
-            raise ValueError(f"Book not found: {item.book_id}")
+            book = session.get(Book, book_id)
+            if not book:
+                raise ValueError(f"Book not found: {book_id}")
 
-        if book.stock < item.quantity:
             raise ValueError(
                 f"Insufficient stock for '{book.title}' "
-                f"(available={book.stock}, required={item.quantity})"
+                f"(available={book.stock}, required={quantity})"
             )
 
-        book.stock -= item.quantity
-
     session.flush()  # flush but DO NOT commit here
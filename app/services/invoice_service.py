@@ -1,23 +1,334 @@
+# app/services/invoice_service.py
+"""
+Invoice PDFs.
+
+Each order version (order id + updated_at) is rendered once in a small
+worker pool and stored in R2 under ``invoices/``, with a local disk
+cache in front. Downloads stream from the local cache or from R2;
+request handlers never run reportlab themselves.
+
+The local cache keeps the newest version of each invoice, for
+INVOICE_CACHE_HOURS; R2 has them all. Its directory must belong to this
+user and be closed to others (the PDFs carry customer details).
+"""
+import io
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.database import engine
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.user import User
+from app.services.r2_client import R2_BUCKET_NAME, s3_client
+
+logger = logging.getLogger(__name__)
+
+R2_PREFIX = "invoices"
+CHUNK_SIZE = 64 * 1024
+PRUNE_EVERY = 3600  # seconds between sweeps of the local cache
+
+_pool = ThreadPoolExecutor(
+    max_workers=settings.INVOICE_WORKERS, thread_name_prefix="invoice-worker"
+)
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def _cache_dir() -> Path:
+    path = Path(settings.INVOICE_CACHE_DIR or Path(tempfile.gettempdir()) / f"hithabodha_invoices-{os.getuid()}")
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    # exist_ok also accepts a directory someone else created first
+    st = path.lstat()
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"Invoice cache {path} must be a directory owned by this user with mode 0700")
+    return path
+
+
+LOCAL_DIR = _cache_dir()
+
+
+# ---------------------------------------------------------
+# Keys
+# ---------------------------------------------------------
+def invoice_version(order: Order) -> str:
+    stamp = order.updated_at or order.created_at
+    return str(int(stamp.timestamp()))
+
+
+def invoice_key(order: Order) -> str:
+    return f"{R2_PREFIX}/{order.id}/invoice_{order.id}_{invoice_version(order)}.pdf"
+
+
+def _local_path(key: str) -> Path:
+    return LOCAL_DIR / key.replace("/", "_")
+
+
+# ---------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------
+def render_invoice_pdf(order: Order, items, customer: Optional[User], payment: Optional[Payment]) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    y = height - 50
+
+    if order.placed_by == "guest":
+        name, email = order.guest_name, order.guest_email
+    elif customer:
+        name, email = f"{customer.first_name} {customer.last_name}", customer.email
+    else:
+        name, email = None, None
+
+    # Title
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(50, y, f"Invoice #{order.id}")
+    y -= 30
+
+    # Customer / order info
+    c.setFont("Helvetica", 12)
+    if name:
+        c.drawString(50, y, f"Customer: {name}")
+        y -= 18
+    if email:
+        c.drawString(50, y, f"Email: {email}")
+        y -= 18
+    c.drawString(50, y, f"Date: {order.created_at.strftime('%Y-%m-%d')}")
+    y -= 18
+    c.drawString(50, y, f"Status: {order.status}")
+    y -= 18
+    if payment:
+        c.drawString(50, y, f"Payment: {payment.method} ({payment.txn_id})")
+        y -= 18
+    y -= 12
+
+    # Items
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Items:")
+    y -= 20
+
+    c.setFont("Helvetica", 11)
+    for item in items:
+        if y < 80:
+            c.showPage()
+            c.setFont("Helvetica", 11)
+            y = height - 50
+        c.drawString(
+            50,
+            y,
+            f"{item.book_title} - {item.quantity} x Rs.{item.price:.2f} = Rs.{item.quantity * item.price:.2f}"
+        )
+        y -= 16
+
+    # Totals
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, f"Subtotal: Rs.{order.subtotal:.2f}")
+    y -= 15
+    c.drawString(50, y, f"Shipping: Rs.{order.shipping:.2f}")
+    y -= 15
+    c.drawString(50, y, f"Total: Rs.{order.total:.2f}")
+
+    c.save()
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------
+# Storage tiers
+# ---------------------------------------------------------
+def _r2_exists(key: str) -> bool:
+    try:
+        s3_client.head_object(Bucket=R2_BUCKET_NAME, Key=key)
+        return True
+    except Exception:
+        return False
+
 
-INVOICE_DIR = Path("invoices")
+def _write_local(key: str, pdf: bytes):
+    # write-then-rename so readers never see a partial file; the temp
+    # name is per thread so concurrent writers don't share it
+    path = _local_path(key)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(pdf)
+    os.replace(tmp, path)
 
+    # earlier versions of this invoice are superseded (still in R2)
+    prefix = path.name.rsplit("_", 1)[0]
+    for old in LOCAL_DIR.glob(f"{prefix}_*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    _prune_local()
 
-def invoice_exists(order_id: int) -> bool:
-    """Check if invoice PDF exists"""
-    invoice_path = INVOICE_DIR / f"invoice_{order_id}.pdf"
-    return invoice_path.exists()
 
+def _prune_local():
+    """Drop cached invoices untouched for INVOICE_CACHE_HOURS (at most hourly)"""
+    global _last_prune
+    now = time.time()
+    with _in_flight_lock:
+        if now - _last_prune < PRUNE_EVERY:
+            return
+        _last_prune = now
 
-def load_invoice_pdf(order_id: int) -> Optional[bytes]:
+    cutoff = now - settings.INVOICE_CACHE_HOURS * 3600
+    for path in LOCAL_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def _store(key: str, pdf: bytes):
+    """Local cache first, so the download works even if R2 is down"""
+    _write_local(key, pdf)
+    try:
+        s3_client.put_object(
+            Bucket=R2_BUCKET_NAME,
+            Key=key,
+            Body=pdf,
+            ContentType="application/pdf",
+        )
+    except Exception as e:
+        logger.warning(f"Invoice {key} kept locally only, R2 upload failed: {e}")
+
+
+def _generate(order_id: int) -> str:
+    with Session(engine) as session:
+        order = session.get(Order, order_id)
+        if not order:
+            raise LookupError(f"Order not found: {order_id}")
+
+        key = invoice_key(order)
+        if _local_path(key).exists() or _r2_exists(key):
+            return key
+
+        items = session.exec(
+            select(OrderItem).where(OrderItem.order_id == order_id)
+        ).all()
+        customer = session.get(User, order.user_id) if order.user_id else None
+        payment = session.exec(
+            select(Payment).where(Payment.order_id == order_id)
+        ).first()
+
+        pdf = render_invoice_pdf(order, items, customer, payment)
+
+    _store(key, pdf)
+    logger.info(f"Invoice generated for order {order_id} ({key})")
+    return key
+
+
+def schedule_invoice(order_id: int) -> Future:
     """
-    Load invoice PDF if it exists.
+    Queue invoice generation for the order's current version.
+    Concurrent requests for the same order share one render.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(order_id)
+        if future is not None and not future.done():
+            return future
+
+        future = _pool.submit(_generate, order_id)
+        _in_flight[order_id] = future
+
+    def _done(f: Future):
+        with _in_flight_lock:
+            if _in_flight.get(order_id) is f:
+                del _in_flight[order_id]
+        if f.exception():
+            logger.error(f"Invoice generation failed for order {order_id}: {f.exception()}")
+
+    future.add_done_callback(_done)
+    return future
+
+
+# ---------------------------------------------------------
+# Reading
+# ---------------------------------------------------------
+def _iter_r2(key: str) -> Iterator[bytes]:
+    body = s3_client.get_object(Bucket=R2_BUCKET_NAME, Key=key)["Body"]
+    try:
+        for chunk in body.iter_chunks(chunk_size=CHUNK_SIZE):
+            yield chunk
+    finally:
+        body.close()
+
+
+def invoice_exists(order: Order) -> bool:
+    """Check if the invoice for the order's current version is stored"""
+    key = invoice_key(order)
+    return _local_path(key).exists() or _r2_exists(key)
+
+
+def load_invoice_pdf(order: Order) -> Optional[bytes]:
+    """
+    Load the stored invoice PDF (e.g. for email attachments).
     Returns None if invoice not found (DO NOT raise).
     """
-    invoice_path = INVOICE_DIR / f"invoice_{order_id}.pdf"
+    key = invoice_key(order)
+    path = _local_path(key)
+
+    if path.exists():
+        return path.read_bytes()
 
-    if not invoice_path.exists():
+    try:
+        pdf = b"".join(_iter_r2(key))
+    except Exception:
         return None
 
-    return invoice_path.read_bytes()
+    _write_local(key, pdf)
+    return pdf
+
+
+def invoice_response(order: Order, filename: str):
+    """
+    Stream the stored invoice. If it hasn't been generated yet, queue it
+    and wait (bounded) for the worker instead of rendering inline.
+    """
+    key = invoice_key(order)
+    path = _local_path(key)
+
+    if not path.exists() and not _r2_exists(key):
+        try:
+            key = schedule_invoice(order.id).result(timeout=settings.INVOICE_WAIT_SECONDS)
+        except FutureTimeout:
+            raise HTTPException(
+                status_code=503,
+                detail="Invoice is being generated. Please retry shortly.",
+                headers={"Retry-After": "5"},
+            )
+        except LookupError:
+            raise HTTPException(404, "Order not found")
+        except Exception:
+            # already logged by schedule_invoice's callback
+            raise HTTPException(
+                status_code=503,
+                detail="Invoice could not be generated. Please retry shortly.",
+                headers={"Retry-After": "30"},
+            )
+        path = _local_path(key)
+
+    if path.exists():
+        return FileResponse(path, filename=filename, media_type="application/pdf")
+
+    return StreamingResponse(
+        _iter_r2(key),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
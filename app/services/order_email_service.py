@@ -20,7 +20,7 @@ def send_payment_success_email(
     # -----------------------------
     # Load invoice (optional)
     # -----------------------------
-    pdf_bytes = load_invoice_pdf(order.id)
+    pdf_bytes = load_invoice_pdf(order)
 
     attachments = []
     if pdf_bytes:
@@ -1,46 +1,112 @@
+import logging
 from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import func, insert, update
 from sqlmodel import select, Session
 from app.database import engine
 from app.models.order import Order
+from app.models.order_event import OrderEvent
 from app.models.ebook_purchase import EbookPurchase
+from app.notifications.events import OrderEvent as OrderEventType
 
+logger = logging.getLogger(__name__)
+
+# Rows expired per statement; each chunk is its own short transaction
+EXPIRY_CHUNK_SIZE = 500
 
-def expire_unpaid_orders():
-    with Session(engine) as session:
-        now = datetime.utcnow()
 
-        orders = session.exec(
-            select(Order)
-            .where(Order.status == "pending")
-            .where(Order.payment_expires_at != None)
-            .where(Order.payment_expires_at < now)
-        ).all()
+def _expire_in_chunks(session: Session, model, expires_at, on_chunk=None) -> int:
+    """
+    UPDATE ... SET status='expired' WHERE id IN (next chunk of due rows)
+    RETURNING id, repeated until nothing is due. Served by the partial
+    index on the expiry column (WHERE status = 'pending').
+    """
+    now = datetime.utcnow()
+    total = 0
 
-        for order in orders:
-            order.status = "expired"
-            order.updated_at = now
-            session.add(order)
+    while True:
+        due = (
+            select(model.id)
+            .where(model.status == "pending")
+            .where(expires_at < now)
+            .order_by(expires_at)
+            .limit(EXPIRY_CHUNK_SIZE)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+
+        ids = session.execute(
+            update(model)
+            .where(model.id.in_(due))
+            .where(model.status == "pending")
+            .values(status="expired", updated_at=now)
+            .returning(model.id)
+        ).scalars().all()
+
+        if ids and on_chunk:
+            on_chunk(session, ids, now)
 
         session.commit()
+        total += len(ids)
+
+        if len(ids) < EXPIRY_CHUNK_SIZE:
+            return total
+
 
-        print(f"Expired {len(orders)} unpaid orders")
+def _log_expired_orders(session: Session, order_ids, now: datetime):
+    session.execute(
+        insert(OrderEvent),
+        [
+            {
+                "id": str(uuid4()),
+                "order_id": order_id,
+                "event_type": OrderEventType.PAYMENT_EXPIRED.value,
+                "label": "Payment window expired",
+                "created_by": "system",
+                "created_at": now,
+            }
+            for order_id in order_ids
+        ],
+    )
+
+
+def expire_unpaid_orders():
+    with Session(engine) as session:
+        expired = _expire_in_chunks(
+            session,
+            Order,
+            Order.payment_expires_at,
+            on_chunk=_log_expired_orders,
+        )
+
+        logger.info(f"Expired {expired} unpaid orders")
 
 
 def expire_unpaid_ebooks():
     with Session(engine) as session:
-        now = datetime.utcnow()
+        expired = _expire_in_chunks(
+            session,
+            EbookPurchase,
+            EbookPurchase.purchase_expires_at,
+        )
 
-        expired = session.exec(
-            select(EbookPurchase)
-            .where(EbookPurchase.status == "pending")
-            .where(EbookPurchase.payment_expires_at != None)
-            .where(EbookPurchase.payment_expires_at < now)
-        ).all()
+        logger.info(f"Expired {expired} unpaid ebook purchases")
 
-        for purchase in expired:
-            purchase.status = "expired"
-            session.add(purchase)
 
-        session.commit()
+# ---------------------------------------------------------
+# Due times (for the scheduler's delay queue)
+# ---------------------------------------------------------
+def next_order_expiry(session: Session):
+    """Earliest payment deadline among pending orders (partial index scan)"""
+    return session.exec(
+        select(func.min(Order.payment_expires_at))
+        .where(Order.status == "pending")
+    ).one()
+
 
-        print(f"Expired {len(expired)} unpaid ebook purchases")
+def next_ebook_expiry(session: Session):
+    return session.exec(
+        select(func.min(EbookPurchase.purchase_expires_at))
+        .where(EbookPurchase.status == "pending")
+    ).one()
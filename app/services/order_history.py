@@ -0,0 +1,69 @@
+# app/services/order_history.py
+"""
+Read side of a customer's orders (profile order history, order details,
+tracking).
+
+A history page is three queries whatever its size: the count, the page of
+orders and one ``IN`` query for all of their items. Both list queries
+select only the columns the page shows, never full Order rows (which
+carry ~20 guest / gateway columns the history doesn't use). Single orders
+are loaded with their items through ``selectinload``, scoped to the
+owner in the WHERE clause.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.utils.pagination import paginate
+
+
+def history_query(user_id: int):
+    """A user's orders, newest first (served by ix_order_user_id_created_at)"""
+    return (
+        select(Order.id, Order.created_at, Order.total, Order.status)
+        .where(Order.user_id == user_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+
+
+def items_query(order_ids: Iterable[int]):
+    return (
+        select(
+            OrderItem.order_id,
+            OrderItem.book_id,
+            OrderItem.book_title,
+            OrderItem.price,
+            OrderItem.quantity,
+        )
+        .where(OrderItem.order_id.in_(list(order_ids)))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+
+
+def items_by_order(session: Session, order_ids: List[int]) -> Dict[int, list]:
+    items = defaultdict(list)
+    if order_ids:
+        for item in session.exec(items_query(order_ids)).all():
+            items[item.order_id].append(item)
+    return items
+
+
+def history_page(session: Session, user_id: int, page: int, limit: int) -> dict:
+    """paginate() result whose results are (order row, [item rows]) pairs"""
+    data = paginate(session=session, query=history_query(user_id), page=page, limit=limit)
+    items = items_by_order(session, [o.id for o in data["results"]])
+    data["results"] = [(o, items.get(o.id, [])) for o in data["results"]]
+    return data
+
+
+def get_user_order(session: Session, order_id: int, user_id: int) -> Optional[Order]:
+    """The user's order with its items loaded, or None (missing or not theirs)"""
+    return session.exec(
+        select(Order)
+        .where(Order.id == order_id, Order.user_id == user_id)
+        .options(selectinload(Order.items))
+    ).first()
@@ -0,0 +1,175 @@
+# app/services/payment_history.py
+"""
+/checkout/my-payments: a user's order payments and ebook payments as one
+list, newest first.
+
+Both tables are read through a single UNION ALL. Every filter is applied
+inside each branch (so each one is an index range on
+(user_id, created_at)), and each branch is cut to the rows the page can
+need before the outer sort. Pages are walked either by ``page`` (OFFSET,
+for the numbered pager) or by the ``next_cursor`` of the previous page
+(keyset on created_at, type, id, which costs the same on every page).
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal, null, or_, tuple_, union_all
+from sqlmodel import Session, select
+
+from app.models.ebook_payment import EbookPayment
+from app.models.payment import Payment
+
+PAYMENT_TYPES = ("physical", "ebook")
+
+Cursor = Tuple[datetime, str, int]
+
+
+@dataclass
+class PaymentFilters:
+    search: Optional[str] = None
+    status: Optional[str] = None
+    method: Optional[str] = None
+    payment_type: Optional[str] = None  # ebook / physical
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+
+# ---------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------
+def encode_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.type}|{row.payment_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, kind, payment_id = raw.split("|")
+        if kind not in PAYMENT_TYPES:
+            raise ValueError(kind)
+        return datetime.fromisoformat(created_at), kind, int(payment_id)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+
+# ---------------------------------------------------------
+# Query
+# ---------------------------------------------------------
+def _branch(model, kind: str, user_id: int, filters: PaymentFilters, after: Optional[Cursor]):
+    if kind == "physical":
+        refs = (model.order_id.label("order_id"), null().label("purchase_id"))
+    else:
+        refs = (null().label("order_id"), model.ebook_purchase_id.label("purchase_id"))
+
+    query = select(
+        model.id.label("payment_id"),
+        model.txn_id,
+        model.amount,
+        model.status,
+        model.method,
+        model.created_at,
+        literal(kind).label("type"),
+        *refs,
+    ).where(model.user_id == user_id)
+
+    # case-insensitive substring, as before; a term inside the type name
+    # ("phys", "book") matches that whole branch
+    term = (filters.search or "").lower()
+    if term and term not in kind:
+        query = query.where(
+            or_(*(func.strpos(func.lower(column), term) > 0 for column in (model.txn_id, model.status, model.method)))
+        )
+    if filters.status:
+        query = query.where(model.status == filters.status)
+    if filters.method:
+        query = query.where(model.method == filters.method)
+    if filters.min_amount is not None:
+        query = query.where(model.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.where(model.amount <= filters.max_amount)
+
+    if after is not None:
+        created_at, after_kind, payment_id = after
+        # rows sort by (created_at, type, id) descending; type is fixed per branch
+        if kind < after_kind:
+            query = query.where(model.created_at <= created_at)
+        elif kind == after_kind:
+            query = query.where(tuple_(model.created_at, model.id) < tuple_(created_at, payment_id))
+        else:
+            query = query.where(model.created_at < created_at)
+    return query
+
+
+def _branches(user_id: int, filters: PaymentFilters, after: Optional[Cursor]) -> list:
+    kinds = [filters.payment_type] if filters.payment_type else PAYMENT_TYPES
+    models = {"physical": Payment, "ebook": EbookPayment}
+    return [
+        _branch(models[kind], kind, user_id, filters, after)
+        for kind in kinds
+        if kind in models
+    ]
+
+
+def page_query(user_id: int, filters: PaymentFilters, offset: int, limit: int, after: Optional[Cursor] = None):
+    """Newest-first union of both tables; each branch is cut to offset + limit rows"""
+    branches = _branches(user_id, filters, after)
+    if not branches:
+        return None
+    payments = union_all(
+        *(
+            branch.order_by(branch.selected_columns.created_at.desc(), branch.selected_columns.payment_id.desc())
+            .limit(offset + limit)
+            for branch in branches
+        )
+    ).subquery()
+    return (
+        select(payments)
+        .order_by(payments.c.created_at.desc(), payments.c.type.desc(), payments.c.payment_id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def payments_page(
+    session: Session,
+    user_id: int,
+    filters: PaymentFilters,
+    page: int,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[int, List, Optional[str]]:
+    """(total matching, page rows, cursor for the next page or None)"""
+    after = decode_cursor(cursor) if cursor else None
+    offset = 0 if after else (page - 1) * limit
+    # one extra row tells whether a next page exists
+    query = page_query(user_id, filters, offset, limit + 1, after)
+    if query is None:
+        return 0, [], None
+
+    counted = union_all(*_branches(user_id, filters, None)).subquery()
+    total = session.exec(select(func.count()).select_from(counted)).one()
+    rows = session.execute(query).all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return total, rows[:limit], next_cursor
+
+
+def as_dict(row) -> dict:
+    payment = {
+        "payment_id": row.payment_id,
+        "txn_id": row.txn_id,
+        "amount": row.amount,
+        "status": row.status,
+        "method": row.method,
+        "created_at": row.created_at,
+        "type": row.type,
+    }
+    if row.type == "physical":
+        payment["order_id"] = row.order_id
+    else:
+        payment["purchase_id"] = row.purchase_id
+    return payment
@@ -1,93 +1,168 @@
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
 from sqlmodel import Session, select
 from app.database import engine
 from app.models.order import Order
 from app.models.ebook_purchase import EbookPurchase
 from app.models.user import User
 from app.models.book import Book
-from app.services.email_service import send_email
+from app.services.email_service import enqueue_email
+from app.utils.template import render_template
+
+logger = logging.getLogger(__name__)
+
+# (reminder flag, opens at hours-left, closes at hours-left, subject)
+ORDER_REMINDERS = [
+    ("reminder_24h_sent", 25, 23, "Reminder: Complete Your Payment"),
+    ("reminder_final_sent", 6, 1, "Final Reminder — Payment Expiring Soon"),
+]
+
+EBOOK_REMINDERS = [
+    ("reminder_24h_sent", 25, 23, "Reminder: Complete Your eBook Purchase"),
+    ("reminder_final_sent", 5, 1, "Final Reminder — Payment Expiring Soon"),
+]
+
+
+def _window(now: datetime, opens: int, closes: int):
+    """Deadline range for rows whose reminder window is open right now"""
+    return now + timedelta(hours=closes), now + timedelta(hours=opens)
 
 
 def send_payment_reminders():
     with Session(engine) as session:
         now = datetime.utcnow()
 
-        pending_orders = session.exec(
-            select(Order)
-            .where(Order.status == "pending")
-            .where(Order.payment_expires_at != None)
-            .where(Order.payment_expires_at > now)
-        ).all()
-
-        for order in pending_orders:
-            hours_left = (order.payment_expires_at - now).total_seconds() / 3600
-            email = order.customer_email
+        for flag, opens, closes, subject in ORDER_REMINDERS:
+            start, end = _window(now, opens, closes)
+            sent_flag = getattr(Order, flag)
 
-            # 24-hour reminder
-            if 23 < hours_left < 25 and not order.reminder_24h_sent:
-                send_email(
-                    to=email,
-                    subject="Reminder: Complete Your Payment",
-                    template="user_emails/payment_reminder_24h.html",
-                    data={
-                        "order_id": order.id,
-                        "amount": order.total,
-                        "expires_at": order.payment_expires_at
-                    }
+            # only open windows, user columns joined in (no lazy order.user)
+            rows = session.exec(
+                select(
+                    Order.id,
+                    Order.total,
+                    Order.payment_expires_at,
+                    Order.guest_email,
+                    Order.guest_name,
+                    User.email,
+                    User.first_name,
                 )
-                order.reminder_24h_sent = True
+                .outerjoin(User, User.id == Order.user_id)
+                .where(Order.status == "pending")
+                .where(Order.payment_expires_at > start)
+                .where(Order.payment_expires_at < end)
+                .where(sent_flag == False)
+            ).all()
 
-            # Final reminder (last 6 hours)
-            if 1 < hours_left < 6 and not order.reminder_final_sent:
-                send_email(
-                    to=email,
-                    subject="Final Reminder — Payment Expiring Soon",
-                    template="user_emails/payment_reminder_final.html",
-                    data={
-                        "order_id": order.id,
-                        "amount": order.total,
-                        "expires_at": order.payment_expires_at
-                    }
+            if not rows:
+                continue
+
+            for order_id, total, expires_at, guest_email, guest_name, email, first_name in rows:
+                enqueue_email(
+                    to=email or guest_email,
+                    subject=subject,
+                    html=render_template(
+                        "user_emails/payment_reminder.html",
+                        first_name=first_name or guest_name,
+                        order_id=order_id,
+                        amount=total,
+                        expires_at=expires_at,
+                        is_final=flag == "reminder_final_sent",
+                    ),
                 )
-                order.reminder_final_sent = True
 
-        session.commit()
+            session.execute(
+                update(Order)
+                .where(Order.id.in_([row[0] for row in rows]))
+                .values({flag: True})
+            )
+            session.commit()
+
+            logger.info(f"Queued {len(rows)} order payment reminders ({flag})")
 
 
 def send_ebook_payment_reminders():
     with Session(engine) as session:
         now = datetime.utcnow()
 
-        purchases = session.exec(
-            select(EbookPurchase)
-            .where(EbookPurchase.status == "pending")
-            .where(EbookPurchase.purchase_expires_at != None)
-        ).all()
-
-        for p in purchases:
-            hours_left = (p.purchase_expires_at - now).total_seconds() / 3600
-
-            user = session.get(User, p.user_id)
-            book = session.get(Book, p.book_id)
-
-            # 24-hour reminder
-            if 23 < hours_left < 25 and not p.reminder_24h_sent:
-                send_email(
-                    to=user.email,
-                    subject="Reminder: Complete Your eBook Purchase",
-                    template="user_emails/ebook_payment_reminder_24h.html",
-                    data={"book_title": book.title, "purchase_id": p.id}
+        for flag, opens, closes, subject in EBOOK_REMINDERS:
+            start, end = _window(now, opens, closes)
+            sent_flag = getattr(EbookPurchase, flag)
+
+            rows = session.exec(
+                select(
+                    EbookPurchase.id,
+                    EbookPurchase.amount,
+                    EbookPurchase.purchase_expires_at,
+                    User.email,
+                    User.first_name,
+                    Book.title,
                 )
-                p.reminder_24h_sent = True
-
-            # Final reminder (last 4 hours)
-            if 1 < hours_left < 5 and not p.reminder_final_sent:
-                send_email(
-                    to=user.email,
-                    subject="Final Reminder — Payment Expiring Soon",
-                    template="user_emails/ebook_payment_reminder_final.html",
-                    data={"book_title": book.title, "purchase_id": p.id}
+                .join(User, User.id == EbookPurchase.user_id)
+                .join(Book, Book.id == EbookPurchase.book_id)
+                .where(EbookPurchase.status == "pending")
+                .where(EbookPurchase.purchase_expires_at > start)
+                .where(EbookPurchase.purchase_expires_at < end)
+                .where(sent_flag == False)
+            ).all()
+
+            if not rows:
+                continue
+
+            for purchase_id, amount, expires_at, email, first_name, book_title in rows:
+                enqueue_email(
+                    to=email,
+                    subject=subject,
+                    html=render_template(
+                        "user_emails/ebook_payment_reminder.html",
+                        first_name=first_name,
+                        book_title=book_title,
+                        purchase_id=purchase_id,
+                        amount=amount,
+                        expires_at=expires_at,
+                        is_final=flag == "reminder_final_sent",
+                    ),
                 )
-                p.reminder_final_sent = True
 
-        session.commit()
+            session.execute(
+                update(EbookPurchase)
+                .where(EbookPurchase.id.in_([row[0] for row in rows]))
+                .values({flag: True})
+            )
+            session.commit()
+
+            logger.info(f"Queued {len(rows)} ebook payment reminders ({flag})")
+
+
+# ---------------------------------------------------------
+# Due times (for the scheduler's delay queue)
+# ---------------------------------------------------------
+def _next_window_opening(session: Session, model, expires_at, reminders):
+    """When the next not-yet-closed reminder window opens"""
+    now = datetime.utcnow()
+    due = None
+
+    for flag, opens, closes, _ in reminders:
+        deadline = session.exec(
+            select(func.min(expires_at))
+            .where(model.status == "pending")
+            .where(expires_at > now + timedelta(hours=closes))
+            .where(getattr(model, flag) == False)
+        ).one()
+
+        if deadline is not None:
+            opening = deadline - timedelta(hours=opens)
+            due = opening if due is None else min(due, opening)
+
+    return due
+
+
+def next_payment_reminder(session: Session):
+    return _next_window_opening(session, Order, Order.payment_expires_at, ORDER_REMINDERS)
+
+
+def next_ebook_payment_reminder(session: Session):
+    return _next_window_opening(
+        session, EbookPurchase, EbookPurchase.purchase_expires_at, EBOOK_REMINDERS
+    )
@@ -34,15 +34,34 @@ payment_gateway = PaymentGateway()
 
 from typing import Optional, Dict, Any
 from datetime import datetime
+from sqlalchemy import DateTime, Float, Integer, String, literal, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import Session, select
 
 from app.models.payment import Payment
 from app.models.order import Order
 from app.models.user import User
+from app.services.analytics_rollup import mark_dirty
 from app.services.inventory_service import reduce_inventory
+from app.services.invoice_service import schedule_invoice
 from app.services.order_email_service import send_payment_success_email
 
 
+class PaymentNotApplied(Exception):
+    """
+    A captured payment that can't complete its order (expired, cancelled
+    or its txn_id already recorded against another order). Nothing was
+    recorded; the caller rejects it and the payment needs a refund.
+    """
+
+    def __init__(self, order_id: int, txn_id: str, reason: str):
+        super().__init__(f"Payment {txn_id} not applied to order {order_id}: {reason}")
+        self.order_id = order_id
+        self.txn_id = txn_id
+        self.reason = reason
+        logger.error(f"{self}; refund it")
+
+
 def finalize_payment(
     *,
     session: Session,
@@ -57,55 +76,99 @@ def finalize_payment(
     gateway_response: Optional[Dict[str, Any]] = None,
 ) -> Payment:
     """
-    Single source of truth for completing payments
+    Single source of truth for completing payments.
+
+    Lock-free and idempotent: the order is claimed with
+    UPDATE ... WHERE status = 'pending' and the payment row is inserted
+    from the claimed row (INSERT ... SELECT ... ON CONFLICT (txn_id) DO
+    NOTHING), both in one statement. Only the caller that wins the claim
+    records a payment and reduces inventory, so concurrent callbacks for
+    the same payment (or order) do it exactly once.
+
+    When the order can't be claimed, the existing payment is returned for
+    a repeated txn_id or an order that is already paid; otherwise
+    PaymentNotApplied is raised.
     """
-
-    # ✅ CHECK IF PAYMENT ALREADY EXISTS (duplicate verification)
-    existing_payment = session.exec(
-        select(Payment).where(Payment.txn_id == txn_id)
-    ).first()
-    
-    if existing_payment:
-        # Payment already processed - return existing payment
-        return existing_payment
-
-    # ✅ CHECK IF ORDER ALREADY PAID
-    if order.status == "paid":
-        # If order is paid but no payment record found with this txn_id,
-        # it means a different payment succeeded. Still return success.
-        existing_order_payment = session.exec(
-            select(Payment).where(Payment.order_id == order.id)
-        ).first()
-        if existing_order_payment:
-            return existing_order_payment
-        # If somehow order is paid but no payment exists, continue...
-
-    payment = Payment(
-        order_id=order.id,
-        user_id=user.id if user else None,
-        txn_id=txn_id,
-        amount=amount,
-        status="success",
-        method=method,
-        payment_mode=payment_mode,
-        gateway_order_id=gateway_order_id,
-        gateway_signature=gateway_signature,
-        gateway_response=gateway_response,
-        created_at=datetime.utcnow(),
+    now = datetime.utcnow()
+
+    # 1️⃣ Flip the order to paid only if it is still pending
+    claimed = (
+        update(Order)
+        .where(Order.id == order.id)
+        .where(Order.status == "pending")
+        .values(status="paid", updated_at=now)
+        .returning(Order.id)
+        .cte("claimed")
     )
 
-    session.add(payment)
-
-    # 🔒 Atomic state change
-    order.status = "paid"
+    # 2️⃣ Record the payment only for a claimed order
+    inserted = (
+        pg_insert(Payment)
+        .from_select(
+            ["order_id", "user_id", "txn_id", "amount", "status", "method", "payment_mode", "created_at"],
+            select(
+                claimed.c.id,
+                literal(user.id if user else None, Integer),
+                literal(txn_id, String),
+                literal(amount, Float),
+                literal("success", String),
+                literal(method, String),
+                literal(payment_mode, String),
+                literal(now, DateTime),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[Payment.txn_id])
+        .returning(Payment.id)
+        .cte("inserted")
+    )
 
-    # 📦 Reduce inventory ONCE
+    order_claimed, payment_id = session.execute(
+        select(
+            select(claimed.c.id).scalar_subquery(),
+            select(inserted.c.id).scalar_subquery(),
+        )
+    ).one()
+
+    if order_claimed and payment_id is None:
+        # txn_id already recorded elsewhere: undo the claim
+        session.rollback()
+        order_claimed = None
+
+    if not order_claimed:
+        existing = session.exec(select(Payment).where(Payment.txn_id == txn_id)).first()
+        if existing is not None:
+            if existing.order_id == order.id:
+                # Duplicate verification: payment already processed
+                return existing
+            raise PaymentNotApplied(order.id, txn_id, f"recorded for order {existing.order_id}")
+
+        session.refresh(order)
+        paid = session.exec(
+            select(Payment)
+            .where(Payment.order_id == order.id, Payment.status == "success")
+            .order_by(Payment.created_at)
+        ).first()
+        if paid is not None:
+            # paid by another transaction (e.g. a second attempt): keep the first
+            logger.warning(
+                f"Payment {txn_id} not recorded, order {order.id} already paid by {paid.txn_id}; refund it"
+            )
+            return paid
+        raise PaymentNotApplied(order.id, txn_id, f"order is {order.status}")
+
+    # 📦 Reduce inventory ONCE (same transaction as the claim)
     reduce_inventory(session, order.id)
+    # the Core UPDATE above bypasses the ORM change capture
+    mark_dirty(session, order)
 
     session.commit()
-    session.refresh(payment)
+    session.refresh(order)
+    payment = session.get(Payment, payment_id)
+
+    # 🧾 Render the invoice in the background so downloads never wait on it
+    schedule_invoice(order.id)
 
     # 📧 Email (guest OR user)
     # send_payment_success_email(order, user)
 
-    return payment
\ No newline at end of file
+    return payment
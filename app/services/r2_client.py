@@ -2,6 +2,8 @@ import os
 import boto3
 from dotenv import load_dotenv
 
+from app.utils.metrics import instrument_s3_client
+
 
 load_dotenv()
 
@@ -19,6 +21,7 @@ s3_client = boto3.client(
     aws_secret_access_key=R2_SECRET_ACCESS_KEY,
     region_name="auto"
 )
+instrument_s3_client(s3_client)  # per-operation latency for /metrics
 
 
 # app/services/r2_client.py
@@ -0,0 +1,492 @@
+# app/services/razorpay_webhook.py
+"""
+Razorpay webhook ingestion.
+
+The endpoint only checks the HMAC signature and enqueues the raw body, so
+Razorpay gets its 200 in constant time no matter how busy the database is.
+A worker thread drains the queue in batches, resolves every referenced
+order / ebook purchase with one query per batch and completes them through
+``finalize_payment`` (idempotent), so a webhook racing the client's
+verify-razorpay-payment call can't pay an order twice.
+
+A payment is only marked as seen once it has been applied. Events that
+fail (e.g. a database error) are retried with backoff, WEBHOOK_MAX_ATTEMPTS
+times in all, and then appended to WEBHOOK_DEAD_LETTER_PATH (one body per
+line, replayable with benchmarks.replay_webhooks --file). Queued events
+live in memory only: if the process dies before a batch is applied, the
+client verify call and Razorpay's own re-delivery remain the fallback.
+"""
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.database import engine
+from app.models.book import Book
+from app.models.ebook_payment import EbookPayment
+from app.models.ebook_purchase import EbookPurchase
+from app.models.order import Order
+from app.models.user import User
+from app.notifications.dispatcher import dispatch_order_event
+from app.notifications.events import OrderEvent
+from app.services.payment_service import PaymentNotApplied, finalize_payment
+from app.utils.cache_helpers import cached_my_payments
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = {"payment.captured", "order.paid"}
+IDLE_POLL = 0.5  # seconds the worker waits for new events
+SEEN_CACHE_SIZE = 4096  # recently applied payment ids (redelivery short-circuit)
+RETRY_BASE_DELAY = 2.0  # seconds, doubled on every attempt
+
+
+@dataclass
+class WebhookEvent:
+    body: bytes
+    event_id: Optional[str] = None
+    received_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class CapturedPayment:
+    event_id: str
+    payment_id: str
+    gateway_order_id: str
+    amount: int  # paise
+    body: bytes = b""  # raw webhook, kept for the dead-letter file
+
+
+# ---------------------------------------------------------
+# Signature + parsing
+# ---------------------------------------------------------
+def sign_payload(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: Optional[str] = None) -> bool:
+    """Constant-time check of the X-Razorpay-Signature header"""
+    secret = secret or settings.RAZORPAY_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(body, secret), signature)
+
+
+def parse_event(event: WebhookEvent) -> Optional[CapturedPayment]:
+    """Extract the captured payment, or None for events we don't act on"""
+    try:
+        data = json.loads(event.body)
+    except ValueError:
+        logger.warning(f"Unparseable Razorpay webhook {event.event_id}")
+        return None
+
+    if data.get("event") not in HANDLED_EVENTS:
+        return None
+
+    entity = ((data.get("payload") or {}).get("payment") or {}).get("entity") or {}
+    if not entity.get("id") or not entity.get("order_id"):
+        return None
+    if entity.get("status") not in (None, "captured"):
+        return None
+
+    return CapturedPayment(
+        event_id=event.event_id or f"{data['event']}:{entity['id']}",
+        payment_id=entity["id"],
+        gateway_order_id=entity["order_id"],
+        amount=int(entity.get("amount") or 0),
+        body=event.body,
+    )
+
+
+def _paise(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+# ---------------------------------------------------------
+# Applying payments
+# ---------------------------------------------------------
+def _apply_order(session: Session, order: Order, captured: CapturedPayment) -> bool:
+    if order.status != "pending":
+        if order.status in ("expired", "cancelled"):
+            logger.warning(
+                f"Captured payment {captured.payment_id} for {order.status} "
+                f"order {order.id}; needs manual refund"
+            )
+        return False
+
+    if captured.amount != _paise(order.total):
+        logger.warning(
+            f"Amount mismatch for order {order.id}: "
+            f"captured {captured.amount}, expected {_paise(order.total)}"
+        )
+        return False
+
+    user = session.get(User, order.user_id) if order.user_id else None
+
+    try:
+        payment = finalize_payment(
+            session=session,
+            order=order,
+            txn_id=captured.payment_id,
+            amount=order.total,
+            method="razorpay",
+            payment_mode="online",
+            user=user,
+            gateway_order_id=captured.gateway_order_id,
+        )
+    except PaymentNotApplied:
+        # expired / cancelled since it was read above (logged for refund)
+        return False
+
+    if order.status != "paid" or payment.txn_id != captured.payment_id:
+        return False
+
+    extra = {
+        "popup_message": "Payment successful",
+        "admin_title": "Payment Received",
+        "admin_content": f"Payment for order #{order.id}",
+        "admin_template": "admin_emails/admin_payment_received.html",
+        "admin_subject": f"Payment received #{order.id}",
+        "user_subject": f"Payment success #{order.id}",
+        "order_id": order.id,
+        "amount": payment.amount,
+        "txn_id": payment.txn_id,
+    }
+    if user:
+        extra["user_template"] = "user_emails/user_payment_success.html"
+        extra["first_name"] = user.first_name
+    else:
+        extra["user_template"] = "user_emails/guest_user_payment_success.html"
+        extra["user_email"] = order.guest_email
+        extra["user_name"] = order.guest_name
+
+    dispatch_order_event(
+        event=OrderEvent.PAYMENT_SUCCESS,
+        order=order,
+        user=user,
+        session=session,
+        extra=extra,
+    )
+    session.commit()
+    return True
+
+
+def _apply_ebook(session: Session, purchase: EbookPurchase, captured: CapturedPayment) -> bool:
+    if captured.amount != _paise(purchase.amount):
+        logger.warning(
+            f"Amount mismatch for ebook purchase {purchase.id}: "
+            f"captured {captured.amount}, expected {_paise(purchase.amount)}"
+        )
+        return False
+
+    now = datetime.utcnow()
+
+    # 🔒 Only the first caller flips pending -> paid
+    claimed = session.execute(
+        update(EbookPurchase)
+        .where(EbookPurchase.id == purchase.id)
+        .where(EbookPurchase.status == "pending")
+        .values(status="paid", access_expires_at=None, updated_at=now)
+        .returning(EbookPurchase.id)
+    ).first()
+
+    if not claimed:
+        session.rollback()
+        return False
+
+    payment = EbookPayment(
+        ebook_purchase_id=purchase.id,
+        user_id=purchase.user_id,
+        txn_id=captured.payment_id,
+        amount=purchase.amount,
+        status="success",
+        method="razorpay",
+    )
+    session.add(payment)
+    session.commit()
+    session.refresh(purchase)
+
+    user = session.get(User, purchase.user_id)
+    book = session.get(Book, purchase.book_id)
+
+    dispatch_order_event(
+        event=OrderEvent.EBOOK_PAYMENT_SUCCESS,
+        order=purchase,
+        user=user,
+        session=session,
+        extra={
+            "user_template": "user_emails/user_ebook_payment_success.html",
+            "user_subject": "eBook payment successful",
+            "admin_template": "admin_emails/admin_ebook_payment_success.html",
+            "admin_subject": "eBook payment completed",
+            "book_title": book.title if book else "",
+            "amount": purchase.amount,
+            "purchase_id": purchase.id,
+            "txn_id": payment.txn_id,
+            "first_name": user.first_name if user else "",
+        },
+    )
+    session.commit()
+    return True
+
+
+def apply_batch(session: Session, batch: List[CapturedPayment]) -> Tuple[int, List[CapturedPayment]]:
+    """
+    Apply captured payments; returns how many orders/purchases were paid
+    and the payments that raised (to be retried)
+    """
+    gateway_ids = {c.gateway_order_id for c in batch}
+
+    orders: Dict[str, Order] = {
+        o.gateway_order_id: o
+        for o in session.exec(
+            select(Order).where(Order.gateway_order_id.in_(gateway_ids))
+        ).all()
+    }
+    remaining = gateway_ids - orders.keys()
+    purchases: Dict[str, EbookPurchase] = {}
+    if remaining:
+        purchases = {
+            p.gateway_order_id: p
+            for p in session.exec(
+                select(EbookPurchase).where(EbookPurchase.gateway_order_id.in_(remaining))
+            ).all()
+        }
+
+    paid = 0
+    failed: List[CapturedPayment] = []
+    touched_users = set()
+
+    for captured in batch:
+        try:
+            if captured.gateway_order_id in orders:
+                order = orders[captured.gateway_order_id]
+                if _apply_order(session, order, captured):
+                    paid += 1
+                    touched_users.add(order.user_id)
+            elif captured.gateway_order_id in purchases:
+                purchase = purchases[captured.gateway_order_id]
+                if _apply_ebook(session, purchase, captured):
+                    paid += 1
+                    touched_users.add(purchase.user_id)
+            else:
+                logger.warning(
+                    f"Razorpay webhook for unknown order {captured.gateway_order_id}"
+                )
+        except Exception as e:
+            session.rollback()
+            failed.append(captured)
+            logger.error(f"Razorpay webhook {captured.event_id} failed: {e}")
+
+    if paid:
+        from app.routes.book_detail import clear_book_detail_cache
+        from app.routes.user_library import _cached_my_ebooks
+
+        cached_my_payments.cache_clear()
+        _cached_my_ebooks.cache_clear()
+        clear_book_detail_cache()
+        logger.info(f"Razorpay webhooks paid {paid} orders for users {touched_users}")
+
+    return paid, failed
+
+
+# ---------------------------------------------------------
+# Worker
+# ---------------------------------------------------------
+class WebhookProcessor:
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        batch_wait: float = 0.2,
+        max_attempts: int = 5,
+        dead_letter_path: Optional[str] = None,
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+
+        self._queue: "queue.Queue[WebhookEvent]" = queue.Queue(maxsize=queue_size)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._retries: list = []  # heap of (due_at, seq, attempt, CapturedPayment)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="razorpay-webhooks", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Apply whatever is queued, then stop (pending retries go to the dead-letter file)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping.set()
+        if thread:
+            thread.join(timeout)
+
+        retries, self._retries = self._retries, []
+        if retries:
+            logger.warning(f"Webhook processor stopped with {len(retries)} retries pending")
+            self._dead_letter([captured for _, _, _, captured in retries])
+
+    # ---------- producer side ----------
+    def enqueue(self, event: WebhookEvent) -> bool:
+        self.start()
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            logger.error(f"Webhook queue full, rejecting event {event.event_id}")
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries)
+
+    # ---------- worker thread ----------
+    def _run(self):
+        while True:
+            events = self._collect()
+            retries = self._due_retries()
+            if events or retries:
+                self._process(events, retries)
+            elif self._stopping.is_set() and self._queue.empty():
+                break
+
+    def _collect(self) -> List[WebhookEvent]:
+        """Block for the first event, then gather a burst for up to batch_wait."""
+        idle = IDLE_POLL
+        if self._retries:
+            idle = max(0.01, min(IDLE_POLL, self._retries[0][0] - time.monotonic()))
+        try:
+            events = [self._queue.get(timeout=idle)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.batch_wait
+        while len(events) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    events.append(self._queue.get_nowait())
+                else:
+                    events.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return events
+
+    def _due_retries(self) -> List[Tuple[int, CapturedPayment]]:
+        """(attempts so far, payment) of the retries that are due"""
+        now = time.monotonic()
+        due = []
+        while self._retries and self._retries[0][0] <= now:
+            _, _, attempt, captured = heapq.heappop(self._retries)
+            due.append((attempt, captured))
+        return due
+
+    def _process(self, events: List[WebhookEvent], retries: List[Tuple[int, CapturedPayment]] = ()):
+        # Razorpay sends payment.captured and order.paid for the same
+        # payment, and re-delivers on timeouts: keep one per payment id
+        batch: Dict[str, CapturedPayment] = {}
+        attempts: Dict[str, int] = {}
+        for attempt, captured in retries:
+            batch[captured.payment_id] = captured
+            attempts[captured.payment_id] = attempt
+        for event in events:
+            captured = parse_event(event)
+            if captured and captured.payment_id not in self._seen:
+                batch.setdefault(captured.payment_id, captured)
+
+        if not batch:
+            return
+
+        try:
+            with Session(engine) as session:
+                _, failed = apply_batch(session, list(batch.values()))
+        except Exception as e:
+            logger.error(f"Razorpay webhook batch of {len(batch)} failed: {e}")
+            failed = list(batch.values())
+
+        failed_ids = {captured.payment_id for captured in failed}
+        for payment_id in batch:
+            if payment_id not in failed_ids:
+                self._seen[payment_id] = None
+        while len(self._seen) > SEEN_CACHE_SIZE:
+            self._seen.popitem(last=False)
+
+        given_up = []
+        for captured in failed:
+            attempt = attempts.get(captured.payment_id, 0) + 1
+            if attempt >= self.max_attempts:
+                given_up.append(captured)
+                continue
+            delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), attempt, captured))
+        if given_up:
+            logger.error(
+                f"Razorpay webhooks for payments {[c.payment_id for c in given_up]} "
+                f"failed {self.max_attempts} times"
+            )
+            self._dead_letter(given_up)
+
+    def _dead_letter(self, payments: List[CapturedPayment]):
+        if not self.dead_letter_path:
+            return
+        try:
+            with open(self.dead_letter_path, "ab") as f:
+                for captured in payments:
+                    f.write(captured.body.rstrip(b"\n") + b"\n")
+            logger.error(f"{len(payments)} webhooks written to {self.dead_letter_path} for replay")
+        except OSError as e:
+            logger.error(f"Could not write webhook dead-letter file: {e}")
+
+
+# ---------------------------------------------------------
+# Shared instance
+# ---------------------------------------------------------
+_processor: Optional[WebhookProcessor] = None
+_instance_lock = threading.Lock()
+
+
+def get_webhook_processor() -> WebhookProcessor:
+    global _processor
+    with _instance_lock:
+        if _processor is None:
+            _processor = WebhookProcessor(
+                queue_size=settings.WEBHOOK_QUEUE_SIZE,
+                batch_size=settings.WEBHOOK_BATCH_SIZE,
+                batch_wait=settings.WEBHOOK_BATCH_WAIT_MS / 1000,
+                max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+                dead_letter_path=settings.WEBHOOK_DEAD_LETTER_PATH,
+            )
+        return _processor
+
+
+def shutdown_webhook_processor():
+    global _processor
+    with _instance_lock:
+        processor, _processor = _processor, None
+    if processor:
+        processor.stop()
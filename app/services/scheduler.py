@@ -0,0 +1,287 @@
+# app/services/scheduler.py
+"""
+Expiry, reminder, rollup and export retention jobs, fired at their due times and safe with many workers.
+
+One process at a time is the scheduler leader. It holds a Postgres
+advisory lock on a dedicated autocommit connection, which is never left
+inside a transaction, so long jobs can't get it killed by
+idle_in_transaction_session_timeout. The leader works as a
+delay queue over the indexed deadline columns. It asks every job when it
+is next due (e.g. MIN(payment_expires_at) of pending orders) and sleeps
+until then. Sleeps are capped at MAX_IDLE so new orders are noticed. When
+a job is due, it runs the job's set-based sweep. Becoming leader (startup,
+failover) runs every job once as a catch-up sweep for anything missed
+while no scheduler was up. Each job also runs at least once per
+``interval`` as a safety net.
+
+Individual runs still take a per-job advisory lock and are recorded in
+``job_run``.
+
+Web workers schedule only when SCHEDULER_ENABLED is set. To keep them free
+of job work entirely, set it to false and run a dedicated process:
+
+    uv run python -m app.services.scheduler
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.database import engine
+from app.models.job_run import JobRun
+from app.services.analytics_export import expire_exports
+from app.services.analytics_rollup import reconcile_recent
+from app.services.order_expiry_service import (
+    expire_unpaid_ebooks,
+    expire_unpaid_orders,
+    next_ebook_expiry,
+    next_order_expiry,
+)
+from app.services.payment_remainders import (
+    next_ebook_payment_reminder,
+    next_payment_reminder,
+    send_ebook_payment_reminders,
+    send_payment_reminders,
+)
+from app.utils.metrics import JOB_SECONDS, JOB_SKIPPED
+
+logger = logging.getLogger(__name__)
+
+HOST = f"{socket.gethostname()}:{os.getpid()}"
+
+MAX_IDLE = 60  # seconds between due-time checks when nothing is due sooner
+MIN_RERUN = 30  # seconds before the same job can fire again
+LEADER_RETRY = 30  # seconds between attempts to become leader
+LEADER_LOCK = "scheduler:leader"
+
+
+@dataclass
+class Job:
+    id: str
+    func: Callable[[], None]
+    interval: timedelta  # safety-net sweep
+    next_due: Optional[Callable[[Session], Optional[datetime]]] = None
+
+
+JOBS: List[Job] = [
+    Job("expire_unpaid_orders", expire_unpaid_orders, timedelta(hours=1), next_order_expiry),
+    Job("expire_unpaid_ebooks", expire_unpaid_ebooks, timedelta(hours=1), next_ebook_expiry),
+    Job("send_payment_reminders", send_payment_reminders, timedelta(hours=1), next_payment_reminder),
+    Job("send_ebook_payment_reminders", send_ebook_payment_reminders, timedelta(hours=1), next_ebook_payment_reminder),
+    Job("reconcile_analytics_rollups", reconcile_recent, timedelta(hours=1)),
+    Job("expire_analytics_exports", expire_exports, timedelta(minutes=15)),
+]
+
+
+# ---------------------------------------------------------
+# Metrics (per process)
+# ---------------------------------------------------------
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    total_seconds: float = 0.0
+    last_seconds: Optional[float] = None
+    last_status: Optional[str] = None
+    last_finished_at: Optional[datetime] = None
+
+
+_stats: Dict[str, JobStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(job_id: str, status: str, seconds: float = 0.0):
+    if status == "skipped":
+        JOB_SKIPPED.labels(job_id).inc()
+    else:
+        JOB_SECONDS.labels(job_id, status).observe(seconds)
+    with _stats_lock:
+        stats = _stats.setdefault(job_id, JobStats())
+        if status == "skipped":
+            stats.skipped += 1
+            return
+        stats.runs += 1
+        stats.failures += status == "failed"
+        stats.total_seconds += seconds
+        stats.last_seconds = seconds
+        stats.last_status = status
+        stats.last_finished_at = datetime.utcnow()
+
+
+def job_metrics() -> Dict[str, dict]:
+    """Snapshot of run counts and timings for jobs run by this process"""
+    with _stats_lock:
+        return {job_id: dict(vars(stats)) for job_id, stats in _stats.items()}
+
+
+# ---------------------------------------------------------
+# Running
+# ---------------------------------------------------------
+def _lock_key(name: str) -> int:
+    return zlib.crc32(f"job:{name}".encode())
+
+
+def run_job(job: Job) -> Optional[str]:
+    """
+    Run the job if this process wins its advisory lock.
+    Returns the run status, or None when skipped.
+    """
+    key = _lock_key(job.id)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar():
+            _record(job.id, "skipped")
+            return None
+
+        try:
+            with Session(engine) as session:
+                run = JobRun(job_id=job.id, host=HOST)
+                session.add(run)
+                session.commit()
+                session.refresh(run)
+
+            started = time.perf_counter()
+            error = None
+            try:
+                job.func()
+                status = "success"
+            except Exception as e:
+                status, error = "failed", str(e)
+                logger.exception(f"Job {job.id} failed")
+            seconds = time.perf_counter() - started
+
+            with Session(engine) as session:
+                run = session.get(JobRun, run.id)
+                run.status = status
+                run.finished_at = datetime.utcnow()
+                run.duration_ms = int(seconds * 1000)
+                run.error = error
+                session.commit()
+
+            _record(job.id, status, seconds)
+            logger.info(f"Job {job.id} {status} in {seconds:.2f}s on {HOST}")
+            return status
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+# ---------------------------------------------------------
+# Leader loop (delay queue over deadline columns)
+# ---------------------------------------------------------
+class DueTimeScheduler:
+    def __init__(self, jobs: List[Job]):
+        self.jobs = jobs
+        self._last_run: Dict[str, float] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------- loop ----------
+    def run(self):
+        key = _lock_key(LEADER_LOCK)
+
+        while not self._stopping.is_set():
+            try:
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar():
+                        self._stopping.wait(LEADER_RETRY)
+                        continue
+
+                    logger.info(f"Scheduler leader is {HOST}")
+                    try:
+                        self._lead(conn)
+                    finally:
+                        conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            except Exception:
+                # lost the database (and with it the lock): back off, re-elect
+                logger.exception("Scheduler leader loop failed")
+                self._stopping.wait(LEADER_RETRY)
+
+    def _lead(self, conn):
+        # catch-up sweep for anything that fell due while nobody led
+        self._last_run.clear()
+        for job in self.jobs:
+            self._fire(job)
+
+        while not self._stopping.is_set():
+            conn.execute(text("SELECT 1"))  # leader connection still alive?
+
+            wake = time.time() + MAX_IDLE
+            for job in self.jobs:
+                due = self._due_at(job)
+                if due <= time.time():
+                    self._fire(job)
+                    due = self._due_at(job)
+                wake = min(wake, due)
+
+            self._stopping.wait(max(0.5, wake - time.time()))
+
+    def _due_at(self, job: Job) -> float:
+        """Epoch seconds at which the job should next fire"""
+        last = self._last_run.get(job.id, 0.0)
+        due = last + job.interval.total_seconds()
+
+        if job.next_due is not None:
+            # a session per lookup: nothing stays idle in a transaction
+            # (idle_in_transaction_session_timeout) while a job runs
+            with Session(engine) as session:
+                next_due = job.next_due(session)
+            if next_due is not None:
+                # deadlines are naive UTC
+                due = min(due, (next_due - datetime.utcnow()).total_seconds() + time.time())
+
+        return max(due, last + MIN_RERUN)
+
+    def _fire(self, job: Job):
+        self._last_run[job.id] = time.time()
+        run_job(job)
+
+
+_scheduler: Optional[DueTimeScheduler] = None
+
+
+def start_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = DueTimeScheduler(JOBS)
+        _scheduler.start()
+
+
+def shutdown_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def run_forever():
+    """Dedicated scheduler process (web workers run with SCHEDULER_ENABLED=false)"""
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Scheduler process started on {HOST}")
+    DueTimeScheduler(JOBS).run()
+
+
+if __name__ == "__main__":
+    run_forever()
@@ -1,4 +1,6 @@
-from functools import lru_cache
+import asyncio
+from collections import OrderedDict
+from functools import _CacheInfo, lru_cache, wraps
 import time
 from sqlmodel import select
 from app.database import get_session
@@ -12,6 +14,51 @@ def _ttl_bucket():
     return int(time.time() // CACHE_TTL)
 
 
+def async_lru_cache(maxsize: int = 128):
+    """
+    lru_cache for coroutine functions (same cache_clear() / cache_info() API).
+    Concurrent misses for the same key share one in-flight call;
+    failed calls are not cached. cache_clear() may be called from the
+    sync routes' worker threads.
+    """
+    def decorator(fn):
+        cache: "OrderedDict[tuple, asyncio.Future]" = OrderedDict()
+        stats = [0, 0]  # hits, misses
+
+        @wraps(fn)
+        async def wrapper(*args):
+            future = cache.get(args)
+            if future is None:
+                stats[1] += 1
+                future = asyncio.ensure_future(fn(*args))
+                cache[args] = future
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            else:
+                stats[0] += 1
+                try:
+                    cache.move_to_end(args)
+                except KeyError:  # cleared meanwhile
+                    pass
+
+            try:
+                return await asyncio.shield(future)
+            except Exception:
+                if cache.get(args) is future:
+                    cache.pop(args, None)
+                raise
+
+        def cache_clear():
+            cache.clear()
+            stats[:] = [0, 0]
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = lambda: _CacheInfo(stats[0], stats[1], maxsize, len(cache))
+        return wrapper
+
+    return decorator
+
+
 @lru_cache(maxsize=512)
 def cached_addresses(user_id: int, bucket: int):
     with next(get_session()) as session:
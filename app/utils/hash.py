@@ -1,9 +1,175 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(
+        schemes=["bcrypt_sha256"],
+        deprecated="auto",
+        bcrypt_sha256__rounds=rounds,
+    )
+
+
+pwd_context = _context(settings.PASSWORD_HASH_ROUNDS)
+
+
+# ---------------------------------------------------------
+# Worker-side (run in the hashing processes)
+# ---------------------------------------------------------
+def _init_worker(niceness: int):
+    # lower priority than the API process, so request handling wins the
+    # CPU when workers and web share cores
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    # new hash only when the stored one was made with another cost/scheme
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+# ---------------------------------------------------------
+# Bounded process pool
+# ---------------------------------------------------------
+class PasswordHasher:
+    """
+    bcrypt off the request threads: runs in PASSWORD_HASH_WORKERS
+    processes (no GIL contention with the catalogue). At most
+    PASSWORD_HASH_MAX_PENDING calls are queued. Anything past that fails
+    fast with 503 rather than piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int, niceness: int = 0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.niceness = niceness
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        # caller holds self._lock
+        if self._pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.niceness,),
+            )
+        return self._pool
+
+    def start(self):
+        with self._lock:
+            pool = self._ensure_pool()
+        # pay the interpreter start-up now, not on the first login
+        for future in [pool.submit(_hash, "warm-up", 4) for _ in range(self.workers)]:
+            future.result()
+        logger.info(f"Password hasher started: {self.workers} workers, rounds={settings.PASSWORD_HASH_ROUNDS}")
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in requests, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            pool = self._ensure_pool()
+            self._pending += 1
+
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "rounds": settings.PASSWORD_HASH_ROUNDS,
+            }
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(
+            settings.PASSWORD_HASH_WORKERS,
+            settings.PASSWORD_HASH_MAX_PENDING,
+            settings.PASSWORD_HASH_WORKER_NICE,
+        )
+    return _hasher
+
+
+def shutdown_password_hasher():
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+
+
+# ---------------------------------------------------------
+# API
+# ---------------------------------------------------------
+async def hash_password_async(password: str) -> str:
+    future = get_password_hasher().submit(_hash, password, settings.PASSWORD_HASH_ROUNDS)
+    return await asyncio.wrap_future(future)
+
+
+async def verify_and_update_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash if the stored one should be upgraded)"""
+    future = get_password_hasher().submit(
+        _verify_and_update, password, hashed, settings.PASSWORD_HASH_ROUNDS
+    )
+    return await asyncio.wrap_future(future)
+
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return get_password_hasher().submit(_hash, password, settings.PASSWORD_HASH_ROUNDS).result()
+
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    future = get_password_hasher().submit(
+        _verify_and_update, plain_password, hashed_password, settings.PASSWORD_HASH_ROUNDS
+    )
+    return future.result()[0]
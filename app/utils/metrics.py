@@ -0,0 +1,235 @@
+# app/utils/metrics.py
+"""
+Prometheus metrics served at /metrics (text exposition format). Values
+are per process, like /health/metrics.
+
+Hot-path metrics (requests, emails, R2 calls) are observed through label
+children bound once and reused, so recording is a lookup and a locked
+add. Everything that already keeps its own numbers (connection pool,
+replica, password hashing, lru caches) is read by RuntimeCollector at
+scrape time instead, at no cost per request.
+"""
+import sys
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+disable_created_metrics()  # no *_created series next to every counter/histogram
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def route_template(scope) -> str:
+    """The matched route's path ("/book/{slug}"), so ids don't explode label sets"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# ---------------------------------------------------------
+# HTTP (MetricsMiddleware)
+# ---------------------------------------------------------
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request received to response body sent",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+HTTP_RESPONSES = Counter(
+    "http_responses",
+    "Responses sent, by status class",
+    ["method", "route", "status"],
+    registry=registry,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled",
+    registry=registry,
+)
+
+_STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+# the method comes from the client: anything else is "OTHER", or every
+# made-up verb would add series for good
+_METHODS = frozenset(("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"))
+_http_children: Dict[Tuple[str, str], tuple] = {}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    if method not in _METHODS:
+        method = "OTHER"
+    children = _http_children.get((method, route))
+    if children is None:
+        children = _http_children.setdefault((method, route), (
+            HTTP_SECONDS.labels(method, route),
+            [HTTP_RESPONSES.labels(method, route, status_class) for status_class in _STATUS_CLASSES],
+        ))
+    histogram, responses = children
+    histogram.observe(seconds)
+    responses[min(max(status // 100, 1), 5) - 1].inc()
+
+
+# ---------------------------------------------------------
+# SQL per request (QueryStatsMiddleware)
+# ---------------------------------------------------------
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements run by one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    registry=registry,
+)
+DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time one request spent waiting on SQL statements",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    registry=registry,
+)
+
+# ---------------------------------------------------------
+# Background work and outbound calls
+# ---------------------------------------------------------
+JOB_SECONDS = Histogram(
+    "scheduled_job_duration_seconds",
+    "Scheduled job run time",
+    ["job", "status"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600),
+    registry=registry,
+)
+JOB_SKIPPED = Counter(
+    "scheduled_job_skipped",
+    "Job runs skipped (another worker holds the lock)",
+    ["job"],
+    registry=registry,
+)
+
+EMAIL_SECONDS = Histogram(
+    "email_send_duration_seconds",
+    "Brevo API call time per send (one message or one batch)",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+EMAIL_SENT = EMAIL_SECONDS.labels("ok")
+EMAIL_FAILED = EMAIL_SECONDS.labels("failed")
+
+R2_SECONDS = Histogram(
+    "r2_request_duration_seconds",
+    "R2 (S3 API) call time, by operation",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+_r2_children: Dict[Tuple[str, str], object] = {}
+
+
+def _r2_started(model, context, **kwargs):
+    context["metrics_call"] = model.name, time.perf_counter()
+
+
+def _r2_finished(context, outcome: str):
+    call = context.pop("metrics_call", None)
+    if call is None:
+        return
+    operation, started = call
+    child = _r2_children.get((operation, outcome))
+    if child is None:
+        child = _r2_children.setdefault((operation, outcome), R2_SECONDS.labels(operation, outcome))
+    child.observe(time.perf_counter() - started)
+
+
+def _r2_succeeded(context, **kwargs):
+    _r2_finished(context, "ok")
+
+
+def _r2_errored(context, **kwargs):
+    _r2_finished(context, "error")
+
+
+def instrument_s3_client(client):
+    """Time every API call made through a boto3 S3 client"""
+    events = client.meta.events
+    events.register("before-call.s3", _r2_started)
+    events.register("after-call.s3", _r2_succeeded)
+    events.register("after-call-error.s3", _r2_errored)
+
+
+# ---------------------------------------------------------
+# Read at scrape time
+# ---------------------------------------------------------
+def _lru_caches():
+    """Module-level functools.lru_cache / async_lru_cache functions under app.*"""
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith("app.") or module is None:
+            continue
+        for name, value in list(vars(module).items()):
+            if callable(value) and hasattr(value, "cache_info") and getattr(value, "__module__", None) == module_name:
+                yield f"{module_name[4:]}.{name}", value
+
+
+class RuntimeCollector:
+    def collect(self):
+        from app.database import pool_metrics, replica_monitor
+        from app.utils.hash import get_password_hasher
+
+        pool = pool_metrics()
+        for key, help_text in [
+            ("size", "Connections kept open"),
+            ("checked_out", "Connections in use"),
+            ("overflow", "Connections open beyond size"),
+        ]:
+            yield GaugeMetricFamily(f"db_pool_{key}", help_text, value=pool[key])
+        yield CounterMetricFamily("db_pool_checkouts", "Connection checkouts", value=pool["checkouts"])
+        yield CounterMetricFamily(
+            "db_pool_wait_seconds", "Time spent waiting for a connection", value=pool["wait_seconds_total"]
+        )
+        yield CounterMetricFamily("db_pool_timeouts", "Checkouts that gave up waiting", value=pool["timeouts"])
+
+        replica = replica_monitor.metrics()
+        if replica["configured"]:
+            yield GaugeMetricFamily("db_replica_lag_seconds", "Replica replay lag", value=replica["lag_seconds"] or 0)
+            reads = CounterMetricFamily("db_reads", "Read-only requests by engine", labels=["engine"])
+            for target, count in replica["reads"].items():
+                reads.add_metric([target], count)
+            yield reads
+
+        hashing = get_password_hasher().metrics()
+        yield GaugeMetricFamily("password_hash_pending", "Hash/verify calls queued or running", value=hashing["pending"])
+        yield CounterMetricFamily(
+            "password_hash_rejected", "Calls turned away with 503 (queue full)", value=hashing["rejected"]
+        )
+
+        hits = CounterMetricFamily("cache_hits", "lru cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "lru cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("cache_evictions", "lru cache entries evicted", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "lru cache entries held", labels=["cache"])
+        for name, cached in _lru_caches():
+            info = cached.cache_info()
+            hits.add_metric([name], info.hits)
+            misses.add_metric([name], info.misses)
+            # every miss adds an entry; entries only leave by eviction or by
+            # cache_clear(), which also zeroes the counts
+            evictions.add_metric([name], max(info.misses - info.currsize, 0))
+            entries.add_metric([name], info.currsize)
+        yield from (hits, misses, evictions, entries)
+
+
+registry.register(RuntimeCollector())
+
+
+def render() -> bytes:
+    return generate_latest(registry)
+
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -33,3 +33,36 @@ def paginate(
         "limit": limit,
         "results": results,
     }
+
+
+async def apaginate(
+    *,
+    session,
+    query,
+    page: int = 1,
+    limit: int = 10,
+):
+    """paginate() for an AsyncSession"""
+    if page < 1:
+        page = 1
+
+    if limit < 1:
+        limit = 10
+
+    offset = (page - 1) * limit
+
+    total = (await session.exec(
+        select(func.count()).select_from(query.subquery())
+    )).one()
+
+    results = (await session.exec(
+        query.offset(offset).limit(limit)
+    )).all()
+
+    return {
+        "total_items": total,
+        "total_pages": (total + limit - 1) // limit,
+        "current_page": page,
+        "limit": limit,
+        "results": results,
+    }
@@ -0,0 +1,216 @@
+# app/utils/profiler.py
+"""
+On-demand sampling profiler writing speedscope files.
+
+While a capture runs, a daemon thread snapshots every thread's Python
+stack (sys._current_frames) each PROFILING_INTERVAL_MS. The profiled code
+runs unmodified (no trace or profile hooks) and between captures nothing
+runs at all. A capture covers the whole worker: the event loop,
+threadpool workers running `def` routes and their SQL, and background
+threads, each as its own profile in the file. Parked threads (waiting on
+a queue, an event or the selector) are left out, so what remains is
+where time goes, including time blocked inside a driver call.
+
+One capture runs at a time per worker, at most PROFILING_PER_MINUTE a
+minute. Files are in the speedscope format (open them at
+https://www.speedscope.app) and the newest PROFILING_KEEP are kept in
+LOCAL_DIR, shared by the workers on a host.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+LOCAL_DIR = Path(tempfile.gettempdir()) / "hithabodha_profiles"
+PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{8}$")
+
+# leaf frames of a thread that is waiting for work, not doing any
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("connection.py", "wait"),  # multiprocessing
+}
+_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)}, key=len, reverse=True)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+# ---------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------
+class Capture:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.seconds = 0.0
+        self.frames: List[dict] = []
+        self._frame_index: Dict[object, int] = {}
+        # thread id -> [[stack (root first), ms], ...], repeats of a stack merged
+        self.samples: Dict[int, List[list]] = {}
+        self.thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _frame(self, code) -> int:
+        index = self._frame_index.get(code)
+        if index is None:
+            index = self._frame_index[code] = len(self.frames)
+            self.frames.append({
+                "name": code.co_qualname,
+                "file": _short_path(code.co_filename),
+                "line": code.co_firstlineno,
+            })
+        return index
+
+    def _record(self, ident: int, frame, ms: float):
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self._frame(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+
+        samples = self.samples.setdefault(ident, [])
+        if samples and samples[-1][0] == stack:
+            samples[-1][1] += ms
+        else:
+            samples.append([stack, ms])
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            ms = (now - last) * 1000  # actual gap, the GIL can delay a tick
+            last = now
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self._record(ident, frame, ms)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        self.thread_names = {t.ident: t.name for t in threading.enumerate()}
+
+    def to_speedscope(self, name: str) -> dict:
+        profiles = []
+        for ident, samples in self.samples.items():
+            total = sum(ms for _, ms in samples)
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self.thread_names.get(ident, 'thread')} ({ident})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(total, 3),
+                "samples": [stack for stack, _ in samples],
+                "weights": [round(ms, 3) for _, ms in samples],
+            })
+        profiles.sort(key=lambda p: p["endValue"], reverse=True)  # busiest thread opens first
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{name} ({self.seconds:.2f}s)",
+            "exporter": "app.utils.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+# ---------------------------------------------------------
+# One capture at a time, rate limited
+# ---------------------------------------------------------
+_lock = threading.Lock()
+_running: Optional[Capture] = None
+_recent: deque = deque()
+
+
+def begin() -> Capture:
+    """Start sampling the worker (ProfilerBusy if one runs or the rate is used up)"""
+    global _running
+    with _lock:
+        if _running is not None:
+            raise ProfilerBusy("a capture is already running")
+        now = time.monotonic()
+        while _recent and now - _recent[0] > 60:
+            _recent.popleft()
+        if len(_recent) >= settings.PROFILING_PER_MINUTE:
+            raise ProfilerBusy("rate limited")
+        _recent.append(now)
+        _running = Capture(settings.PROFILING_INTERVAL_MS / 1000)
+    _running.start()
+    return _running
+
+
+def end(capture: Capture):
+    global _running
+    capture.stop()
+    with _lock:
+        _running = None
+
+
+# ---------------------------------------------------------
+# Files
+# ---------------------------------------------------------
+def new_profile_id() -> str:
+    return f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = LOCAL_DIR / f"{profile_id}.speedscope.json"
+    return path if path.exists() else None
+
+
+def save(capture: Capture, profile_id: str, name: str) -> Path:
+    LOCAL_DIR.mkdir(parents=True, exist_ok=True)
+    path = LOCAL_DIR / f"{profile_id}.speedscope.json"
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(capture.to_speedscope(name), f, separators=(",", ":"))
+    os.replace(tmp, path)  # never served half-written
+
+    # ids start with the unix time, so name order is age order
+    for old in sorted(LOCAL_DIR.glob("*.speedscope.json"))[:-settings.PROFILING_KEEP]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def list_profiles() -> List[Tuple[str, int, float]]:
+    """(id, bytes, saved at) of stored profiles, newest first"""
+    if not LOCAL_DIR.exists():
+        return []
+    found = []
+    for path in sorted(LOCAL_DIR.glob("*.speedscope.json"), reverse=True):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:  # pruned by another worker meanwhile
+            continue
+        found.append((path.name.split(".")[0], stat.st_size, stat.st_mtime))
+    return found
@@ -0,0 +1,116 @@
+# app/utils/query_stats.py
+"""
+Per-request SQL accounting: how many statements a request ran, how long
+they took in total and which were the slowest.
+
+Cursor events on every engine add to the QueryStats of the current
+context (a ContextVar, so it follows the request into the threadpool and
+into the async engine's greenlets). Nothing is recorded outside
+track() / query_budget(), and the events are only attached once
+install() has been called (QUERY_STATS_ENABLED, or a budget check).
+"""
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_installed = False
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "_slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._slowest: List[Tuple[float, int, str]] = []  # min-heap (seconds, n, statement)
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        entry = (seconds, self.count, statement)
+        if len(self._slowest) < settings.QUERY_STATS_SLOWEST:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """Slowest statements, slowest first, as (seconds, first line of SQL)"""
+        return [
+            (seconds, " ".join(statement.split())[:200])
+            for seconds, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+# ---------------------------------------------------------
+# Engine events
+# ---------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.add(statement, time.perf_counter() - started.pop())
+
+
+def install():
+    """Attach the cursor events to the primary, replica and async engines"""
+    global _installed
+    if _installed:
+        return
+    from app.database import async_engine, engine, replica_engine
+
+    for bind in (engine, replica_engine, async_engine.sync_engine):
+        if bind is not None:
+            event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+            event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+# ---------------------------------------------------------
+# Scopes
+# ---------------------------------------------------------
+@contextmanager
+def track() -> Iterator[QueryStats]:
+    """Count the statements run in this context (and tasks/threads started from it)"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[QueryStats]:
+    """
+    Fail when the block runs more than `max_queries` statements, e.g.
+
+        with query_budget(3, "order history"):
+            client.get("/users/profile/orders/history")
+    """
+    install()
+    with track() as stats:
+        yield stats
+    if stats.count > max_queries:
+        slowest = "\n".join(f"  {s * 1000:.1f}ms  {sql}" for s, sql in stats.slowest())
+        raise QueryBudgetExceeded(
+            f"{label}: {stats.count} queries (budget {max_queries})\n{slowest}"
+        )
@@ -1,10 +1,101 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import lru_cache
+from types import MappingProxyType
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    TemplateSyntaxError,
+    select_autoescape,
+)
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
 
 env = Environment(
-    loader=FileSystemLoader("app/templates"),
-    autoescape=select_autoescape(["html"])
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    # compiled templates survive restarts and are shared by all workers;
+    # no directory given: Jinja uses a per-user 0700 one and checks its owner
+    bytecode_cache=FileSystemBytecodeCache(),
+    # only stat template files for changes while developing
+    auto_reload=settings.ENV == "local",
+    cache_size=-1,
 )
 
+# Rendered output for contexts made only of plain values
+# (e.g. the same admin email rendered once per admin recipient)
+FRAGMENT_CACHE_SIZE = 256
+_HASHABLE_TYPES = (str, int, float, bool, type(None), date, datetime)
+_fragments: "OrderedDict[tuple, str]" = OrderedDict()
+_fragments_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2)
+def _base_context_for(year: int):
+    return MappingProxyType({
+        "current_year": year,
+        "store_name": settings.STORE_NAME,
+    })
+
+
+def base_context() -> MappingProxyType:
+    """Shared read-only context merged into every email template"""
+    return _base_context_for(datetime.utcnow().year)
+
+
+def precompile_templates() -> int:
+    """
+    Compile every template once (fills the bytecode cache).
+    Returns the number compiled; a broken template is logged, not fatal.
+    """
+    compiled = 0
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except TemplateSyntaxError as e:
+            logger.error(f"Template {name} failed to compile (line {e.lineno}): {e.message}")
+    return compiled
+
+
+def _fragment_key(template_path: str, context: dict):
+    if not all(isinstance(v, _HASHABLE_TYPES) for v in context.values()):
+        return None
+    return (template_path, tuple(sorted(context.items())))
+
+
 def render_template(template_path: str, **context) -> str:
+    base = base_context()
+    key = _fragment_key(template_path, {**base, **context})
+
+    if key is not None:
+        with _fragments_lock:
+            html = _fragments.get(key)
+            if html is not None:
+                _fragments.move_to_end(key)
+                return html
+
     template = env.get_template(template_path)
-    return template.render(**context)
+    html = template.render(base, **context)
+
+    if key is not None:
+        with _fragments_lock:
+            _fragments[key] = html
+            if len(_fragments) > FRAGMENT_CACHE_SIZE:
+                _fragments.popitem(last=False)
+
+    return html
+
+
+def clear_fragment_cache():
+    with _fragments_lock:
+        _fragments.clear()
@@ -1,16 +1,26 @@
 from jose import jwt
 from datetime import datetime, timedelta
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession, make_transient_to_detached
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import settings
-from app.database import get_session
+from app.database import get_async_session, get_session
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+def token_claims(user: User) -> dict:
+    """Claims for create_access_token (role/can_login let checks skip the DB)"""
+    return {"user_id": user.id, "role": user.role, "can_login": user.can_login}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
 
@@ -42,10 +52,76 @@ def decode_access_token(token: str):
         return None
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
-) -> User:
+# ---------------------------------------------------------
+# Principal cache: the user columns auth needs, per process,
+# for USER_CACHE_TTL seconds. Cleared for a user once a commit
+# that updated their row goes through.
+# ---------------------------------------------------------
+PRINCIPAL_FIELDS = (
+    "id", "first_name", "last_name", "username", "email",
+    "role", "can_login", "profile_image",
+)
+
+_principals: Dict[int, Tuple[float, dict]] = {}
+_principals_lock = threading.Lock()
+
+
+def _cached_principal(user_id: int) -> Optional[dict]:
+    with _principals_lock:
+        entry = _principals.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _remember(user: Optional[User]) -> Optional[dict]:
+    if user is None:
+        return None
+    data = {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+    with _principals_lock:
+        _principals[user.id] = (time.monotonic() + settings.USER_CACHE_TTL, data)
+    return data
+
+
+def invalidate_user(user_id: int):
+    with _principals_lock:
+        _principals.pop(user_id, None)
+
+
+def _user_from_principal(data: Optional[dict]) -> Optional[User]:
+    """
+    A fresh detached User per request holding only the principal columns.
+    session.add() re-attaches it for updates; other columns (password,
+    created_at, ...) load on access once attached.
+    """
+    if data is None:
+        return None
+    user = User(**data)
+    for name in set(user.__dict__) - set(PRINCIPAL_FIELDS) - {"_sa_instance_state"}:
+        del user.__dict__[name]  # defaults filled in by the model, not DB values
+    make_transient_to_detached(user)
+    return user
+
+
+@event.listens_for(User, "after_update")
+def _mark_user_updated(mapper, connection, target):
+    session = OrmSession.object_session(target)
+    if session is not None:
+        session.info.setdefault("updated_user_ids", set()).add(target.id)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_updated_users(session):
+    for user_id in session.info.pop("updated_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_updated_users(session):
+    session.info.pop("updated_user_ids", None)
+
+
+def _token_payload(token: str) -> dict:
     payload = decode_access_token(token)
 
     if payload is None:
@@ -55,6 +131,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if payload.get("can_login") is False:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is disabled"
+        )
+
+    return payload
+
+
+def _user_id_from_token(token: str) -> int:
+    payload = _token_payload(token)
+
     user_id = payload.get("user_id") or payload.get("sub")
 
     if user_id is None:
@@ -63,8 +151,10 @@ def get_current_user(
             detail="Invalid token payload"
         )
 
-    user = session.get(User, int(user_id))
+    return int(user_id)
+
 
+def _check_user(user: Optional[User]) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -79,6 +169,29 @@ def get_current_user(
 
     return user
 
+
+def _load_principal(session: Session, user_id: int) -> Optional[dict]:
+    return _cached_principal(user_id) or _remember(session.get(User, user_id))
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session)
+) -> User:
+    user_id = _user_id_from_token(token)
+    return _check_user(_user_from_principal(_load_principal(session, user_id)))
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    """get_current_user for async routes (runs on the event loop)"""
+    user_id = _user_id_from_token(token)
+    principal = _cached_principal(user_id) or _remember(await session.get(User, user_id))
+    return _check_user(_user_from_principal(principal))
+
+
 def get_current_admin(
     token: str = Depends(oauth2_scheme),
     session: Session = Depends(get_session),
@@ -88,12 +201,17 @@ def get_current_admin(
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # tokens carrying a role claim are turned away without a lookup
+    if payload.get("role") not in (None, "admin") or payload.get("can_login") is False:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
     user_id = payload.get("user_id") or payload.get("sub")
 
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = session.get(User, int(user_id))
+    # the cached role still decides, so a demotion applies within USER_CACHE_TTL
+    user = _user_from_principal(_load_principal(session, int(user_id)))
 
     if not user or user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -0,0 +1,186 @@
+# benchmarks/bench_async_routes.py
+"""
+Throughput of the hot public reads on the sync engine vs the async engine.
+
+Each scenario runs the same query shape both ways at the given concurrency:
+sync through psycopg2 sessions in a thread pool (how FastAPI runs `def`
+routes, 40 threads by default) and async through asyncpg AsyncSessions
+as asyncio tasks (how the ported `async def` routes run). Caches are
+bypassed, so this measures the database path only.
+
+With --url the listed endpoints are instead loaded over HTTP, which can be
+pointed at a deployment before and after the port.
+
+Run:  uv run python -m benchmarks.bench_async_routes --requests 2000 --concurrency 64
+      uv run python -m benchmarks.bench_async_routes --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import requests
+from sqlmodel import Session, select
+
+from app.database import async_engine, async_session_factory, engine
+from app.models.book import Book
+from app.models.category import Category
+from app.utils.pagination import apaginate, paginate
+
+SYNC_THREADS = 40  # anyio's default worker thread limit
+
+
+def _visible_books():
+    return (
+        select(Book)
+        .where(Book.is_deleted == False, Book.is_archived == False)
+        .order_by(Book.updated_at.desc())
+    )
+
+
+def _filtered_books():
+    return (
+        select(Book, Category)
+        .outerjoin(Category, Book.category_id == Category.id)
+        .where(Book.is_deleted == False, Book.is_archived == False)
+        .where(Book.price >= 100)
+        .order_by(Book.updated_at.desc())
+    )
+
+
+def _book_by_slug(slug: str):
+    return select(Book.id).where(Book.slug == slug)
+
+
+# ---------------------------------------------------------
+# Scenarios: (name, sync fn, async fn)
+# ---------------------------------------------------------
+def scenarios(slug: str):
+    def sync_list():
+        with Session(engine) as session:
+            paginate(session=session, query=_visible_books(), page=1, limit=12)
+
+    async def async_list():
+        async with async_session_factory() as session:
+            await apaginate(session=session, query=_visible_books(), page=1, limit=12)
+
+    def sync_filter():
+        with Session(engine) as session:
+            paginate(session=session, query=_filtered_books(), page=1, limit=12)
+
+    async def async_filter():
+        async with async_session_factory() as session:
+            await apaginate(session=session, query=_filtered_books(), page=1, limit=12)
+
+    def sync_detail():
+        with Session(engine) as session:
+            session.exec(_book_by_slug(slug)).first()
+
+    async def async_detail():
+        async with async_session_factory() as session:
+            (await session.exec(_book_by_slug(slug))).first()
+
+    return [
+        ("/books", sync_list, async_list),
+        ("/books/filter", sync_filter, async_filter),
+        ("/book/detail/{slug}", sync_detail, async_detail),
+    ]
+
+
+def _summary(latencies: List[float], elapsed: float) -> str:
+    latencies.sort()
+    return (
+        f"{len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={latencies[len(latencies) // 2]:7.2f}ms  "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1]:7.2f}ms"
+    )
+
+
+def run_sync(fn: Callable, total: int) -> str:
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SYNC_THREADS) as pool:
+        latencies = list(pool.map(timed, range(total)))
+    return _summary(latencies, time.perf_counter() - started)
+
+
+async def run_async(fn: Callable, total: int, concurrency: int) -> str:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with gate:
+            start = time.perf_counter()
+            await fn()
+            return (time.perf_counter() - start) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(timed() for _ in range(total)))
+    return _summary(list(latencies), time.perf_counter() - started)
+
+
+def bench_direct(total: int, concurrency: int):
+    with Session(engine) as session:
+        slug = session.exec(select(Book.slug).where(Book.slug.is_not(None))).first() or "missing"
+
+    loop = asyncio.new_event_loop()
+    try:
+        for name, sync_fn, async_fn in scenarios(slug):
+            # warm both pools so connection setup is not measured
+            run_sync(sync_fn, SYNC_THREADS)
+            loop.run_until_complete(run_async(async_fn, concurrency, concurrency))
+
+            print(f"{name:<22} sync   {run_sync(sync_fn, total)}")
+            print(f"{'':<22} async  {loop.run_until_complete(run_async(async_fn, total, concurrency))}")
+    finally:
+        loop.run_until_complete(async_engine.dispose())
+        loop.close()
+
+
+def bench_http(base_url: str, paths: List[str], total: int, concurrency: int):
+    http = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+
+    for path in paths:
+        url = base_url.rstrip("/") + path
+        statuses: Dict[int, int] = {}
+
+        def get(_):
+            start = time.perf_counter()
+            status = http.get(url, timeout=30).status_code
+            statuses[status] = statuses.get(status, 0) + 1
+            return (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(get, range(total)))
+        print(f"{path:<28} {_summary(latencies, time.perf_counter() - started)}  statuses={statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--url", help="base URL of a running app (HTTP mode)")
+    parser.add_argument(
+        "--path",
+        action="append",
+        help="endpoint to load in HTTP mode (repeatable)",
+    )
+    args = parser.parse_args()
+
+    if args.url:
+        paths = args.path or ["/books", "/books/filter", "/users/home"]
+        bench_http(args.url, paths, args.requests, args.concurrency)
+    else:
+        bench_direct(args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/bench_login_isolation.py
+"""
+Catalogue latency while a burst of logins is being hashed.
+
+A steady stream of catalogue reads (the /books query through the async
+engine) runs on one event loop, the way the API process serves it, while
+--logins bcrypt verifications are fired at the same time:
+
+  baseline  no logins, catalogue only
+  threads   verifications in a 40-thread pool inside this process (how the
+            old sync `def login` ran them)
+  pool      verifications through app.utils.hash (PASSWORD_HASH_WORKERS
+            processes, bounded queue)
+
+The spread between baseline and each burst column is what a login storm
+costs the catalogue. With --url the same comparison is made over HTTP
+against a running app (needs an existing --email/--password; the login
+route's rate limit applies per client IP, so 429s are expected there).
+
+Run:  uv run python -m benchmarks.bench_login_isolation --logins 200
+      uv run python -m benchmarks.bench_login_isolation --url http://127.0.0.1:8000 --email a@b.c --password ...
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+from sqlmodel import select
+
+from app.config import settings
+from app.database import async_engine, async_session_factory
+from app.models.book import Book
+from app.utils.hash import (
+    _context,
+    get_password_hasher,
+    shutdown_password_hasher,
+    verify_and_update_async,
+)
+from app.utils.pagination import apaginate
+
+SYNC_THREADS = 40  # anyio's default worker thread limit
+PASSWORD = "Benchmark#Pass1"
+
+
+def _visible_books():
+    return (
+        select(Book)
+        .where(Book.is_deleted == False, Book.is_archived == False)
+        .order_by(Book.updated_at.desc())
+    )
+
+
+def _percentiles(latencies: List[float]) -> str:
+    if not latencies:
+        return "no samples"
+    latencies = sorted(latencies)
+    return (
+        f"n={len(latencies):<5} "
+        f"p50={latencies[len(latencies) // 2]:7.2f}ms  "
+        f"p95={latencies[max(int(len(latencies) * 0.95) - 1, 0)]:7.2f}ms  "
+        f"max={latencies[-1]:7.2f}ms"
+    )
+
+
+# ---------------------------------------------------------
+# Direct mode
+# ---------------------------------------------------------
+async def _catalogue_reader(stop: asyncio.Event, interval: float) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with async_session_factory() as session:
+            await apaginate(session=session, query=_visible_books(), page=1, limit=12)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def _scenario(mode: str, hashed: str, logins: int, readers: int, interval: float):
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(_catalogue_reader(stop, interval)) for _ in range(readers)]
+    loop = asyncio.get_running_loop()
+
+    started = time.perf_counter()
+    if mode == "baseline":
+        await asyncio.sleep(1.0)
+    elif mode == "threads":
+        context = _context(settings.PASSWORD_HASH_ROUNDS)
+        with ThreadPoolExecutor(max_workers=SYNC_THREADS) as threads:
+            await asyncio.gather(*(
+                loop.run_in_executor(threads, context.verify, PASSWORD, hashed)
+                for _ in range(logins)
+            ))
+    else:
+        # stay under the hasher's queue bound, as the rate limiter would
+        gate = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+        async def login():
+            async with gate:
+                await verify_and_update_async(PASSWORD, hashed)
+
+        await asyncio.gather(*(login() for _ in range(logins)))
+    burst = time.perf_counter() - started
+
+    stop.set()
+    latencies = [ms for result in await asyncio.gather(*tasks) for ms in result]
+    rate = f"{logins / burst:6.1f} logins/s" if mode != "baseline" else " " * 15
+    print(f"{mode:<9} {rate}  catalogue {_percentiles(latencies)}")
+
+
+async def bench_direct(logins: int, readers: int, interval: float):
+    hashed = _context(settings.PASSWORD_HASH_ROUNDS).hash(PASSWORD)
+    get_password_hasher().start()
+    try:
+        # warm the async pool
+        await _scenario("baseline", hashed, 0, readers, interval)
+        print(f"rounds={settings.PASSWORD_HASH_ROUNDS} workers={settings.PASSWORD_HASH_WORKERS} logins={logins}")
+        for mode in ("baseline", "threads", "pool"):
+            await _scenario(mode, hashed, logins, readers, interval)
+    finally:
+        shutdown_password_hasher()
+        await async_engine.dispose()
+
+
+# ---------------------------------------------------------
+# HTTP mode
+# ---------------------------------------------------------
+def bench_http(base_url: str, email: str, password: str, logins: int, readers: int):
+    base_url = base_url.rstrip("/")
+    http = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=readers + 32)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+
+    def catalogue(deadline: float) -> List[float]:
+        latencies = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            http.get(f"{base_url}/books", timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    statuses: Dict[int, int] = {}
+
+    def login(_):
+        status = http.post(
+            f"{base_url}/auth/login",
+            json={"email": email, "password": password},
+            timeout=60,
+        ).status_code
+        statuses[status] = statuses.get(status, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=readers + 32) as pool:
+        deadline = time.perf_counter() + 3
+        baseline = [pool.submit(catalogue, deadline) for _ in range(readers)]
+        print(f"baseline  catalogue {_percentiles([ms for f in baseline for ms in f.result()])}")
+
+        deadline = time.perf_counter() + 3
+        readers_futures = [pool.submit(catalogue, deadline) for _ in range(readers)]
+        list(ThreadPoolExecutor(max_workers=32).map(login, range(logins)))
+        print(f"burst     catalogue {_percentiles([ms for f in readers_futures for ms in f.result()])}")
+    print(f"login statuses={statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=100, help="logins in the burst")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent catalogue readers")
+    parser.add_argument("--interval", type=float, default=0.005, help="pause between a reader's requests (s)")
+    parser.add_argument("--url", help="base URL of a running app (HTTP mode)")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    if args.url:
+        if not (args.email and args.password):
+            parser.error("--url needs --email and --password")
+        bench_http(args.url, args.email, args.password, args.logins, args.readers)
+    else:
+        asyncio.run(bench_direct(args.logins, args.readers, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# benchmarks/explain_queries.py
+"""
+EXPLAIN the app's hot queries and flag sequential scans.
+
+The catalogue below mirrors the query shapes in app/routes and
+app/services, filled in with real ids/slugs from the configured database.
+By default the planner runs with enable_seqscan=off, so a Seq Scan that
+still shows up means no usable index exists (small local tables would
+otherwise be seq-scanned regardless). Pass --natural for the plans the
+planner would really pick, and --analyze to execute them.
+
+Exits 1 when an unexpected Seq Scan is found (usable as a CI check after
+migrations).
+
+Run:  uv run python -m benchmarks.explain_queries
+      uv run python -m benchmarks.explain_queries --natural --analyze --verbose
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+import app.models  # noqa: F401  (registers every mapper)
+from app.database import engine
+from app.models.analytics_rollup import DailySales
+from app.models.book import Book
+from app.models.cart import CartItem
+from app.models.category import Category
+from app.models.ebook_purchase import EbookPurchase
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.review import Review
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.services.analytics_rollup import sources
+from app.services.order_history import history_query, items_query
+from app.services.payment_history import PaymentFilters, page_query
+
+
+@dataclass
+class Sample:
+    user_id: int
+    book_id: int
+    slug: str
+    category_id: int
+    order_id: int
+
+
+@dataclass
+class Probe:
+    name: str
+    build: Callable[[Sample], object]
+    # tables a full scan is expected on (e.g. tiny lookup tables)
+    allow_seq_scan: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def _visible():
+    return select(Book).where(Book.is_deleted == False, Book.is_archived == False)
+
+
+CATALOGUE: List[Probe] = [
+    # ---------- catalogue ----------
+    Probe("books: list", lambda s: _visible().order_by(Book.updated_at.desc()).limit(12)),
+    Probe(
+        "books: list by category",
+        lambda s: _visible().where(Book.category_id == s.category_id).order_by(Book.updated_at.desc()).limit(12),
+    ),
+    Probe("books: featured", lambda s: select(Book).where(Book.is_featured == True)),
+    Probe("book detail: by slug", lambda s: select(Book.id).where(Book.slug == s.slug)),
+    Probe(
+        "book detail: related",
+        lambda s: select(Book)
+        .where(Book.category_id == s.category_id, Book.id != s.book_id)
+        .order_by(Book.is_featured.desc())
+        .limit(6),
+    ),
+    Probe("book detail: reviews", lambda s: select(Review).where(Review.book_id == s.book_id)),
+    # ---------- cart / wishlist ----------
+    Probe(
+        "cart: items",
+        lambda s: select(CartItem, Book).join(Book, CartItem.book_id == Book.id).where(CartItem.user_id == s.user_id),
+    ),
+    Probe(
+        "cart: add lookup",
+        lambda s: select(CartItem).where(CartItem.user_id == s.user_id, CartItem.book_id == s.book_id),
+    ),
+    Probe(
+        "wishlist: items",
+        lambda s: select(Wishlist, Book).join(Book, Book.id == Wishlist.book_id).where(Wishlist.user_id == s.user_id),
+    ),
+    Probe(
+        "wishlist: status",
+        lambda s: select(Wishlist).where(Wishlist.user_id == s.user_id, Wishlist.book_id == s.book_id),
+    ),
+    Probe(
+        "wishlist: count",
+        lambda s: select(func.count()).select_from(Wishlist).where(Wishlist.user_id == s.user_id),
+    ),
+    # ---------- orders ----------
+    Probe("orders: history", lambda s: history_query(s.user_id).limit(10)),
+    Probe("orders: history items", lambda s: items_query([s.order_id])),
+    Probe("orders: items", lambda s: select(OrderItem).where(OrderItem.order_id == s.order_id)),
+    Probe("orders: payment", lambda s: select(Payment).where(Payment.order_id == s.order_id)),
+    Probe(
+        "admin orders: by status",
+        lambda s: select(Order, User)
+        .outerjoin(User, User.id == Order.user_id)
+        .where(Order.status == "paid")
+        .order_by(Order.created_at.desc())
+        .limit(10),
+        allow_seq_scan=("user",),
+    ),
+    Probe(
+        "admin orders: all",
+        lambda s: select(Order).order_by(Order.created_at.desc()).limit(10),
+    ),
+    Probe(
+        "analytics: rollup window",
+        lambda s: select(DailySales).where(DailySales.day >= date.today() - timedelta(days=29)),
+    ),
+    Probe(
+        "analytics: live window (tz)",
+        lambda s: select(sources("Asia/Kolkata", date.today() - timedelta(days=29), date.today()).sales),
+    ),
+    Probe(
+        "expiry: due orders",
+        lambda s: select(Order.id)
+        .where(Order.status == "pending", Order.payment_expires_at < datetime.utcnow())
+        .limit(500),
+    ),
+    # ---------- ebooks / payments ----------
+    Probe(
+        "library: paid ebooks",
+        lambda s: select(EbookPurchase, Book)
+        .join(Book, Book.id == EbookPurchase.book_id)
+        .where(EbookPurchase.user_id == s.user_id, EbookPurchase.status == "paid"),
+    ),
+    Probe(
+        "admin ebooks: by status",
+        lambda s: select(EbookPurchase)
+        .where(EbookPurchase.status == "paid")
+        .order_by(EbookPurchase.created_at.desc())
+        .limit(10),
+    ),
+    Probe("my payments: page", lambda s: page_query(s.user_id, PaymentFilters(), 0, 11)),
+    Probe(
+        "my payments: filtered page",
+        lambda s: page_query(s.user_id, PaymentFilters(search="upi", min_amount=100), 20, 11),
+    ),
+]
+
+
+def load_sample(session: Session) -> Sample:
+    book = session.exec(select(Book).limit(1)).first()
+    return Sample(
+        user_id=session.exec(select(func.min(User.id))).one() or 1,
+        book_id=book.id if book else 1,
+        slug=book.slug if book else "sample",
+        category_id=book.category_id if book else session.exec(select(func.min(Category.id))).one() or 1,
+        order_id=session.exec(select(func.min(Order.id))).one() or 1,
+    )
+
+
+def _walk(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def explain(conn, statement, analyze: bool) -> dict:
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    row = conn.exec_driver_sql(f"EXPLAIN ({options}) {compiled}", compiled.params).scalar()
+    document = row if isinstance(row, list) else json.loads(row)
+    return document[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--natural", action="store_true", help="leave enable_seqscan on")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (executes the queries)")
+    parser.add_argument("--verbose", action="store_true", help="print every plan node")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        sample = load_sample(session)
+
+    flagged = 0
+    with engine.connect() as conn:
+        if not args.natural:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+        for probe in CATALOGUE:
+            result = explain(conn, probe.build(sample), args.analyze)
+            plan = result["Plan"]
+
+            scans = [
+                node["Relation Name"]
+                for node in _walk(plan)
+                if node["Node Type"] == "Seq Scan" and node["Relation Name"] not in probe.allow_seq_scan
+            ]
+            indexes = sorted({node["Index Name"] for node in _walk(plan) if "Index Name" in node})
+
+            timing = f"  {result['Execution Time']:.2f}ms" if args.analyze else ""
+            status = "SEQ SCAN " + ",".join(scans) if scans else "ok"
+            print(f"{probe.name:<28} cost={plan['Total Cost']:>10.2f}{timing}  {status}  {' '.join(indexes)}")
+
+            if args.verbose:
+                for node in _walk(plan):
+                    target = node.get("Index Name") or node.get("Relation Name") or ""
+                    print(f"    {node['Node Type']:<22} {target}")
+
+            flagged += bool(scans)
+        conn.rollback()
+
+    print(f"\n{flagged} of {len(CATALOGUE)} queries use a sequential scan")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
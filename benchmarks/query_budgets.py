@@ -0,0 +1,82 @@
+# benchmarks/query_budgets.py
+"""
+Check that endpoints stay within their SQL statement budget, against the
+data in the configured database (tests/test_query_budgets.py runs the
+same table in pytest, on a small dataset of its own).
+
+Each endpoint in BUDGETS is called once in-process (TestClient, real
+routing, auth and dependencies) against the configured database, with
+ids taken from it and a token for the user with the most orders, inside
+app.utils.query_stats.query_budget. Budgets are counted cold (empty
+in-process caches) and include the auth lookup. A loop that runs a query
+per row shows up as a count that grows with the data, so budgets are
+fixed numbers: set them to what the endpoint needs for any page size.
+
+Exits 1 when an endpoint goes over budget (usable as a CI check).
+
+Run:  uv run python -m benchmarks.query_budgets
+      uv run python -m benchmarks.query_budgets --verbose
+"""
+import argparse
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.main import app
+from app.models.book import Book
+from app.models.order import Order
+from app.models.user import User
+from app.utils.query_stats import QueryBudgetExceeded, query_budget
+from app.utils.token import create_access_token, token_claims
+from tests.test_query_budgets import BUDGETS, Sample
+
+
+def load_sample(session: Session) -> Sample:
+    user_id = session.exec(
+        select(Order.user_id)
+        .where(Order.user_id != None)
+        .group_by(Order.user_id)
+        .order_by(func.count().desc())
+    ).first() or session.exec(select(func.min(User.id))).one()
+    user = session.get(User, user_id)
+    return Sample(
+        token=create_access_token(token_claims(user)),
+        order_id=session.exec(select(func.max(Order.id)).where(Order.user_id == user_id)).one() or 0,
+        slug=session.exec(select(Book.slug).where(Book.is_deleted == False)).first() or "",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--verbose", action="store_true", help="print the slowest statements of each call")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        sample = load_sample(session)
+    headers = {"Authorization": f"Bearer {sample.token}"}
+
+    failed = 0
+    # one event loop for every call (the async engine's connections belong to it)
+    with TestClient(app) as client:
+        for path, budget in BUDGETS:
+            url = path.format(**vars(sample))
+            try:
+                with query_budget(budget, url) as stats:
+                    status = client.get(url, headers=headers).status_code
+                verdict = "ok"
+            except QueryBudgetExceeded:
+                verdict, failed = "OVER", failed + 1
+            print(f"{url:<45} {status:>4}  {stats.count:>3} / {budget:<3} {verdict}")
+            if args.verbose or verdict != "ok":
+                for seconds, sql in stats.slowest():
+                    print(f"    {seconds * 1000:7.2f}ms  {sql}")
+
+    print(f"\n{failed} of {len(BUDGETS)} endpoints over budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# benchmarks/replay_webhooks.py
+"""
+Replay signed Razorpay webhooks against the app.
+
+Events come from a JSON-lines file (one webhook body per line, e.g. copied
+from the Razorpay dashboard) or are synthesised for pending orders in the
+configured database. Each event is sent as payment.captured + order.paid
+and repeated --duplicates times, in parallel, to mimic a redelivery burst.
+
+With no --url the app is started in-process under uvicorn (the local
+stand-in: point postgres_* at a scratch database and set
+EMAIL_TRANSPORT=local). The script reports ack latency and, for the local
+stand-in, how long the worker took to drain the queue.
+
+Run:  uv run python -m benchmarks.replay_webhooks --pending 20 --duplicates 3
+      uv run python -m benchmarks.replay_webhooks --file events.jsonl --url https://host/webhooks/razorpay
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+
+from app.config import settings
+from app.services.razorpay_webhook import sign_payload
+
+
+def synthesize(gateway_order_id: str, amount: float, payment_id: Optional[str] = None) -> List[bytes]:
+    payment_id = payment_id or f"pay_{uuid.uuid4().hex[:14]}"
+    entity = {
+        "id": payment_id,
+        "entity": "payment",
+        "order_id": gateway_order_id,
+        "amount": int(round(amount * 100)),
+        "currency": "INR",
+        "status": "captured",
+    }
+    return [
+        json.dumps({
+            "entity": "event",
+            "event": event,
+            "payload": {"payment": {"entity": entity}},
+            "created_at": int(time.time()),
+        }).encode()
+        for event in ("payment.captured", "order.paid")
+    ]
+
+
+def pending_order_events(limit: int) -> List[bytes]:
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.models.order import Order
+
+    with Session(engine) as session:
+        orders = session.exec(
+            select(Order)
+            .where(Order.status == "pending")
+            .where(Order.gateway_order_id.is_not(None))
+            .limit(limit)
+        ).all()
+
+    bodies = []
+    for order in orders:
+        bodies += synthesize(order.gateway_order_id, order.total)
+    return bodies
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_app():
+    import uvicorn
+
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("local app failed to start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}/webhooks/razorpay"
+
+
+def replay(url: str, bodies: List[bytes], secret: str, duplicates: int, concurrency: int):
+    session = requests.Session()
+    jobs = [body for body in bodies for _ in range(duplicates)]
+
+    def send(body: bytes):
+        start = time.perf_counter()
+        response = session.post(
+            url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Razorpay-Signature": sign_payload(body, secret),
+                "X-Razorpay-Event-Id": f"evt_{uuid.uuid4().hex[:14]}",
+            },
+            timeout=10,
+        )
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(send, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--file", help="JSON-lines file of webhook bodies")
+    parser.add_argument("--pending", type=int, default=0, help="synthesise events for N pending orders")
+    parser.add_argument("--url", help="webhook URL (default: in-process local stand-in)")
+    parser.add_argument("--secret", default=settings.RAZORPAY_WEBHOOK_SECRET)
+    parser.add_argument("--duplicates", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("set RAZORPAY_WEBHOOK_SECRET or pass --secret")
+
+    bodies: List[bytes] = []
+    if args.file:
+        with open(args.file, "rb") as f:
+            bodies += [line.strip() for line in f if line.strip()]
+    if args.pending:
+        bodies += pending_order_events(args.pending)
+    if not bodies:
+        parser.error("nothing to replay (use --file and/or --pending)")
+
+    server = None
+    url = args.url
+    if not url:
+        # the in-process app verifies with the same secret
+        settings.RAZORPAY_WEBHOOK_SECRET = args.secret
+        server, thread, url = start_local_app()
+
+    started = time.perf_counter()
+    results = replay(url, bodies, args.secret, args.duplicates, args.concurrency)
+    acked = time.perf_counter() - started
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"sent {len(results)} webhooks in {acked:.2f}s  statuses={statuses}")
+    print(
+        f"ack ms  p50={latencies[len(latencies) // 2]:.2f}  "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1]:.2f}  max={latencies[-1]:.2f}"
+    )
+
+    if server:
+        from app.services.razorpay_webhook import get_webhook_processor
+
+        processor = get_webhook_processor()
+        while processor.pending():
+            time.sleep(0.05)
+        server.should_exit = True
+        thread.join()  # lifespan shutdown applies the last batch
+        print(f"drained in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# benchmarks/seed.py
+"""
+Fill the configured database with a seeded synthetic store for benchmarks.
+
+Categories, books, users (each with an address), orders with their items
+and payments, spread over the last --days days. The same --seed and sizes
+always produce the same rows (ids aside), so runs on different commits
+load the same data. Rows are written with COPY in chunks, so 1M books or
+orders take minutes and constant memory; analytics rollups are rebuilt
+for the seeded span afterwards.
+
+Everything seeded is tagged (emails @bench.example, slugs bench-*,
+categories "Bench: *") and --reset removes exactly that. Every user's
+password is benchmarks.seed.PASSWORD; bench-admin@bench.example is an
+admin. Run it on a scratch database with nothing else writing.
+
+Run:  uv run python -m benchmarks.seed --books 10000 --orders 10000
+      uv run python -m benchmarks.seed --books 1000000 --orders 1000000 --users 100000
+      uv run python -m benchmarks.seed --reset
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.services.analytics_rollup import backfill
+from app.utils.hash import _context
+
+PASSWORD = "Bench#Pass1"
+EMAIL_DOMAIN = "bench.example"
+ADMIN_EMAIL = f"bench-admin@{EMAIL_DOMAIN}"
+CHUNK = 20000
+
+GENRES = [
+    "Fiction", "Mystery", "Science", "History", "Poetry", "Children", "Biography",
+    "Philosophy", "Travel", "Cooking", "Art", "Business", "Health", "Religion",
+    "Technology", "Romance", "Fantasy", "Drama", "Education", "Comics",
+]
+WORDS = [
+    "river", "silent", "garden", "mountain", "golden", "night", "journey", "light",
+    "ancient", "city", "song", "shadow", "ocean", "forest", "stone", "dream",
+    "fire", "winter", "secret", "house", "star", "letter", "road", "moon",
+]
+LANGUAGES = ["English", "Kannada", "Hindi", "Tamil", "Telugu", "Marathi"]
+# (status, weight); payments exist from "paid" on
+ORDER_STATUSES = [
+    ("paid", 30), ("processing", 8), ("shipped", 10), ("delivered", 25),
+    ("pending", 10), ("cancelled", 6), ("expired", 6), ("refunded", 3),
+    ("partially_refunded", 2),
+]
+PAID_STATUSES = {"paid", "processing", "shipped", "delivered", "refunded", "partially_refunded"}
+
+
+def book_title(i: int) -> str:
+    return f"{WORDS[i % 24].title()} {WORDS[(i // 24) % 24].title()} {i}"
+
+
+def book_slug(i: int) -> str:
+    return f"bench-{i}-{WORDS[i % 24]}-{WORDS[(i // 24) % 24]}"
+
+
+# ---------------------------------------------------------
+# COPY helpers
+# ---------------------------------------------------------
+def _csv_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def copy_rows(cursor, table: str, columns: List[str], rows: Iterable[tuple]):
+    """COPY rows in chunks of CHUNK (None is NULL)"""
+    statement = f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        pending += 1
+        if pending == CHUNK:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+
+def reserve_ids(cursor, table: str, n: int) -> int:
+    """First of n consecutive ids taken from the table's sequence"""
+    cursor.execute(f"SELECT pg_get_serial_sequence('\"{table}\"', 'id')")
+    sequence = cursor.fetchone()[0]
+    cursor.execute("SELECT nextval(%s)", (sequence,))
+    first = cursor.fetchone()[0]
+    if n > 1:
+        cursor.execute("SELECT setval(%s, %s)", (sequence, first + n - 1))
+    return first
+
+
+# ---------------------------------------------------------
+# Generators
+# ---------------------------------------------------------
+def seed(books: int, orders: int, users: int, days: int, seed_value: int):
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().replace(microsecond=0)
+    span = timedelta(days=days).total_seconds()
+    password = _context(settings.PASSWORD_HASH_ROUNDS).hash(PASSWORD)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+
+        started = time.perf_counter()
+        category_ids = []
+        for genre in GENRES:
+            cursor.execute(
+                "INSERT INTO category (name, description, created_at, updated_at) "
+                "VALUES (%s, %s, %s, %s) RETURNING id",
+                (f"Bench: {genre}", f"Synthetic {genre.lower()} titles", now, now),
+            )
+            category_ids.append(cursor.fetchone()[0])
+
+        first_book = reserve_ids(cursor, "book", books)
+        prices = array("d")
+
+        def book_rows() -> Iterator[tuple]:
+            for i in range(books):
+                price = float(rng.randrange(99, 2000))
+                prices.append(price)
+                created = now - timedelta(seconds=rng.random() * span)
+                yield (
+                    first_book + i, book_title(i), book_slug(i),
+                    f"{WORDS[rng.randrange(24)]} {WORDS[rng.randrange(24)]}",
+                    " ".join(rng.choice(WORDS) for _ in range(40)),
+                    f"Author {rng.randrange(max(books // 20, 10))}",
+                    rng.choice(LANGUAGES), round(rng.uniform(2.5, 5.0), 1),
+                    price, round(price * 0.9) if rng.random() < 0.3 else None,
+                    round(price * 0.8) if rng.random() < 0.1 else None,
+                    rng.randrange(0, 200), rng.random() < 0.01, rng.random() < 0.005,
+                    created, created + timedelta(seconds=rng.random() * (now - created).total_seconds()),
+                    category_ids[int(len(category_ids) * rng.random() ** 1.5)],
+                    ",".join(rng.sample(WORDS, 3)),
+                    rng.random() < 0.01, rng.random() < 0.01, False,
+                )
+
+        copy_rows(cursor, "book", [
+            "id", "title", "slug", "excerpt", "description", "author", "language", "rating",
+            "price", "discount_price", "offer_price", "stock", "is_featured", "is_featured_author",
+            "created_at", "updated_at", "category_id", "tags", "is_deleted", "is_archived", "is_ebook",
+        ], book_rows())
+        print(f"books      {books:>9}  {time.perf_counter() - started:6.1f}s")
+
+        started = time.perf_counter()
+        first_user = reserve_ids(cursor, "user", users + 1)
+        copy_rows(cursor, "user", [
+            "id", "first_name", "last_name", "username", "email", "password", "role",
+            "can_login", "client", "created_at",
+        ], (
+            (
+                first_user + i, "Bench", f"User{i}" if i else "Admin", f"bench{i}",
+                f"bench{i}@{EMAIL_DOMAIN}" if i else ADMIN_EMAIL, password,
+                "user" if i else "admin", True, "Hithabodha Bookstore",
+                now - timedelta(seconds=rng.random() * span),
+            )
+            for i in range(users + 1)
+        ))
+        first_address = reserve_ids(cursor, "address", users)
+        copy_rows(cursor, "address", [
+            "id", "user_id", "first_name", "last_name", "address", "city", "state",
+            "zip_code", "phone_number", "created_at",
+        ], (
+            (
+                first_address + i, first_user + 1 + i, "Bench", f"User{i + 1}",
+                f"{rng.randrange(1, 999)} {rng.choice(WORDS).title()} Road", "Bengaluru",
+                "Karnataka", f"560{rng.randrange(1000):03d}", f"9{rng.randrange(10 ** 9):09d}", now,
+            )
+            for i in range(users)
+        ))
+        print(f"users      {users:>9}  {time.perf_counter() - started:6.1f}s")
+
+        started = time.perf_counter()
+        statuses = [s for s, _ in ORDER_STATUSES]
+        weights = [w for _, w in ORDER_STATUSES]
+        first_order = reserve_ids(cursor, "order", orders)
+        order_rows, item_rows, payment_rows = [], [], []
+        items = 0
+
+        def flush():
+            copy_rows(cursor, "order", [
+                "id", "user_id", "address_id", "subtotal", "shipping", "total", "status",
+                "payment_mode", "placed_by", "gateway_order_id", "created_at", "updated_at",
+                "reminder_24h_sent", "reminder_final_sent",
+            ], order_rows)
+            first_item = reserve_ids(cursor, "orderitem", len(item_rows))
+            copy_rows(cursor, "orderitem", ["id", "order_id", "book_id", "book_title", "price", "quantity"], (
+                (first_item + n, *row) for n, row in enumerate(item_rows)
+            ))
+            copy_rows(cursor, "payment", [
+                "order_id", "user_id", "txn_id", "amount", "status", "method", "created_at", "payment_mode",
+            ], payment_rows)
+            order_rows.clear()
+            item_rows.clear()
+            payment_rows.clear()
+
+        for n in range(orders):
+            order_id = first_order + n
+            user = int(users * rng.random() ** 2)  # a few heavy buyers, a long tail
+            created = now - timedelta(seconds=rng.random() * span)
+            status = rng.choices(statuses, weights)[0]
+            subtotal = 0.0
+            for _ in range(rng.choice((1, 1, 2, 2, 3, 4))):
+                book = rng.randrange(books)
+                quantity = rng.choice((1, 1, 1, 2, 3))
+                subtotal += prices[book] * quantity
+                item_rows.append((order_id, first_book + book, book_title(book), prices[book], quantity))
+                items += 1
+            shipping = 0.0 if subtotal >= 500 else 150.0
+            order_rows.append((
+                order_id, first_user + 1 + user, first_address + user, subtotal, shipping,
+                subtotal + shipping, status, "online", "user", f"order_bench{order_id}",
+                created, created, False, False,
+            ))
+            if status in PAID_STATUSES:
+                payment_rows.append((
+                    order_id, first_user + 1 + user, f"pay_bench{order_id}", subtotal + shipping,
+                    "success", "razorpay", created + timedelta(minutes=rng.randrange(1, 30)), "online",
+                ))
+            if len(order_rows) == CHUNK:
+                flush()
+        flush()
+        print(f"orders     {orders:>9}  {time.perf_counter() - started:6.1f}s  ({items} items)")
+
+        raw.commit()
+        for table in ("category", "book", "user", "address", "order", "orderitem", "payment"):
+            cursor.execute(f'ANALYZE "{table}"')
+        raw.commit()
+    finally:
+        raw.close()
+
+    started = time.perf_counter()
+    backfill((now - timedelta(days=days)).date(), now.date())
+    print(f"rollups    {days:>6} days  {time.perf_counter() - started:6.1f}s")
+
+
+# ---------------------------------------------------------
+# Reset
+# ---------------------------------------------------------
+RESET_SQL = [
+    # orders of bench users (seeded or placed by benchmark runs)
+    "CREATE TEMP TABLE bench_users ON COMMIT DROP AS SELECT id FROM \"user\" WHERE email LIKE '%%@{domain}'",
+    "CREATE TEMP TABLE bench_orders ON COMMIT DROP AS SELECT id FROM \"order\" WHERE user_id IN (SELECT id FROM bench_users)",
+    "CREATE TEMP TABLE bench_books ON COMMIT DROP AS SELECT id FROM book WHERE slug LIKE 'bench-%%'",
+    "DELETE FROM cancellationrequest WHERE order_id IN (SELECT id FROM bench_orders) OR user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM order_event WHERE order_id IN (SELECT id FROM bench_orders)",
+    "DELETE FROM orderitem WHERE order_id IN (SELECT id FROM bench_orders)",
+    "DELETE FROM payment WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM notification WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM ebookpayment WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM ebookpurchase WHERE user_id IN (SELECT id FROM bench_users) OR book_id IN (SELECT id FROM bench_books)",
+    "DELETE FROM cartitem WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM wishlist WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM review WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM \"order\" WHERE id IN (SELECT id FROM bench_orders)",
+    "DELETE FROM address WHERE user_id IN (SELECT id FROM bench_users)",
+    "DELETE FROM \"user\" WHERE id IN (SELECT id FROM bench_users)",
+    # bench books in other orders (shouldn't happen) keep them
+    "DELETE FROM book_image WHERE book_id IN (SELECT id FROM bench_books)",
+    "DELETE FROM book WHERE id IN (SELECT id FROM bench_books) AND id NOT IN (SELECT book_id FROM orderitem)",
+    "DELETE FROM category WHERE name LIKE 'Bench: %%' AND id NOT IN (SELECT category_id FROM book)",
+]
+
+
+def reset():
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(
+            "SELECT min(created_at) FROM \"order\" WHERE user_id IN "
+            "(SELECT id FROM \"user\" WHERE email LIKE %s)",
+            (f"%@{EMAIL_DOMAIN}",),
+        )
+        first_order = cursor.fetchone()[0]
+        for statement in RESET_SQL:
+            cursor.execute(statement.format(domain=EMAIL_DOMAIN))
+            if cursor.rowcount > 0 and statement.startswith("DELETE"):
+                print(f"{cursor.rowcount:>9}  {statement.split(' WHERE')[0]}")
+        raw.commit()
+    finally:
+        raw.close()
+
+    if first_order is not None:
+        backfill(first_order.date())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--users", type=int, help="default: orders / 10 (at least 100)")
+    parser.add_argument("--days", type=int, default=365, help="orders are spread over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="remove seeded data and exit")
+    args = parser.parse_args()
+
+    if args.reset:
+        reset()
+        return
+    if args.books < 1 or args.orders < 0:
+        parser.error("--books must be at least 1")
+    seed(args.books, args.orders, args.users or max(args.orders // 10, 100), args.days, args.seed)
+
+
+if __name__ == "__main__":
+    main()
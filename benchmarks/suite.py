@@ -0,0 +1,406 @@
+# benchmarks/suite.py
+"""
+Throughput and latency of the main user journeys, as a report comparable across commits.
+
+Scenarios (each run for --duration seconds by --concurrency virtual
+users, every user a different seeded customer with its own token):
+
+  browse     /books pages, /books/filter by category and price
+  search     /books/search, /books/dynamic-search with catalogue words
+  detail     /book/detail/{slug} over a spread of books
+  cart       add two books, read the cart, clear it
+  checkout   add to cart, create the Razorpay order, verify the payment
+  analytics  admin overview, weekly revenue chart and top books (90 days)
+
+Load the data first with benchmarks.seed (the scenarios only use seeded
+users, books and categories). Unless --url is given, the app is started
+in a child process on --port with the outside world stubbed: R2 calls
+return empty responses (after --r2-latency-ms), Razorpay orders and
+signatures are faked, emails go to the in-memory transport, the
+scheduler is off and rate limits are disabled. Driver and server share
+the machine, so compare reports taken on the same host.
+
+--out writes the report as JSON (with git commit, data sizes and
+settings); --compare prints the change against an earlier one.
+
+Run:  uv run python -m benchmarks.seed --books 100000 --orders 100000
+      uv run python -m benchmarks.suite --out before.json
+      uv run python -m benchmarks.suite --compare before.json --out after.json
+      uv run python -m benchmarks.suite --scenario browse --scenario detail --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import EMAIL_DOMAIN, WORDS
+
+# app modules are imported inside the functions that need them: the
+# stubbed server has to set its environment before app.config loads
+
+
+# ---------------------------------------------------------
+# Stubbed server (--serve, started by the driver)
+# ---------------------------------------------------------
+def serve(port: int, r2_latency_ms: float):
+    os.environ["EMAIL_TRANSPORT"] = "local"
+    os.environ["SCHEDULER_ENABLED"] = "false"
+
+    import uvicorn
+
+    from app.core.rate_limit import limiter
+    from app.main import app
+    from app.routes import book_detail, checkout_guest, checkout_user, ebooks, user_orders
+    from app.services.r2_client import s3_client
+
+    def fake_s3_call(operation_name, api_params):
+        if r2_latency_ms:
+            time.sleep(r2_latency_ms / 1000)
+        return {}
+
+    s3_client._make_api_call = fake_s3_call
+
+    def fake_order(data, **kwargs):
+        return {"id": f"order_bench{time.perf_counter_ns()}", "amount": data.get("amount"), "status": "created"}
+
+    for module in (book_detail, checkout_guest, checkout_user, ebooks, user_orders):
+        module.razorpay_client.order.create = fake_order
+        module.razorpay_client.utility.verify_payment_signature = lambda params: True
+
+    limiter.enabled = False
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(port: int, r2_latency_ms: float) -> subprocess.Popen:
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.suite", "--serve",
+        "--port", str(port), "--r2-latency-ms", str(r2_latency_ms),
+    ])
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"server exited with {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise SystemExit("server did not start within 60s")
+
+
+# ---------------------------------------------------------
+# Seeded data the scenarios draw from
+# ---------------------------------------------------------
+@dataclass
+class Customer:
+    token: str
+    address_id: int
+
+
+@dataclass
+class Sample:
+    customers: List[Customer]
+    admin_token: str
+    category_ids: List[int]
+    slugs: List[str]
+    book_ids: List[int]  # in stock, for carts
+    sizes: Dict[str, int]
+
+
+def load_sample(concurrency: int) -> Sample:
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.models.address import Address
+    from app.models.book import Book
+    from app.models.category import Category
+    from app.models.order import Order
+    from app.models.user import User
+    from app.utils.token import create_access_token, token_claims
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(User, Address.id)
+            .join(Address, Address.user_id == User.id)
+            .where(User.email.like(f"bench%@{EMAIL_DOMAIN}"), User.role == "user")
+            .order_by(User.id)
+            .limit(concurrency)
+        ).all()
+        admin = session.exec(select(User).where(User.email == f"bench-admin@{EMAIL_DOMAIN}")).first()
+        if not rows or admin is None:
+            raise SystemExit("no seeded data: run `python -m benchmarks.seed` first")
+
+        books = select(Book).where(Book.slug.like("bench-%"), Book.is_deleted == False, Book.is_archived == False)
+        sample = Sample(
+            customers=[Customer(create_access_token(token_claims(u)), address_id) for u, address_id in rows],
+            admin_token=create_access_token(token_claims(admin)),
+            category_ids=list(session.exec(select(Category.id).where(Category.name.like("Bench: %"))).all()),
+            slugs=list(session.exec(
+                select(Book.slug).where(books.whereclause).order_by(func.random()).limit(1000)
+            ).all()),
+            book_ids=list(session.exec(
+                select(Book.id).where(books.whereclause, Book.stock >= 100).order_by(func.random()).limit(1000)
+            ).all()),
+            sizes={
+                "books": session.exec(select(func.count()).select_from(Book)).one(),
+                "orders": session.exec(select(func.count()).select_from(Order)).one(),
+                "users": session.exec(select(func.count()).select_from(User)).one(),
+            },
+        )
+    if len(sample.customers) < concurrency:
+        raise SystemExit(f"only {len(sample.customers)} seeded customers for --concurrency {concurrency}")
+    return sample
+
+
+# ---------------------------------------------------------
+# Recording
+# ---------------------------------------------------------
+@dataclass
+class Series:
+    latencies: List[float] = field(default_factory=list)  # ms
+    errors: int = 0
+
+    def summary(self, seconds: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            return round(ordered[min(int(len(ordered) * p), len(ordered) - 1)], 2) if ordered else 0.0
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "rps": round(len(ordered) / seconds, 1),
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "p99": pct(0.99),
+            "max": round(ordered[-1], 2) if ordered else 0.0,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, customer: Customer, sample: Sample, rng: random.Random):
+        self.client = client
+        self.customer = customer
+        self.sample = sample
+        self.rng = rng
+        self.headers = {"Authorization": f"Bearer {customer.token}"}
+        self.series: Optional[Dict[str, Series]] = None  # None while warming up
+
+    async def call(self, label: str, method: str, path: str, admin: bool = False, **kwargs) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {self.sample.admin_token}"} if admin else self.headers
+        started = time.perf_counter()
+        response = await self.client.request(method, path, headers=headers, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        if self.series is not None:
+            series = self.series.setdefault(label, Series())
+            series.latencies.append(elapsed)
+            if response.status_code >= 400:
+                series.errors += 1
+        return response
+
+
+# ---------------------------------------------------------
+# Scenarios: one iteration each
+# ---------------------------------------------------------
+async def browse(vu: VirtualUser):
+    rng, sample = vu.rng, vu.sample
+    await vu.call("GET /books", "GET", "/books", params={"page": rng.randint(1, 20), "limit": 12})
+    await vu.call("GET /books/filter", "GET", "/books/filter", params={
+        "category_id": rng.choice(sample.category_ids),
+        "min_price": rng.choice((100, 300, 500)),
+        "page": rng.randint(1, 5),
+    })
+
+
+async def search(vu: VirtualUser):
+    await vu.call("GET /books/search", "GET", "/books/search", params={"q": vu.rng.choice(WORDS)})
+    await vu.call("GET /books/dynamic-search", "GET", "/books/dynamic-search", params={"query": vu.rng.choice(WORDS)})
+
+
+async def detail(vu: VirtualUser):
+    await vu.call("GET /book/detail/{slug}", "GET", f"/book/detail/{vu.rng.choice(vu.sample.slugs)}")
+
+
+def _cart_items(vu: VirtualUser) -> dict:
+    return {"items": [
+        {"book_id": book_id, "quantity": 1} for book_id in vu.rng.sample(vu.sample.book_ids, 2)
+    ]}
+
+
+async def cart(vu: VirtualUser):
+    await vu.call("POST /cart/add", "POST", "/cart/add", json=_cart_items(vu))
+    await vu.call("GET /cart/", "GET", "/cart/")
+    await vu.call("DELETE /cart/clear", "DELETE", "/cart/clear")
+
+
+async def checkout(vu: VirtualUser):
+    await vu.call("POST /cart/add", "POST", "/cart/add", json=_cart_items(vu))
+    created = await vu.call(
+        "POST /checkout/create-razorpay-order", "POST", "/checkout/create-razorpay-order",
+        params={"address_id": vu.customer.address_id},
+    )
+    if created.status_code != 200:
+        await vu.call("DELETE /cart/clear", "DELETE", "/cart/clear")
+        return
+    order = created.json()
+    await vu.call("POST /checkout/verify-razorpay-payment", "POST", "/checkout/verify-razorpay-payment", json={
+        "order_id": order["order_id"],
+        "razorpay_order_id": order["razorpay_order_id"],
+        "razorpay_payment_id": f"pay_bench{order['order_id']}",
+        "razorpay_signature": "bench",
+    })
+
+
+async def analytics(vu: VirtualUser):
+    window = {"from": (date.today() - timedelta(days=89)).isoformat(), "to": date.today().isoformat()}
+    await vu.call("GET /admin/analytics/overview", "GET", "/admin/analytics/overview", admin=True, params=window)
+    await vu.call(
+        "GET /admin/analytics/revenue-chart", "GET", "/admin/analytics/revenue-chart",
+        admin=True, params={**window, "granularity": "week"},
+    )
+    await vu.call("GET /admin/analytics/top-books", "GET", "/admin/analytics/top-books", admin=True, params=window)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "browse": browse,
+    "search": search,
+    "detail": detail,
+    "cart": cart,
+    "checkout": checkout,
+    "analytics": analytics,
+}
+
+
+async def run_scenario(
+    base_url: str, scenario: Callable, sample: Sample, concurrency: int, warmup: float, duration: float, seed: int
+) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        users = [
+            VirtualUser(client, sample.customers[n], sample, random.Random(seed + n))
+            for n in range(concurrency)
+        ]
+        series: Dict[str, Series] = {}
+        recording_ends = time.perf_counter() + warmup + duration
+
+        async def loop(vu: VirtualUser):
+            while time.perf_counter() < recording_ends:
+                await scenario(vu)
+
+        async def record():
+            await asyncio.sleep(warmup)
+            for vu in users:
+                vu.series = series
+            started = time.perf_counter()
+            await asyncio.sleep(duration)
+            for vu in users:
+                vu.series = None
+            return time.perf_counter() - started
+
+        *_, recorded = await asyncio.gather(*(loop(vu) for vu in users), record())
+    return {label: s.summary(recorded) for label, s in series.items()}
+
+
+# ---------------------------------------------------------
+# Report
+# ---------------------------------------------------------
+def git_meta() -> dict:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_report(results: Dict[str, Dict[str, dict]], baseline: Optional[dict]):
+    previous = (baseline or {}).get("results", {})
+    print(f"\n{'scenario':<10} {'request':<40} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'err':>5}")
+    for scenario, labels in results.items():
+        for label, s in labels.items():
+            print(
+                f"{scenario:<10} {label:<40} {s['rps']:>8.1f} {s['p50']:>8.2f} {s['p90']:>8.2f} "
+                f"{s['p99']:>8.2f} {s['max']:>8.2f} {s['errors']:>5}"
+            )
+            before = previous.get(scenario, {}).get(label)
+            if before:
+                def delta(key: str) -> str:
+                    return f"{(s[key] - before[key]) / before[key] * 100:+.0f}%" if before[key] else "n/a"
+
+                print(f"{'':<10} {'  vs ' + baseline['meta']['commit']:<40} {delta('rps'):>8} {delta('p50'):>8} "
+                      f"{delta('p90'):>8} {delta('p99'):>8} {delta('max'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable (default: all)")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds recorded per scenario")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds run before recording")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="base URL of a running app (no stubs, rate limits apply)")
+    parser.add_argument("--port", type=int, default=8765, help="port for the stubbed server")
+    parser.add_argument("--r2-latency-ms", type=float, default=0, help="delay of each stubbed R2 call")
+    parser.add_argument("--out", help="write the report as JSON")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.r2_latency_ms)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    sample = load_sample(args.concurrency)
+    server = None if args.url else start_server(args.port, args.r2_latency_ms)
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    results: Dict[str, Dict[str, dict]] = {}
+    try:
+        for name in args.scenario or list(SCENARIOS):
+            print(f"{name}: {args.warmup:g}s warmup, {args.duration:g}s recorded, {args.concurrency} users")
+            results[name] = asyncio.run(run_scenario(
+                base_url, SCENARIOS[name], sample, args.concurrency, args.warmup, args.duration, args.seed,
+            ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_report(results, baseline)
+    if args.out:
+        report = {
+            "meta": {
+                **git_meta(),
+                "at": datetime.utcnow().isoformat(timespec="seconds"),
+                "url": args.url or "stubbed",
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "r2_latency_ms": args.r2_latency_ms,
+                "data": sample.sizes,
+            },
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tests/conftest.py
+"""
+Tests run against the configured database (the same .env as the app).
+Each test gets a Session inside a transaction that is rolled back
+afterwards, so nothing a test writes is ever committed.
+"""
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+import app.models  # noqa: F401  (registers every mapper)
+from app.database import async_engine, engine
+from app.utils import query_stats, token
+
+
+def _require_database():
+    try:
+        return engine.connect()
+    except OperationalError as e:
+        pytest.skip(f"database unavailable: {e.orig}")
+
+
+@pytest.fixture
+def session():
+    connection = _require_database()
+    transaction = connection.begin()
+    # commits inside the code under test release a savepoint, not the transaction
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+        yield session
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app without its lifespan (no email / webhook workers, no scheduler)"""
+    from app.main import app
+
+    _require_database().close()
+
+    @asynccontextmanager
+    async def no_workers(app):
+        yield
+
+    lifespan, app.router.lifespan_context = app.router.lifespan_context, no_workers
+    try:
+        # one event loop for every call (the async engine's connections belong to it)
+        with TestClient(app) as client:
+            yield client
+            client.portal.call(async_engine.dispose)
+    finally:
+        app.router.lifespan_context = lifespan
+
+
+def _clear_caches():
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith("app.") or module is None:
+            continue
+        for value in list(vars(module).values()):
+            if callable(value) and hasattr(value, "cache_clear") and getattr(value, "__module__", None) == module_name:
+                value.cache_clear()
+    with token._principals_lock:
+        token._principals.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    app.utils.query_stats.query_budget, counted cold: in-process caches
+    (lru caches, cached user principals) are emptied on entry, so a budget
+    includes the auth lookup and whatever a cache would hide.
+
+        with query_budget(3, "order history"):
+            client.get("/users/profile/orders/history")
+    """
+    def budget(max_queries: int, label: str = "block"):
+        _clear_caches()
+        return query_stats.query_budget(max_queries, label)
+
+    return budget
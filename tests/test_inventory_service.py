@@ -0,0 +1,50 @@
+import pytest
+from sqlmodel import select
+
+from app.models.book import Book
+from app.models.category import Category
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.services.inventory_service import reduce_inventory
+
+
+@pytest.fixture
+def order(session) -> Order:
+    """An order for 2 + 1 copies of one book (stock 5) and 1 of another (stock 1)"""
+    category = Category(name="test-inventory")
+    books = [
+        Book(title=title, slug=f"test-inventory-{i}", description="", author="", price=100, stock=stock, category=category)
+        for i, (title, stock) in enumerate([("Plenty", 5), ("Last copy", 1)])
+    ]
+    order = Order(total=400)
+    session.add_all([category, *books, order])
+    session.flush()
+    session.add_all([
+        OrderItem(order_id=order.id, book_id=books[0].id, book_title="Plenty", price=100, quantity=2),
+        OrderItem(order_id=order.id, book_id=books[0].id, book_title="Plenty", price=100, quantity=1),
+        OrderItem(order_id=order.id, book_id=books[1].id, book_title="Last copy", price=100, quantity=1),
+    ])
+    session.flush()
+    return order
+
+
+def _stock(session, title: str) -> int:
+    session.expire_all()
+    return session.exec(select(Book.stock).where(Book.title == title)).one()
+
+
+def test_reduce_inventory_is_one_statement(session, query_budget, order):
+    with query_budget(1, "reduce_inventory"):
+        reduce_inventory(session, order.id)
+
+    assert _stock(session, "Plenty") == 2
+    assert _stock(session, "Last copy") == 0
+
+
+def test_reduce_inventory_names_the_short_book(session, order):
+    book = session.exec(select(Book).where(Book.title == "Last copy")).one()
+    book.stock = 0
+    session.flush()
+
+    with pytest.raises(ValueError, match="Insufficient stock for 'Last copy'"):
+        reduce_inventory(session, order.id)
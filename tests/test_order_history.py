@@ -0,0 +1,63 @@
+import pytest
+
+from app.models.book import Book
+from app.models.category import Category
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.user import User
+from app.services.order_history import get_user_order, history_page
+
+ORDERS = 30
+ITEMS_PER_ORDER = 3
+
+
+@pytest.fixture
+def customer(session) -> User:
+    """A user with ORDERS orders of ITEMS_PER_ORDER items each, nothing loaded"""
+    category = Category(name="test-order-history")
+    book = Book(title="Test", slug="test-order-history", description="", author="", price=100, category=category)
+    user = User(
+        first_name="Test", last_name="Customer", username="test-order-history",
+        email="test-order-history@example.com", password="x" * 60,
+    )
+    session.add_all([category, book, user])
+    session.flush()
+    for _ in range(ORDERS):
+        order = Order(user_id=user.id, total=100 * ITEMS_PER_ORDER, status="paid")
+        order.items = [
+            OrderItem(book_id=book.id, book_title=book.title, price=100, quantity=1)
+            for _ in range(ITEMS_PER_ORDER)
+        ]
+        session.add(order)
+    session.flush()
+    user_id = user.id
+    session.expunge_all()  # the calls below start cold
+    return session.get(User, user_id)
+
+
+@pytest.mark.parametrize("limit", [1, 10, ORDERS])
+def test_history_page_is_three_queries(session, query_budget, customer, limit):
+    # count + page of orders + one IN query for all of their items
+    with query_budget(3, f"history_page(limit={limit})"):
+        data = history_page(session, customer.id, page=1, limit=limit)
+
+    assert data["total_items"] == ORDERS
+    assert len(data["results"]) == limit
+    assert all(len(items) == ITEMS_PER_ORDER for _, items in data["results"])
+
+
+def test_get_user_order_loads_items_up_front(session, query_budget, customer):
+    order_id = session.get(User, customer.id).orders[0].id
+    session.expunge_all()
+
+    # the order + one selectinload query; reading the items runs nothing
+    with query_budget(2, "get_user_order"):
+        order = get_user_order(session, order_id, customer.id)
+        titles = [item.book_title for item in order.items]
+
+    assert len(titles) == ITEMS_PER_ORDER
+
+
+def test_get_user_order_is_scoped_to_the_owner(session, customer):
+    order_id = session.get(User, customer.id).orders[0].id
+    assert get_user_order(session, order_id, customer.id + 1) is None
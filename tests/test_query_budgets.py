@@ -0,0 +1,137 @@
+"""
+SQL statement budgets per endpoint.
+
+Each endpoint is called once in-process (real routing, auth and
+dependencies) for a customer with ORDERS orders, a cart, a wishlist and
+an ebook. The app reads through its own engines, so this data is
+committed (Core inserts: no ORM events, no rollup refresh) and deleted
+again after the module. A loop that runs a query per row shows up as a
+count that grows with the data, so budgets are fixed numbers: set them
+to what the endpoint needs for any page size.
+
+benchmarks.query_budgets runs the same table against whatever data the
+configured database holds.
+"""
+import uuid
+from dataclasses import dataclass
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app.database import engine
+from app.models.book import Book
+from app.models.book_image import BookImage
+from app.models.cart import CartItem
+from app.models.category import Category
+from app.models.ebook_payment import EbookPayment
+from app.models.ebook_purchase import EbookPurchase
+from app.models.order import Order
+from app.models.order_event import OrderEvent
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.review import Review
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.utils.token import create_access_token, token_claims
+
+ORDERS = 12
+BOOKS = 4
+
+# (path, statements allowed); paths are formatted with the Sample
+BUDGETS = [
+    ("/books?page=1&limit=12", 2),
+    ("/book/detail/{slug}", 6),
+    ("/cart/", 3),
+    ("/wishlist/", 3),
+    ("/users/profile/orders/history?limit=50", 4),
+    ("/users/profile/orders/{order_id}", 3),
+    ("/checkout/orders/{order_id}/track", 4),
+    ("/checkout/my-payments?limit=50", 3),
+    ("/users/library", 3),
+]
+
+
+@dataclass
+class Sample:
+    token: str
+    order_id: int
+    slug: str
+
+
+def _ids(conn, model, rows):
+    return list(conn.execute(insert(model).returning(model.id), rows).scalars())
+
+
+@pytest.fixture(scope="module")
+def sample(client):
+    tag = f"test-budget-{uuid.uuid4().hex[:8]}"
+    with engine.begin() as conn:
+        [category_id] = _ids(conn, Category, [{"name": tag}])
+        book_ids = _ids(conn, Book, [
+            {
+                "title": f"{tag} {i}", "slug": f"{tag}-{i}", "description": "", "author": "Test",
+                "price": 100 + i, "stock": 10, "category_id": category_id, "is_ebook": i == 0,
+                "ebook_price": 50 if i == 0 else None,
+            }
+            for i in range(BOOKS)
+        ])
+        [user_id] = _ids(conn, User, [{
+            "first_name": "Test", "last_name": "Budget", "username": tag,
+            "email": f"{tag}@example.com", "password": "x" * 60,
+        }])
+        conn.execute(insert(BookImage), [{"book_id": book_ids[0], "image_url": f"{tag}/{i}.jpg"} for i in range(2)])
+        conn.execute(insert(Review), [{
+            "book_id": book_ids[0], "user_id": user_id, "user_name": "Test", "rating": 4, "comment": "ok",
+        }])
+        conn.execute(insert(CartItem), [
+            {"user_id": user_id, "book_id": b, "book_title": tag, "price": 100} for b in book_ids[1:]
+        ])
+        conn.execute(insert(Wishlist), [{"user_id": user_id, "book_id": b} for b in book_ids[1:]])
+
+        order_ids = _ids(conn, Order, [
+            {"user_id": user_id, "subtotal": 300, "total": 300, "status": "paid"} for _ in range(ORDERS)
+        ])
+        conn.execute(insert(OrderItem), [
+            {"order_id": o, "book_id": b, "book_title": tag, "price": 100, "quantity": 1}
+            for o in order_ids for b in book_ids[1:]
+        ])
+        conn.execute(insert(OrderEvent), [
+            {"order_id": o, "event_type": event, "label": event} for o in order_ids for event in ("placed", "paid")
+        ])
+        conn.execute(insert(Payment), [
+            {"order_id": o, "user_id": user_id, "txn_id": f"{tag}-{o}", "amount": 300, "status": "success"}
+            for o in order_ids
+        ])
+        [purchase_id] = _ids(conn, EbookPurchase, [
+            {"user_id": user_id, "book_id": book_ids[0], "amount": 50, "status": "paid"}
+        ])
+        conn.execute(insert(EbookPayment), [{
+            "ebook_purchase_id": purchase_id, "user_id": user_id, "txn_id": f"{tag}-ebook", "amount": 50,
+        }])
+
+    with engine.connect() as conn:
+        user = User(**conn.execute(User.__table__.select().where(User.id == user_id)).mappings().one())
+    yield Sample(token=create_access_token(token_claims(user)), order_id=order_ids[-1], slug=f"{tag}-0")
+
+    with engine.begin() as conn:
+        conn.execute(delete(EbookPayment).where(EbookPayment.user_id == user_id))
+        conn.execute(delete(EbookPurchase).where(EbookPurchase.user_id == user_id))
+        conn.execute(delete(Payment).where(Payment.user_id == user_id))
+        conn.execute(delete(OrderEvent).where(OrderEvent.order_id.in_(order_ids)))
+        conn.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+        conn.execute(delete(Order).where(Order.id.in_(order_ids)))
+        conn.execute(delete(Wishlist).where(Wishlist.user_id == user_id))
+        conn.execute(delete(CartItem).where(CartItem.user_id == user_id))
+        conn.execute(delete(Review).where(Review.user_id == user_id))
+        conn.execute(delete(BookImage).where(BookImage.book_id.in_(book_ids)))
+        conn.execute(delete(User).where(User.id == user_id))
+        conn.execute(delete(Book).where(Book.id.in_(book_ids)))
+        conn.execute(delete(Category).where(Category.id == category_id))
+
+
+@pytest.mark.parametrize("path, budget", BUDGETS, ids=[path for path, _ in BUDGETS])
+def test_endpoint_within_query_budget(client, query_budget, sample, path, budget):
+    url = path.format(**vars(sample))
+    with query_budget(budget, url):
+        response = client.get(url, headers={"Authorization": f"Bearer {sample.token}"})
+    assert response.status_code == 200, response.text